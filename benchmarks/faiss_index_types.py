@@ -0,0 +1,71 @@
+"""
+Query latency and recall@k of the FAISS store's index types against flat search.
+
+    python benchmarks/faiss_index_types.py --sizes 1000 10000 100000 --dim 384
+
+Vectors are random points around a few thousand cluster centers, normalized for the inner-product metric,
+which is roughly how sentence embeddings of DDL and SQL behave. Pick `train_threshold` around the size
+where an approximate index starts to beat flat search at an acceptable recall.
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from vanna.faiss.faiss import create_index
+
+
+def make_vectors(n, dim, rng):
+    centers = rng.standard_normal((max(1, n // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def bench(index, queries, k):
+    start = time.perf_counter()
+    _, I = index.search(queries, k)
+    return (time.perf_counter() - start) / len(queries) * 1000, I
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'n':>8} {'index':>9} {'build s':>8} {'ms/query':>9} {'recall@' + str(args.k):>10}")
+    for n in args.sizes:
+        vectors = make_vectors(n, args.dim, rng)
+        queries = vectors[rng.integers(0, n, args.queries)] + 0.05 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+        faiss.normalize_L2(queries)
+
+        truth = None
+        for index_type in ("flat", "hnsw", "ivf_flat", "ivf_pq"):
+            start = time.perf_counter()
+            index = create_index(index_type, args.dim, metric="ip", n_vectors=n)
+            if not index.is_trained:
+                index.train(vectors)
+            index.add(vectors)
+            build = time.perf_counter() - start
+
+            if isinstance(index, faiss.IndexHNSW):
+                index.hnsw.efSearch = args.ef_search
+            elif isinstance(index, faiss.IndexIVF):
+                index.nprobe = args.nprobe
+
+            latency, I = bench(index, queries, args.k)
+            if truth is None:
+                truth = I
+            recall = np.mean([len(set(found) & set(expected)) / args.k for found, expected in zip(I, truth)])
+            print(f"{n:>8} {index_type:>9} {build:>8.2f} {latency:>9.3f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
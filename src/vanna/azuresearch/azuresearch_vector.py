@@ -152,57 +152,48 @@ class AzureAISearch_VectorStore(VannaBase):
         self.search_client.upload_documents(documents=[document])
         return id
 
-    def get_related_ddl(self, text: str) -> List[str]:
-        result = []
+    def _search_with_scores(self, text: str, doc_type: str, top: int) -> pd.DataFrame:
         vector_query = VectorizedQuery(vector=self.generate_embedding(text), fields="document_vector")
         df = pd.DataFrame(
             self.search_client.search(
-                top=self.n_results_ddl,
+                top=top,
                 vector_queries=[vector_query],
                 select=["id", "document", "type"],
-                filter=f"type eq 'ddl'"
-            )
-        )
-
-        if len(df):
-            result = df["document"].tolist()
-        return result
-
-    def get_related_documentation(self, text: str) -> List[str]:
-        result = []
-        vector_query = VectorizedQuery(vector=self.generate_embedding(text), fields="document_vector")
-
-        df = pd.DataFrame(
-            self.search_client.search(
-                top=self.n_results_documentation,
-                vector_queries=[vector_query],
-                select=["id", "document", "type"],
-                filter=f"type eq 'doc'",
+                filter=f"type eq '{doc_type}'",
                 vector_filter_mode=VectorFilterMode.PRE_FILTER
             )
         )
-
         if len(df):
-            result = df["document"].tolist()
-        return result
-
-    def get_similar_question_sql(self, question: str) -> List[str]:
-        result = []
-        # Vectorize the text
-        vector_query = VectorizedQuery(vector=self.generate_embedding(question), fields="document_vector")
-        df = pd.DataFrame(
-            self.search_client.search(
-                top=self.n_results_sql,
-                vector_queries=[vector_query],
-                select=["id", "document", "type"],
-                filter=f"type eq 'sql'"
-            )
+            # cosine scores are 1 / (1 + cosine distance)
+            df["score"] = 2 - 1 / df["@search.score"]
+        return df
+
+    def get_related_ddl_with_scores(self, text: str, **kwargs) -> list:
+        df = self._search_with_scores(text, "ddl", self.n_results_ddl)
+        return list(zip(df["document"], df["score"])) if len(df) else []
+
+    def get_related_documentation_with_scores(self, text: str, **kwargs) -> list:
+        df = self._search_with_scores(text, "doc", self.n_results_documentation)
+        return list(zip(df["document"], df["score"])) if len(df) else []
+
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        df = self._search_with_scores(question, "sql", self.n_results_sql)
+        if not len(df): # Check if there is similar query and the result is not empty
+            return []
+        return list(zip([ast.literal_eval(element) for element in df["document"]], df["score"]))
+
+    def get_related_ddl(self, text: str, **kwargs) -> List[str]:
+        return self.select_relevant(self.get_related_ddl_with_scores(text, **kwargs), "ddl")
+
+    def get_related_documentation(self, text: str, **kwargs) -> List[str]:
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(text, **kwargs), "documentation"
         )
 
-        if len(df): # Check if there is similar query and the result is not empty
-            result = [ast.literal_eval(element) for element in df["document"].tolist()]
-
-        return result
+    def get_similar_question_sql(self, question: str, **kwargs) -> List[str]:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
+        )
 
     def get_training_data(self) -> List[str]:
 
@@ -48,16 +48,22 @@ flowchart
 
 """
 
+import functools
+import hashlib
+import inspect
 import json
 import os
 import sys
 import re
 import sqlite3
+import threading
 import time
 import traceback
 from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
-from typing import List, Tuple, Union, NamedTuple, Optional
+from typing import Any, List, Tuple, Union, NamedTuple, Optional
 from urllib.parse import urlparse
 
 import pandas as pd
@@ -99,12 +105,15 @@ def suppress_warnings_only():
 
 from ..exceptions import DependencyError, ImproperlyConfigured, ValidationError
 from ..types import TrainingPlan, TrainingPlanItem, TableMetadata
+from .introspection import CATALOG_READERS, introspect_ddl
+from . import compaction, lexical, relevance, schema_graph, transfer
 from ..utils import (
     SEPARATOR,
     vn_log,
     validate_config_path, 
     strip_brackets, 
     remove_sql_noise,
+    fingerprint_table,
     # extract_sql  # To verify
 )
 
@@ -131,6 +140,7 @@ class LogTag:
     ERROR_DB = "[ERROR-DB]"
     ERROR_DF = "[ERROR-DF]"
     ERROR_VIZ = "[ERROR-VIZ]"
+    ERROR_COST = "[ERROR-COST]"
     CTX_PROMPT = "Context PROMPT"
     SQL_PROMPT = "SQL PROMPT"
     SHOW_LLM = "<LLM>"
@@ -181,6 +191,161 @@ def skip_chart(question):
         return True
     
     return False
+
+
+# Store methods that change the training data. VannaBase wraps them in every subclass that
+# defines them, so that the indexes derived from the training data (the BM25 index of hybrid
+# search and the schema graph) follow the store; the resets drop those indexes, which are then
+# rebuilt lazily.
+TRAINING_DATA_UPDATES = (
+    "add_question_sql",
+    "add_ddl",
+    "add_documentation",
+    "add_question_sql_batch",
+    "add_ddl_batch",
+    "add_documentation_batch",
+    "remove_training_data",
+    "remove_training_data_batch",
+)
+TRAINING_DATA_RESETS = ("remove_collection", "remove_collections")
+
+# nesting depth of wrapped store calls, so that a batch add implemented with single adds is
+# indexed once
+_training_data_calls = threading.local()
+
+
+def _notifying_training_data_change(method_name: str, method):
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        depth = getattr(_training_data_calls, "depth", 0)
+        _training_data_calls.depth = depth + 1
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            _training_data_calls.depth = depth
+        if depth == 0 and (
+            getattr(self, "_lexical_index", None) is not None
+            or getattr(self, "_schema_graph", None) is not None
+        ):
+            try:
+                bound = signature.bind(self, *args, **kwargs)
+                self._training_data_changed(method_name, bound, result)
+            except Exception as e:
+                print(
+                    "Dropping the derived indexes after a failed update, "
+                    f"they are rebuilt on next use: {e}"
+                )
+                self._lexical_index = None
+                self._schema_graph = None
+        return result
+
+    wrapper._notifies_training_data_change = True
+    return wrapper
+
+
+def _training_data_type_of(id: str) -> Optional[str]:
+    suffixes = (
+        ("-sql", "sql"),
+        ("-ddl", "ddl"),
+        ("-doc", "documentation"),
+        ("-documentation", "documentation"),
+    )
+    for suffix, training_data_type in suffixes:
+        if str(id).endswith(suffix):
+            return training_data_type
+    return None
+
+
+def _normalize_training_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Brings a `get_training_data` frame to the id, question, content and training_data_type columns
+    the maintenance methods read. Some stores (e.g. FAISS) return the content in sql, ddl and
+    documentation columns instead.
+    """
+    if df is None or len(df) == 0:
+        return df
+    df = df.copy()
+    if "content" not in df.columns:
+        content = pd.Series(None, index=df.index, dtype=object)
+        for column in ("sql", "ddl", "documentation"):
+            if column in df.columns:
+                content = content.where(content.notna(), df[column])
+        df["content"] = content
+    if "question" not in df.columns:
+        df["question"] = None
+    if "training_data_type" not in df.columns:
+        df["training_data_type"] = df["id"].map(_training_data_type_of)
+    return df
+
+
+# plan operators that read all of their input before returning a row, so a LIMIT above them does
+# not stop the scans below them
+_POSTGRES_BLOCKING_NODES = {
+    "Sort", "Aggregate", "Hash", "Materialize", "WindowAgg", "SetOp", "Unique",
+}
+_DUCKDB_BLOCKING_OPERATORS = {
+    "ORDER_BY", "TOP_N", "HASH_GROUP_BY", "PERFECT_HASH_GROUP_BY", "UNGROUPED_AGGREGATE",
+    "WINDOW", "DISTINCT",
+}
+_DUCKDB_LIMIT_OPERATORS = {"LIMIT", "STREAMING_LIMIT", "LIMIT_PERCENT"}
+
+
+def _postgres_plan_rows(root: dict) -> int:
+    """
+    The rows of an `EXPLAIN (FORMAT JSON)` plan: the rows it returns, or more if one of its scans
+    reads more. Scans below a LIMIT without a sort or aggregate in between stop early and are left
+    out.
+    """
+    rows, nodes = root.get("Plan Rows", 0), [(root, False)]
+    while nodes:
+        node, limited = nodes.pop()
+        node_type = node.get("Node Type", "")
+        if "Scan" in node_type and not limited:
+            rows = max(rows, node.get("Plan Rows", 0))
+        if node_type == "Limit":
+            limited = True
+        elif node_type in _POSTGRES_BLOCKING_NODES:
+            limited = False
+        nodes.extend((child, limited) for child in node.get("Plans", []))
+    return rows
+
+
+def _duckdb_plan_rows(plan: str) -> Optional[int]:
+    """
+    The largest row estimate of a DuckDB `EXPLAIN`. In plans without joins, the operators below a
+    LIMIT without a sort or aggregate in between stop early and are left out.
+    """
+    def estimates(text):
+        rows = re.findall(r"~([\d,]+) rows", text) + re.findall(r"EC: ?([\d,]+)", text)
+        return [int(r.replace(",", "")) for r in rows]
+
+    if "┐┌" in plan or "├" in plan:
+        # side-by-side operators, every estimate counts
+        return max(estimates(plan), default=None)
+
+    rows, limited = [], False
+    for box in plan.split("┌")[1:]:
+        name = re.search(r"│\s*(\w+)\s*│", box)
+        name = name.group(1) if name else ""
+        if name in _DUCKDB_BLOCKING_OPERATORS:
+            limited = False
+        if not limited:
+            rows += estimates(box)
+        if name in _DUCKDB_LIMIT_OPERATORS:
+            limited = True
+    return max(rows, default=None)
+
+
+def _training_data_key(item) -> tuple:
+    # stores return question-SQL pairs, and some also DDL and documentation, as dicts
+    if isinstance(item, dict):
+        content = item.get("sql") or item.get("ddl") or item.get("documentation")
+        return (item.get("question"), content)
+    return (None, item)
+
+
 #=================================
 # main functionality
 #=================================
@@ -222,6 +387,25 @@ class VannaBase(ABC):
         self.dialect = self.config.get("dialect", "SQL")
         self.language = self.config.get("language", None)
         self.max_tokens = self.config.get("max_tokens", 14000)
+        # retrieval counts by (question, sql), used to pick the pair kept by compact_question_sql
+        self.question_sql_usage = Counter()
+        self._compacted_question_sql_ids = set()
+        self._auto_trained_since_compaction = 0
+        self._question_sql_compaction_thread = None
+        # BM25 index of hybrid search and join graph of the DDL, built on first use
+        self._lexical_index = None
+        self._schema_graph = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method_name in TRAINING_DATA_UPDATES + TRAINING_DATA_RESETS:
+            method = cls.__dict__.get(method_name)
+            if (
+                inspect.isfunction(method)
+                and not getattr(method, "__isabstractmethod__", False)
+                and not getattr(method, "_notifies_training_data_change", False)
+            ):
+                setattr(cls, method_name, _notifying_training_data_change(method_name, method))
 
     def log(self, message: str, title: str = "", off_flag: bool = False):
         vn_log(message, title, off_flag)
@@ -237,9 +421,7 @@ class VannaBase(ABC):
             initial_prompt = self.config.get("initial_prompt", None)
         else:
             initial_prompt = None
-        question_sql_list = self.get_similar_question_sql(question, **kwargs)
-        ddl_list = self.get_related_ddl(question, **kwargs)
-        doc_list = self.get_related_documentation(question, **kwargs)
+        question_sql_list, ddl_list, doc_list = self.get_related_training_data(question, **kwargs)
         prompt = self.get_context_prompt(
             initial_prompt=initial_prompt,
             question=question,
@@ -331,9 +513,12 @@ class VannaBase(ABC):
             initial_prompt = self.config.get("initial_prompt", None)
         else:
             initial_prompt = None
-        question_sql_list = self.get_similar_question_sql(question, **kwargs)
-        ddl_list = self.get_related_ddl(question, **kwargs)
-        doc_list = self.get_related_documentation(question, **kwargs)
+        question_sql_list, ddl_list, doc_list = self.get_related_training_data(question, **kwargs)
+        self.question_sql_usage.update(
+            (example.get("question"), example.get("sql"))
+            for example in question_sql_list
+            if isinstance(example, dict)
+        )
         prompt = self.get_sql_prompt(
             initial_prompt=initial_prompt,
             question=question,
@@ -635,6 +820,19 @@ class VannaBase(ABC):
     def generate_embedding(self, data: str, **kwargs) -> List[float]:
         pass
 
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        """
+        Embeds many strings at once. The default implementation calls `generate_embedding` for each
+        string; embedding providers override it with a single batched call.
+
+        Args:
+            data (List[str]): The strings to embed.
+
+        Returns:
+            List[List[float]]: The embeddings, in the order of `data`.
+        """
+        return [self.generate_embedding(d, **kwargs) for d in data]
+
     # ----------------- Use Any Database to Store and Retrieve Context ----------------- #
     @abstractmethod
     def get_similar_question_sql(self, question: str, **kwargs) -> list:
@@ -700,6 +898,309 @@ class VannaBase(ABC):
         """
         pass
 
+    def get_related_training_data(self, question: str, **kwargs) -> Tuple[list, list, list]:
+        """
+        This method is used to get all the context for a question: similar question-SQL pairs,
+        related DDL and related documentation.
+        The default implementation selects the relevant items of
+        `get_related_training_data_with_scores`.
+
+        Config:
+            hybrid_search (bool): Merge the vector results with the hits of a local BM25 index by
+                reciprocal-rank fusion, so that exact table and column names are found. Off by
+                default.
+            hybrid_lexical_n_results (int): Number of BM25 hits per training data type. Defaults
+                to 10.
+            hybrid_rrf_k (int): Damping constant of the fusion. Defaults to 60.
+            expand_join_paths (bool): Add the DDL of the bridge tables on the shortest join paths
+                between the retrieved tables, and the join conditions as documentation. See
+                `vanna.base.schema_graph`. Off by default.
+            join_expansion_max_tokens (int): Token budget of the added DDL and join conditions.
+                Defaults to 1000.
+            join_expansion_max_hops (int): Maximum number of joins of a path. Unlimited by default.
+
+        Args:
+            question (str): The question to get the context for.
+
+        Returns:
+            Tuple[list, list, list]: The similar question-SQL pairs, the related DDL and the related
+            documentation.
+        """
+        config = self.config or {}
+        scored_lists = self.get_related_training_data_with_scores(question, **kwargs)
+        training_data_types = ("sql", "ddl", "documentation")
+        selected = [
+            self.select_relevant(scored, training_data_type)
+            for scored, training_data_type in zip(scored_lists, training_data_types)
+        ]
+        if config.get("hybrid_search", False):
+            # the fused lists keep the selected length, so the threshold and adaptive k still apply
+            selected = [
+                self._fuse_lexical_hits(question, training_data_type, items, len(items), **kwargs)
+                for items, training_data_type in zip(selected, training_data_types)
+            ]
+
+        sql_list, ddl_list, doc_list = selected
+        if config.get("expand_join_paths", False):
+            ddl_list, doc_list = self._expand_join_paths(ddl_list, doc_list)
+        return sql_list, ddl_list, doc_list
+
+    def get_similar_question_sql_with_scores(
+        self, question: str, **kwargs
+    ) -> List[Tuple[dict, Optional[float]]]:
+        """
+        Like [`get_similar_question_sql`][vanna.base.base.VannaBase.get_similar_question_sql], but
+        returns (item, score) pairs before any threshold or adaptive k is applied. Scores are
+        similarities, higher is more similar. The default implementation has no scores and returns
+        None for each item.
+        """
+        return [(item, None) for item in self.get_similar_question_sql(question, **kwargs)]
+
+    def get_related_ddl_with_scores(
+        self, question: str, **kwargs
+    ) -> List[Tuple[str, Optional[float]]]:
+        """
+        Like [`get_related_ddl`][vanna.base.base.VannaBase.get_related_ddl], but returns
+        (item, score) pairs.
+        See `get_similar_question_sql_with_scores`.
+        """
+        return [(item, None) for item in self.get_related_ddl(question, **kwargs)]
+
+    def get_related_documentation_with_scores(
+        self, question: str, **kwargs
+    ) -> List[Tuple[str, Optional[float]]]:
+        """
+        Like [`get_related_documentation`][vanna.base.base.VannaBase.get_related_documentation], but
+        returns (item, score) pairs.
+        See `get_similar_question_sql_with_scores`.
+        """
+        return [(item, None) for item in self.get_related_documentation(question, **kwargs)]
+
+    def get_related_training_data_with_scores(
+        self, question: str, **kwargs
+    ) -> Tuple[list, list, list]:
+        """
+        Example:
+        ```python
+        sql_list, ddl_list, doc_list = vn.get_related_training_data_with_scores(
+            "What are the top 10 customers?"
+        )
+        ```
+
+        All the context for a question as (item, score) lists. The default implementation calls the
+        three `get_*_with_scores` methods; vector stores that can search all collections in one
+        round trip override it.
+
+        Args:
+            question (str): The question to get the context for.
+
+        Returns:
+            Tuple[list, list, list]: The scored question-SQL pairs, DDL and documentation.
+        """
+        return (
+            self.get_similar_question_sql_with_scores(question, **kwargs),
+            self.get_related_ddl_with_scores(question, **kwargs),
+            self.get_related_documentation_with_scores(question, **kwargs),
+        )
+
+    def select_relevant(
+        self, scored: List[Tuple[Any, Optional[float]]], training_data_type: str
+    ) -> list:
+        """
+        Applies the score threshold and adaptive k of the config to a scored list of one training
+        data type.
+
+        Config:
+            score_threshold: Minimum similarity of an item; "score_threshold_sql",
+                "score_threshold_ddl" and "score_threshold_documentation" set it per type.
+                Off by default.
+            adaptive_k (bool): Cut each list at its largest score drop. Off by default.
+            adaptive_k_gap (float): Minimum score drop to cut at. Defaults to 0.1.
+            adaptive_k_min (int): Number of items that are always kept. Defaults to 1.
+
+        Returns:
+            list: The selected items, most similar first.
+        """
+        config = self.config or {}
+        return relevance.select_relevant(
+            scored,
+            threshold=config.get(
+                f"score_threshold_{training_data_type}", config.get("score_threshold")
+            ),
+            adaptive_k=config.get("adaptive_k", False),
+            gap=config.get("adaptive_k_gap", 0.1),
+            min_k=config.get("adaptive_k_min", 1),
+        )
+
+    def build_lexical_index(self, **kwargs) -> int:
+        """
+        Example:
+        ```python
+        vn.build_lexical_index()
+        ```
+
+        (Re)builds the BM25 index of hybrid search from
+        [`get_training_data`][vanna.base.base.VannaBase.get_training_data]. Hybrid search builds it
+        on first use; afterwards adds and removes through the store update it item by item.
+
+        Returns:
+            int: The number of indexed items.
+        """
+        index = lexical.BM25Index()
+        df = _normalize_training_data(self.get_training_data(**kwargs))
+        if df is not None and len(df) > 0:
+            datasets = df["dataset"] if "dataset" in df.columns else ["default"] * len(df)
+            for id, question, content, training_data_type, dataset in zip(
+                df["id"], df["question"], df["content"], df["training_data_type"], datasets
+            ):
+                if training_data_type == "sql":
+                    item = {"question": question, "sql": content}
+                    self._index_training_data(index, "sql", [id], [item], dataset)
+                elif training_data_type in ("ddl", "documentation"):
+                    self._index_training_data(index, training_data_type, [id], [content], dataset)
+        self._lexical_index = index
+        return len(index)
+
+    @staticmethod
+    def _index_training_data(
+        index: lexical.BM25Index, training_data_type: str, ids: list, items: list, dataset: str
+    ):
+        for id, item in zip(ids or [], items):
+            if id is None:
+                continue
+            text = f"{item['question']}\n{item['sql']}" if training_data_type == "sql" else item
+            index.add(id, text, item, training_data_type, dataset or "default")
+
+    def _training_data_changed(self, method_name: str, bound: inspect.BoundArguments, result):
+        lexical_index = getattr(self, "_lexical_index", None)
+        graph = getattr(self, "_schema_graph", None)
+        if method_name in TRAINING_DATA_RESETS:
+            self._lexical_index = None
+            self._schema_graph = None
+            return
+
+        # arguments by position, since stores name them differently (e.g. `doc` for documentation)
+        parameters = bound.signature.parameters
+        variadic = (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+        args = [
+            value for name, value in bound.arguments.items()
+            if parameters[name].kind not in variadic
+        ][1:]
+        extra = next(
+            (
+                value for name, value in bound.arguments.items()
+                if parameters[name].kind == inspect.Parameter.VAR_KEYWORD
+            ),
+            {},
+        )
+        dataset = bound.arguments.get("dataset", extra.get("dataset"))
+
+        if method_name in ("remove_training_data", "remove_training_data_batch"):
+            if method_name == "remove_training_data_batch":
+                ids = list(args[0])
+            else:
+                ids = [args[0]] if result else []
+            for id in ids:
+                if lexical_index is not None:
+                    lexical_index.remove(id)
+                if graph is not None:
+                    graph.remove_id(id)
+            return
+
+        if method_name == "add_question_sql":
+            training_data_type, ids = "sql", [result]
+            items = [{"question": args[0], "sql": args[1]}]
+        elif method_name == "add_question_sql_batch":
+            training_data_type, ids = "sql", result
+            items = [{"question": question, "sql": sql} for question, sql in args[0]]
+        elif method_name in ("add_ddl", "add_documentation"):
+            training_data_type, ids, items = method_name[len("add_"):], [result], [args[0]]
+        else:
+            training_data_type = method_name[len("add_"):-len("_batch")]
+            ids, items = result, list(args[0])
+
+        if lexical_index is not None:
+            self._index_training_data(lexical_index, training_data_type, ids, items, dataset)
+        if graph is not None and training_data_type == "ddl":
+            for id, ddl in zip(ids or [], items):
+                if id is not None:
+                    graph.add_ddl(ddl, id)
+
+    def build_schema_graph(self, **kwargs) -> int:
+        """
+        Example:
+        ```python
+        vn.build_schema_graph()
+        ```
+
+        (Re)builds the join graph of the trained DDL from
+        [`get_training_data`][vanna.base.base.VannaBase.get_training_data]. Join path expansion
+        builds it on first use; afterwards adds and removes of DDL through the store update it
+        table by table.
+
+        Returns:
+            int: The number of tables in the graph.
+        """
+        graph = schema_graph.SchemaGraph()
+        df = _normalize_training_data(self.get_training_data(**kwargs))
+        if df is not None and len(df) > 0:
+            for id, content, training_data_type in zip(
+                df["id"], df["content"], df["training_data_type"]
+            ):
+                if training_data_type == "ddl":
+                    graph.add_ddl(content, id)
+        self._schema_graph = graph
+        return len(graph)
+
+    def _expand_join_paths(self, ddl_list: list, doc_list: list) -> Tuple[list, list]:
+        config = self.config or {}
+        if getattr(self, "_schema_graph", None) is None:
+            self.build_schema_graph()
+        tables = [schema_graph.table_name(_training_data_key(ddl)[1]) for ddl in ddl_list]
+        bridges, conditions = self._schema_graph.connect(
+            tables, max_hops=config.get("join_expansion_max_hops")
+        )
+        if not conditions:
+            return ddl_list, doc_list
+
+        budget = config.get("join_expansion_max_tokens", 1000)
+        ddl_list = list(ddl_list)
+        for table in bridges:
+            ddl = self._schema_graph.ddl(table)
+            tokens = self.str_to_approx_token_count(ddl)
+            if tokens > budget:
+                break
+            ddl_list.append(ddl)
+            budget -= tokens
+
+        join_paths = "The tables join on: " + ", ".join(dict.fromkeys(conditions))
+        if self.str_to_approx_token_count(join_paths) <= budget:
+            doc_list = list(doc_list) + [join_paths]
+        return ddl_list, doc_list
+
+    def _fuse_lexical_hits(
+        self, question: str, training_data_type: str, items: list, n_results: int, **kwargs
+    ) -> list:
+        config = self.config or {}
+        if not n_results:
+            return items
+        if getattr(self, "_lexical_index", None) is None:
+            self.build_lexical_index()
+        hits = self._lexical_index.search(
+            question,
+            training_data_type,
+            dataset=kwargs.get("dataset"),
+            n_results=config.get("hybrid_lexical_n_results", 10),
+        )
+        if not hits:
+            return items
+        return relevance.reciprocal_rank_fusion(
+            [items, [item for item, _ in hits]],
+            k=config.get("hybrid_rrf_k", 60),
+            key=_training_data_key,
+            limit=n_results,
+        )
+
     @abstractmethod
     def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
         """
@@ -727,6 +1228,67 @@ class VannaBase(ABC):
         """
         pass
 
+    def add_ddl_batch(self, ddls: List[str], **kwargs) -> List[str]:
+        """
+        This method is used to add many DDL statements to the training data at once.
+        The default implementation calls [`add_ddl`][vanna.base.base.VannaBase.add_ddl] for each
+        statement; vector stores override it with a bulk write.
+
+        Args:
+            ddls (List[str]): The DDL statements to add.
+            embeddings (List[List[float]], optional): Precomputed embeddings of the items, e.g. from
+                an export.
+                Stores that support it use them instead of embedding the items again.
+
+        Returns:
+            List[str]: The IDs of the training data that was added.
+        """
+        kwargs.pop("embeddings", None)
+        return [self.add_ddl(ddl, **kwargs) for ddl in ddls]
+
+    def add_question_sql_batch(
+        self, question_sql_pairs: List[Tuple[str, str]], **kwargs
+    ) -> List[str]:
+        """
+        This method is used to add many question-SQL pairs to the training data at once.
+        The default implementation calls
+        [`add_question_sql`][vanna.base.base.VannaBase.add_question_sql] for each pair; vector
+        stores override it with a bulk write.
+
+        Args:
+            question_sql_pairs (List[Tuple[str, str]]): The (question, SQL query) pairs to add.
+            embeddings (List[List[float]], optional): Precomputed embeddings of the items, e.g. from
+                an export.
+                Stores that support it use them instead of embedding the items again.
+
+        Returns:
+            List[str]: The IDs of the training data that was added.
+        """
+        kwargs.pop("embeddings", None)
+        return [
+            self.add_question_sql(question=question, sql=sql, **kwargs)
+            for question, sql in question_sql_pairs
+        ]
+
+    def add_documentation_batch(self, documentations: List[str], **kwargs) -> List[str]:
+        """
+        This method is used to add many documentation strings to the training data at once.
+        The default implementation calls
+        [`add_documentation`][vanna.base.base.VannaBase.add_documentation] for each string; vector
+        stores override it with a bulk write.
+
+        Args:
+            documentations (List[str]): The documentation to add.
+            embeddings (List[List[float]], optional): Precomputed embeddings of the items, e.g. from
+                an export.
+                Stores that support it use them instead of embedding the items again.
+
+        Returns:
+            List[str]: The IDs of the training data that was added.
+        """
+        kwargs.pop("embeddings", None)
+        return [self.add_documentation(documentation, **kwargs) for documentation in documentations]
+
     @abstractmethod
     def add_documentation(self, documentation: str, **kwargs) -> str:
         """
@@ -773,6 +1335,176 @@ class VannaBase(ABC):
         """
         pass
 
+    def remove_training_data_batch(self, ids: List[str], **kwargs) -> int:
+        """
+        Removes many training data items. The default implementation calls
+        [`remove_training_data`][vanna.base.base.VannaBase.remove_training_data] for each ID;
+        vector stores override it with bulk deletes.
+
+        Args:
+            ids (List[str]): The IDs of the training data to remove.
+
+        Returns:
+            int: The number of removed items.
+        """
+        return sum(1 for id in ids if self.remove_training_data(id, **kwargs))
+
+    def compact_question_sql(
+        self,
+        similarity_threshold: Optional[float] = None,
+        keep: Optional[str] = None,
+        incremental: bool = False,
+        **kwargs,
+    ) -> int:
+        """
+        Example:
+        ```python
+        vn.compact_question_sql(similarity_threshold=0.9, keep="most_used")
+        ```
+
+        Removes near-duplicate question-SQL pairs, e.g. those piled up by `ask(auto_train=True)`.
+        Pairs are clustered by SQL fingerprint and question-embedding similarity, and each cluster
+        keeps one representative. See `vanna.base.compaction` for the details.
+
+        Args:
+            similarity_threshold (float, optional): Minimum cosine similarity of the questions of
+                one cluster. Defaults to config "compaction_similarity_threshold" or 0.95.
+            keep (str, optional): "latest" or "most_used". Defaults to config "compaction_keep" or
+                "latest".
+            incremental (bool): Only look at queries whose fingerprint gained pairs since the last
+                compaction.
+
+        Returns:
+            int: The number of removed pairs.
+        """
+        config = self.config or {}
+        if similarity_threshold is None:
+            similarity_threshold = config.get("compaction_similarity_threshold", 0.95)
+        if keep is None:
+            keep = config.get("compaction_keep", "latest")
+
+        df = _normalize_training_data(self.get_training_data(**kwargs))
+        if df is None or len(df) == 0:
+            return 0
+        df = df[df["training_data_type"] == "sql"]
+        ids = set(df["id"])
+
+        duplicates = compaction.find_duplicates(
+            df,
+            self.generate_embeddings,
+            similarity_threshold=similarity_threshold,
+            keep=keep,
+            usage=self.question_sql_usage,
+            new_ids=ids - self._compacted_question_sql_ids if incremental else None,
+        )
+        removed = self.remove_training_data_batch(duplicates) if duplicates else 0
+        self._compacted_question_sql_ids = ids - set(duplicates)
+        return removed
+
+    def start_question_sql_compaction(self, **kwargs) -> threading.Thread:
+        """
+        Runs an incremental
+        [`compact_question_sql`][vanna.base.base.VannaBase.compact_question_sql] in a background
+        thread, unless one is still running.
+
+        Returns:
+            threading.Thread: The compaction thread.
+        """
+        thread = self._question_sql_compaction_thread
+        if thread is None or not thread.is_alive():
+            kwargs.setdefault("incremental", True)
+            self._question_sql_compaction_thread = threading.Thread(
+                target=self._run_question_sql_compaction, kwargs=kwargs, daemon=True
+            )
+            self._question_sql_compaction_thread.start()
+        return self._question_sql_compaction_thread
+
+    def _run_question_sql_compaction(self, **kwargs):
+        try:
+            removed = self.compact_question_sql(**kwargs)
+            if removed:
+                print(f"Removed {removed} duplicate question-SQL pairs")
+        except Exception as e:
+            print(f"Question-SQL compaction failed: {e}")
+
+    def _maybe_compact_question_sql(self):
+        # config "compact_question_sql_every": compact in the background after that many
+        # auto-trained pairs
+        every = (self.config or {}).get("compact_question_sql_every", 0)
+        if not every:
+            return
+        self._auto_trained_since_compaction += 1
+        if self._auto_trained_since_compaction >= every:
+            self._auto_trained_since_compaction = 0
+            self.start_question_sql_compaction()
+
+    def get_embedding_model_name(self) -> Optional[str]:
+        """
+        The name of the model that embeds the training data, used to decide whether exported
+        vectors can be reused on import. Defaults to config "embedding_model"; None means unknown,
+        so vectors are not reused.
+        """
+        return (self.config or {}).get("embedding_model")
+
+    def iter_training_data_with_embeddings(self, batch_size: int = 1000, **kwargs):
+        """
+        Yields the training data in DataFrames of at most `batch_size` rows, with the columns id,
+        training_data_type, dataset, question, content and embedding. The default implementation
+        chunks [`get_training_data`][vanna.base.base.VannaBase.get_training_data] without
+        embeddings; vector stores that can read their vectors back override it.
+        """
+        df = self.get_training_data(**kwargs)
+        if df is None or len(df) == 0:
+            return
+        df = transfer.normalize_training_data(df)
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start : start + batch_size]
+
+    def export_training_data(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Example:
+        ```python
+        vn.export_training_data("training_data.parquet")
+        ```
+
+        Writes the training data, including the stored vectors where the vector store returns them,
+        to a Parquet file in chunks of `batch_size` rows. Requires pyarrow.
+
+        Args:
+            path (str): The Parquet file to write.
+            batch_size (int): Number of rows per chunk.
+
+        Returns:
+            int: The number of exported rows.
+        """
+        return transfer.export_training_data(self, path, batch_size=batch_size)
+
+    def import_training_data(
+        self, path: str, batch_size: int = 1000, reuse_embeddings: Optional[bool] = None
+    ) -> int:
+        """
+        Example:
+        ```python
+        vn.import_training_data("training_data.parquet")
+        ```
+
+        Bulk-loads training data exported by
+        [`export_training_data`][vanna.base.base.VannaBase.export_training_data], e.g. from another
+        vector store. The exported vectors are reused when both stores use the same embedding model.
+
+        Args:
+            path (str): The Parquet file to read.
+            batch_size (int): Number of rows read and added at a time.
+            reuse_embeddings (bool, optional): Force reusing (True) or recomputing (False) the
+                exported vectors.
+
+        Returns:
+            int: The number of imported rows.
+        """
+        return transfer.import_training_data(
+            self, path, batch_size=batch_size, reuse_embeddings=reuse_embeddings
+        )
+
     # ----------------- Use Any Language Model API ----------------- #
 
     @abstractmethod
@@ -1635,9 +2367,17 @@ class VannaBase(ABC):
                 return df
             return None
 
+        def dry_run_bigquery(sql: str) -> Union[int, None]:
+            if conn:
+                job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+                job = conn.query(sql, job_config=job_config)
+                return job.total_bytes_processed
+            return None
+
         self.dialect = "BigQuery"
         self.run_sql_is_set = True
         self.run_sql = run_sql_bigquery
+        self.dry_run_sql = dry_run_bigquery
 
     def connect_to_duckdb(self, url: str, init_sql: str = None, **kwargs):
         """
@@ -1978,6 +2718,140 @@ class VannaBase(ABC):
         )
 
 
+    def estimate_sql_cost(self, sql: str) -> dict:
+        """
+        Example:
+        ```python
+        vn.estimate_sql_cost("SELECT * FROM orders")
+        ```
+
+        Estimates what running a SQL query would cost, without running it, using the dialect's dry
+        run or EXPLAIN:
+
+        - BigQuery: bytes processed by a `dry_run` job
+        - Snowflake: bytes assigned by `EXPLAIN USING JSON`
+        - PostgreSQL: total cost and the rows returned or scanned of `EXPLAIN (FORMAT JSON)`
+        - MySQL: query cost and rows examined of `EXPLAIN FORMAT=JSON`
+        - DuckDB: the largest row estimate of `EXPLAIN`
+
+        Scans that a LIMIT stops early (PostgreSQL, DuckDB) do not count towards the rows.
+
+        Args:
+            sql (str): The SQL query to estimate.
+
+        Returns:
+            dict: The estimate with the keys "bytes", "rows" and "cost" (None where the dialect does
+            not report it), or an empty dict if the dialect is not supported.
+        """
+        estimate = {"bytes": None, "rows": None, "cost": None}
+        sql = sql.strip().rstrip(";")
+
+        if self.dialect == "BigQuery" and hasattr(self, "dry_run_sql"):
+            estimate["bytes"] = self.dry_run_sql(sql)
+
+        elif self.dialect == "Snowflake":
+            df = self.run_sql(f"EXPLAIN USING JSON {sql}")
+            plan = json.loads(df.iloc[0, 0])
+            estimate["bytes"] = plan.get("GlobalStats", {}).get("bytesAssigned")
+
+        elif self.dialect == "PostgreSQL":
+            df = self.run_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = df.iloc[0, 0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            root = plan[0]["Plan"]
+            estimate["cost"] = root.get("Total Cost")
+            estimate["rows"] = _postgres_plan_rows(root)
+
+        elif self.dialect == "MySQL":
+            df = self.run_sql(f"EXPLAIN FORMAT=JSON {sql}")
+            query_block = json.loads(df.iloc[0, 0]).get("query_block", {})
+            estimate["cost"] = float(query_block.get("cost_info", {}).get("query_cost", 0))
+            rows = re.findall(r'"rows_examined_per_scan":\s*(\d+)', df.iloc[0, 0])
+            estimate["rows"] = max([int(r) for r in rows], default=None)
+
+        elif self.dialect == "DuckDB":
+            df = self.run_sql(f"EXPLAIN {sql}")
+            estimate["rows"] = _duckdb_plan_rows("\n".join(df.iloc[:, -1].astype(str)))
+
+        else:
+            return {}
+
+        return estimate
+
+    def check_sql_cost(self, sql: str, sql_row_limit: int = -1) -> Tuple[str, str]:
+        """
+        Compares the estimate of [`estimate_sql_cost`][vanna.base.base.VannaBase.estimate_sql_cost]
+        with the budgets in the config before a generated query is run. The guard is off unless at
+        least one budget is set:
+
+        - max_scan_bytes (int): Maximum bytes scanned (BigQuery, Snowflake)
+        - max_scan_rows (int): Maximum estimated rows (PostgreSQL, MySQL, DuckDB)
+        - max_plan_cost (float): Maximum planner cost (PostgreSQL, MySQL)
+        - cost_guard_action (str): What to do with an over-budget query (default "reject"):
+            - "reject": do not run it
+            - "limit": run it wrapped in a `LIMIT cost_guard_limit` (default 1000) query if only
+              max_scan_rows is exceeded, otherwise reject it
+            - "feedback": do not run it, and return the estimate so `ask_adaptive` can ask the LLM
+              for a cheaper query
+
+        Args:
+            sql (str): The SQL query to check.
+            sql_row_limit (int): The row limit of the caller, used as LIMIT by the "limit" action if
+                set.
+
+        Returns:
+            Tuple[str, str]: The (possibly rewritten) SQL query, and an error message if it must not
+            be run.
+        """
+        config = self.config or {}
+        budgets = {
+            "bytes": config.get("max_scan_bytes"),
+            "rows": config.get("max_scan_rows"),
+            "cost": config.get("max_plan_cost"),
+        }
+        if all(budget is None for budget in budgets.values()):
+            return sql, ""
+
+        action = config.get("cost_guard_action", "reject")
+
+        try:
+            estimate = self.estimate_sql_cost(sql)
+        except Exception as e:
+            # an invalid query fails again in run_sql with the database error, which is more useful
+            print(f"{LogTag.ERROR_COST} Failed to estimate the cost of: {sql}\n {str(e)}")
+            return sql, ""
+
+        exceeded = {
+            key: f"estimated {key} {estimate[key]:,} > budget {budget:,}"
+            for key, budget in budgets.items()
+            if budget is not None and estimate.get(key) is not None and estimate[key] > budget
+        }
+        if not exceeded:
+            return sql, ""
+
+        if action == "limit" and list(exceeded) == ["rows"]:
+            # a LIMIT stops a streaming scan early, but it does not reduce the bytes billed by
+            # BigQuery/Snowflake, so only row budgets are rewritten
+            limit = sql_row_limit if sql_row_limit > 0 else config.get("cost_guard_limit", 1000)
+            limited_sql = f"SELECT * FROM ({sql.strip().rstrip(';')}) AS cost_guarded LIMIT {limit}"
+            print(
+                f"{LogTag.ERROR_COST} {exceeded['rows']}, running with LIMIT {limit}: {limited_sql}"
+            )
+            return limited_sql, ""
+
+        err_msg = (
+            f"{LogTag.ERROR_COST} The SQL query was not run because it is too expensive: "
+            f"{'; '.join(exceeded.values())}."
+        )
+        if action == "feedback":
+            err_msg += (
+                " Rewrite the query so that it scans less data,"
+                " e.g. filter on partition or date columns, select only the needed columns,"
+                " or aggregate before joining."
+            )
+        return sql, err_msg
+
     def ask_adaptive(
         self,
         question: Union[str, None] = None,
@@ -2043,6 +2917,9 @@ class VannaBase(ABC):
             if semantic_search or ((not answer.has_error) and (not has_error)):
                 return answer
 
+            if self._is_cost_rejected(err_msg):
+                return answer
+
             if (answer.has_error and "unknown error was encountered" in err_msg):
                 # re-prompt
                 answer = self.ask(question=question,
@@ -2055,7 +2932,7 @@ class VannaBase(ABC):
                                 print_response=print_response, 
                                 use_latest_message=use_latest_message)
                 err_msg, has_error = collect_err_msg(answer)
-                if not answer.has_error and (not has_error):
+                if (not answer.has_error and (not has_error)) or self._is_cost_rejected(err_msg):
                     return answer
 
             # re-prompt
@@ -2075,13 +2952,21 @@ class VannaBase(ABC):
                                 print_prompt=print_prompt, 
                                 print_response=print_response, 
                                 use_latest_message=use_latest_message)
-                if not answer.has_error and (not has_error):
+                err_msg, has_error = collect_err_msg(answer)
+                if (not answer.has_error and (not has_error)) or self._is_cost_rejected(err_msg):
                     break
 
                 time.sleep(sleep_sec)
 
             return answer
 
+    def _is_cost_rejected(self, err_msg: str) -> bool:
+        # over-budget queries are only fed back to the LLM with cost_guard_action="feedback",
+        # a rejected query ends the retries since a regenerated query is just as likely to be
+        # rejected
+        action = (self.config or {}).get("cost_guard_action", "reject")
+        return LogTag.ERROR_COST in err_msg and action == "reject"
+
     def ask(
         self,
         question: Union[str, None] = None,
@@ -2200,14 +3085,21 @@ class VannaBase(ABC):
                 sql = sql[:-1]  # remove last ";" if present
             sql += f" limit {sql_row_limit}"
 
+        # the generated SQL is what is trained on, the guard may run it wrapped in a LIMIT query
+        guarded_sql, err_msg_cost = self.check_sql_cost(sql, sql_row_limit=sql_row_limit)
+        if err_msg_cost:
+            print(err_msg_cost)
+            result_df = (None, ts_delta, err_msg_cost)
+            return AskResult(result_sql, result_df, None, None, True)
+
         try:
             ts_1 = time.time()
-            df = self.run_sql(sql)
+            df = self.run_sql(guarded_sql)
             ts_2 = time.time()
             ts_delta = ts_2 - ts_1
             result_df = (df, ts_delta, None)
         except Exception as e:
-            err_msg_df = f"{LogTag.ERROR_DB} Failed to execute SQL: {sql}\n {str(e)}"
+            err_msg_df = f"{LogTag.ERROR_DB} Failed to execute SQL: {guarded_sql}\n {str(e)}"
             result_df = (None, ts_delta, err_msg_df)
             return AskResult(result_sql, result_df, None, None, True)
 
@@ -2220,6 +3112,7 @@ class VannaBase(ABC):
 
         if df is not None and not df.empty and len(df) > 0 and auto_train:
             self.add_question_sql(question=question, sql=sql)
+            self._maybe_compact_question_sql()
         else:
             err_msg_df = f"{LogTag.ERROR_DF} Invalid dataframe"
             result_df = (df, ts_delta, err_msg_df)
@@ -2317,7 +3210,9 @@ class VannaBase(ABC):
         ```
 
         Train Vanna.AI on a question and its corresponding SQL query.
-        If you call it with no arguments, it will check if you connected to a database and it will attempt to train on the metadata of that database.
+        If you call it with no arguments, it will check if you connected to a database and it will
+        attempt to train on the metadata of that database (for SQLite, DuckDB, PostgreSQL, MySQL and
+        Microsoft SQL Server).
         If you call it with the sql argument, it's equivalent to [`vn.add_question_sql()`][vanna.base.base.VannaBase.add_question_sql].
         If you call it with the ddl argument, it's equivalent to [`vn.add_ddl()`][vanna.base.base.VannaBase.add_ddl].
         If you call it with the documentation argument, it's equivalent to [`vn.add_documentation()`][vanna.base.base.VannaBase.add_documentation].
@@ -2331,6 +3226,18 @@ class VannaBase(ABC):
             plan (TrainingPlan): The training plan to train on.
         """
         DEBUG_FLAG=False
+        if not any((question, sql, ddl, documentation, plan)):
+            if not self.run_sql_is_set:
+                return None
+            if self.dialect not in CATALOG_READERS:
+                print(
+                    f"Schema introspection is not supported for {self.dialect}, "
+                    "pass a training plan instead, "
+                    "e.g. vn.train(plan=vn.get_training_plan_generic(df))"
+                )
+                return None
+            plan = self.get_training_plan_ddl()
+
         if ddl:
             if DEBUG_FLAG: print("\n\nAdding ddl:", ddl)
             return self.add_ddl(strip_brackets(ddl), dataset=dataset)
@@ -2345,13 +3252,124 @@ class VannaBase(ABC):
 
         if plan:
             if DEBUG_FLAG: print("\n\nAdding plan ....")
+            ddls, documentations, question_sql_pairs = [], [], []
             for item in plan._plan:
                 if item.item_type == TrainingPlanItem.ITEM_TYPE_DDL:
-                    self.add_ddl(item.item_value, dataset=dataset)
+                    ddls.append(item.item_value)
                 elif item.item_type == TrainingPlanItem.ITEM_TYPE_IS:
-                    self.add_documentation(item.item_value, dataset=dataset)
+                    documentations.append(item.item_value)
                 elif item.item_type == TrainingPlanItem.ITEM_TYPE_SQL:
-                    self.add_question_sql(question=item.item_name, sql=item.item_value, dataset=dataset)
+                    question_sql_pairs.append((item.item_name, item.item_value))
+
+            # bounded batches keep embedding requests and bulk writes within provider limits
+            batch_size = (self.config or {}).get("train_batch_size", 500)
+            for add_batch, items in [
+                (self.add_ddl_batch, ddls),
+                (self.add_documentation_batch, documentations),
+                (self.add_question_sql_batch, question_sql_pairs),
+            ]:
+                for i in range(0, len(items), batch_size):
+                    add_batch(items[i : i + batch_size], dataset=dataset)
+
+    def _add_plan_item(self, item: TrainingPlanItem, dataset: str = "default") -> Union[str, None]:
+        if item.item_type == TrainingPlanItem.ITEM_TYPE_DDL:
+            return self.add_ddl(item.item_value, dataset=dataset)
+        elif item.item_type == TrainingPlanItem.ITEM_TYPE_IS:
+            return self.add_documentation(item.item_value, dataset=dataset)
+        elif item.item_type == TrainingPlanItem.ITEM_TYPE_SQL:
+            return self.add_question_sql(
+                question=item.item_name, sql=item.item_value, dataset=dataset
+            )
+        return None
+
+    def _get_schema_sync_path(self) -> str:
+        config = self.config or {}
+        return config.get(
+            "schema_sync_path", os.path.join(config.get("path", "."), "schema_sync.json")
+        )
+
+    def sync_schema(
+        self,
+        plan: TrainingPlan,
+        dataset: str = "default",
+        prune: bool = True,
+    ) -> dict:
+        """
+        **Example:**
+        ```python
+        plan = vn.get_training_plan_snowflake(use_historical_queries=False)
+        vn.sync_schema(plan)
+        ```
+
+        Incrementally trains on a training plan. Each plan item is fingerprinted (the column set of
+        the table, plus LAST_ALTERED where the warehouse exposes it) and the fingerprints are stored
+        next to the training data, in config "schema_sync_path" (defaults to `schema_sync.json`
+        under config "path"). On every run only new or changed items are (re-)added, and items of
+        tables that disappeared are removed.
+
+        Args:
+            plan (TrainingPlan): The full training plan, e.g. of a nightly catalog crawl.
+            dataset (str): The dataset the items belong to.
+            prune (bool): Remove previously synced items that are no longer in the plan.
+                Set to False when the plan only covers part of the catalog.
+
+        Returns:
+            dict: The ids of the "added", "updated" and "removed" items, and the number of
+                "unchanged" items.
+        """
+        path = self._get_schema_sync_path()
+        state = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+
+        synced = state.setdefault(dataset, {})
+        result = {"added": [], "updated": [], "removed": [], "unchanged": 0}
+        seen = set()
+
+        # the state is saved after every change and when the run fails, so an interrupted run never
+        # leaves fingerprints of removed items behind, which would make the next run add duplicates
+        try:
+            for item in plan._plan:
+                key = f"{item.item_type}:{item.item_group}.{item.item_name}"
+                fingerprint = item.item_fingerprint or hashlib.sha256(
+                    item.item_value.encode("utf-8")
+                ).hexdigest()
+                seen.add(key)
+
+                previous = synced.get(key)
+                if previous is not None and previous["fingerprint"] == fingerprint:
+                    result["unchanged"] += 1
+                    continue
+
+                if previous is not None and previous.get("id"):
+                    self.remove_training_data(previous["id"])
+                    synced[key] = {"fingerprint": None, "id": None}
+
+                new_id = self._add_plan_item(item, dataset=dataset)
+                synced[key] = {"fingerprint": fingerprint, "id": new_id}
+                self._save_schema_sync_state(path, state)
+                result["updated" if previous is not None else "added"].append(new_id)
+
+            if prune:
+                for key in [key for key in synced if key not in seen]:
+                    stale_id = synced.pop(key).get("id")
+                    if stale_id:
+                        self.remove_training_data(stale_id)
+                        result["removed"].append(stale_id)
+                    self._save_schema_sync_state(path, state)
+        finally:
+            self._save_schema_sync_state(path, state)
+
+        return result
+
+    @staticmethod
+    def _save_schema_sync_state(path: str, state: dict):
+        # write-then-rename so an interrupted run never leaves a truncated state file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
 
     def _get_databases(self) -> List[str]:
         try:
@@ -2373,6 +3391,44 @@ class VannaBase(ABC):
 
         return df_tables
 
+    def get_training_plan_ddl(self, filter_schemas: Union[List[str], None] = None) -> TrainingPlan:
+        """
+        **Example:**
+        ```python
+        vn.connect_to_sqlite("https://vanna.ai/Chinook.sqlite")
+        plan = vn.get_training_plan_ddl()
+        vn.train(plan=plan)
+        ```
+
+        Reads the catalog of the connected database and builds a training plan with one compact DDL
+        statement per table, including primary keys, foreign keys and comments. The catalog is read
+        with a few bulk queries rather than one round trip per table.
+        Supported for SQLite, DuckDB, PostgreSQL, MySQL and Microsoft SQL Server.
+
+        Args:
+            filter_schemas (List[str]): Only include these schemas, if set.
+
+        Returns:
+            TrainingPlan: The training plan.
+        """
+        if self.run_sql_is_set is False:
+            raise ImproperlyConfigured("Please connect to a database first.")
+
+        plan = TrainingPlan([])
+        tables = introspect_ddl(self.run_sql, self.dialect, filter_schemas=filter_schemas)
+        for schema, table, ddl in tables:
+            plan._plan.append(
+                TrainingPlanItem(
+                    item_type=TrainingPlanItem.ITEM_TYPE_DDL,
+                    item_group=schema,
+                    item_name=table,
+                    item_value=ddl,
+                    item_fingerprint=hashlib.sha256(ddl.encode("utf-8")).hexdigest(),
+                )
+            )
+
+        return plan
+
     def get_training_plan_generic(self, df) -> TrainingPlan:
         """
         This method is used to generate a training plan from an information schema dataframe.
@@ -2432,6 +3488,9 @@ class VannaBase(ABC):
                             item_group=f"{database}.{schema}",
                             item_name=table,
                             item_value=doc,
+                            item_fingerprint=fingerprint_table(
+                                df_columns_filtered_to_table, columns=columns[3:]
+                            ),
                         )
                     )
 
@@ -2443,7 +3502,24 @@ class VannaBase(ABC):
         filter_schemas: Union[List[str], None] = None,
         include_information_schema: bool = False,
         use_historical_queries: bool = True,
+        max_workers: Union[int, None] = None,
     ) -> TrainingPlan:
+        """
+        Builds a training plan from the query history and the information schema of every database.
+
+        The databases are introspected in parallel, see `max_workers`.
+
+        Args:
+            filter_databases (List[str]): Only include these databases, if set.
+            filter_schemas (List[str]): Only include these schemas, if set.
+            include_information_schema (bool): Include the INFORMATION_SCHEMA schema.
+            use_historical_queries (bool): Add question/SQL items from the query history.
+            max_workers (int): Number of databases introspected concurrently.
+                Defaults to config "introspection_workers" (8).
+
+        Returns:
+            TrainingPlan: The training plan.
+        """
         plan = TrainingPlan([])
 
         if self.run_sql_is_set is False:
@@ -2497,75 +3573,121 @@ class VannaBase(ABC):
             except Exception as e:
                 print(e)
 
-        databases = self._get_databases()
+        databases = [
+            database
+            for database in self._get_databases()
+            if filter_databases is None or database in filter_databases
+        ]
+
+        if max_workers is None:
+            max_workers = self.config.get("introspection_workers", 8)
+
+        # Each database is introspected on its own worker and a failing database
+        # only loses its own items. Items are collected per database and added in
+        # database order, so the plan does not depend on which worker finishes first.
+        items_by_database = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                executor.submit(
+                    self._get_training_plan_items_snowflake,
+                    database=database,
+                    filter_schemas=filter_schemas,
+                    include_information_schema=include_information_schema,
+                ): database
+                for database in databases
+            }
+
+            for future in as_completed(futures):
+                database = futures[future]
+                try:
+                    items_by_database[database] = future.result()
+                except Exception as e:
+                    print(f"Failed to introspect database {database}: {e}")
 
         for database in databases:
-            if filter_databases is not None and database not in filter_databases:
-                continue
+            plan._plan.extend(items_by_database.get(database, []))
 
-            try:
-                df_tables = self._get_information_schema_tables(database=database)
+        return plan
 
-                print(f"Trying INFORMATION_SCHEMA.COLUMNS for {database}")
-                df_columns = self.run_sql(
-                    f"SELECT * FROM {database}.INFORMATION_SCHEMA.COLUMNS"
-                )
+    def _get_training_plan_items_snowflake(
+        self,
+        database: str,
+        filter_schemas: Union[List[str], None] = None,
+        include_information_schema: bool = False,
+    ) -> List[TrainingPlanItem]:
+        """
+        Builds the information-schema plan items of a single database.
+
+        Args:
+            database (str): The database to introspect.
+            filter_schemas (List[str]): Only include these schemas, if set.
+            include_information_schema (bool): Include the INFORMATION_SCHEMA schema.
 
-                for schema in df_tables["TABLE_SCHEMA"].unique().tolist():
-                    if filter_schemas is not None and schema not in filter_schemas:
-                        continue
+        Returns:
+            List[TrainingPlanItem]: One item per table.
+        """
+        items = []
 
-                    if (
-                        not include_information_schema
-                        and schema == "INFORMATION_SCHEMA"
-                    ):
-                        continue
+        df_tables = self._get_information_schema_tables(database=database)
 
-                    df_columns_filtered_to_schema = df_columns.query(
-                        f"TABLE_SCHEMA == '{schema}'"
-                    )
+        print(f"Trying INFORMATION_SCHEMA.COLUMNS for {database}")
+        df_columns = self.run_sql(
+            f"SELECT * FROM {database}.INFORMATION_SCHEMA.COLUMNS"
+        )
 
-                    try:
-                        tables = (
-                            df_columns_filtered_to_schema["TABLE_NAME"]
-                            .unique()
-                            .tolist()
-                        )
+        schemas = set(df_tables["TABLE_SCHEMA"].unique().tolist())
 
-                        for table in tables:
-                            df_columns_filtered_to_table = (
-                                df_columns_filtered_to_schema.query(
-                                    f"TABLE_NAME == '{table}'"
-                                )
-                            )
-                            doc = f"The following columns are in the {table} table in the {database} database:\n\n"
-                            doc += df_columns_filtered_to_table[
-                                [
-                                    "TABLE_CATALOG",
-                                    "TABLE_SCHEMA",
-                                    "TABLE_NAME",
-                                    "COLUMN_NAME",
-                                    "DATA_TYPE",
-                                    "COMMENT",
-                                ]
-                            ].to_markdown()
-
-                            plan._plan.append(
-                                TrainingPlanItem(
-                                    item_type=TrainingPlanItem.ITEM_TYPE_IS,
-                                    item_group=f"{database}.{schema}",
-                                    item_name=table,
-                                    item_value=doc,
-                                )
-                            )
+        last_altered = {}
+        if "LAST_ALTERED" in df_tables.columns:
+            rows = df_tables[["TABLE_SCHEMA", "TABLE_NAME", "LAST_ALTERED"]]
+            for row in rows.itertuples(index=False):
+                last_altered[(row.TABLE_SCHEMA, row.TABLE_NAME)] = row.LAST_ALTERED
+
+        for (schema, table), df_columns_filtered_to_table in df_columns.groupby(
+            ["TABLE_SCHEMA", "TABLE_NAME"], sort=True
+        ):
+            if schema not in schemas:
+                continue
 
-                    except Exception as e:
-                        print(e)
-                        pass
+            if filter_schemas is not None and schema not in filter_schemas:
+                continue
+
+            if not include_information_schema and schema == "INFORMATION_SCHEMA":
+                continue
+
+            try:
+                doc = (
+                    f"The following columns are in the {table} table "
+                    f"in the {database} database:\n\n"
+                )
+                doc += df_columns_filtered_to_table[
+                    [
+                        "TABLE_CATALOG",
+                        "TABLE_SCHEMA",
+                        "TABLE_NAME",
+                        "COLUMN_NAME",
+                        "DATA_TYPE",
+                        "COMMENT",
+                    ]
+                ].to_markdown()
+
+                items.append(
+                    TrainingPlanItem(
+                        item_type=TrainingPlanItem.ITEM_TYPE_IS,
+                        item_group=f"{database}.{schema}",
+                        item_name=table,
+                        item_value=doc,
+                        item_fingerprint=fingerprint_table(
+                            df_columns_filtered_to_table,
+                            columns=["COLUMN_NAME", "DATA_TYPE", "COMMENT"],
+                            last_altered=last_altered.get((schema, table)),
+                        ),
+                    )
+                )
             except Exception as e:
                 print(e)
 
-        return plan
+        return items
 
     def get_plotly_figure(
         self, plotly_code: str, df: pd.DataFrame, dark_mode: bool = True
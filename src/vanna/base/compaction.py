@@ -0,0 +1,123 @@
+"""
+Deduplication of question-SQL pairs.
+
+`ask(auto_train=True)` stores every successful question-SQL pair, so the sql collection fills up
+with near-identical pairs. Compaction groups the pairs in two steps:
+
+1. By SQL fingerprint: the query with comments removed, whitespace collapsed, keywords and
+   unquoted names lowercased and string and number literals replaced by `?`, so only queries of
+   the same shape are compared.
+2. Within a fingerprint, by cosine similarity of the question embeddings: a pair joins the first
+   cluster whose representative question is at least `similarity_threshold` similar.
+
+Each cluster keeps one representative, the most used or the most recent pair, and the rest is
+removed.
+"""
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import sqlparse
+from sqlparse import tokens as T
+
+KEEP_POLICIES = ("latest", "most_used")
+
+
+def sql_fingerprint(sql: str) -> str:
+    """
+    Normalizes a query so that queries differing only in literals, case, comments or spacing are
+    equal.
+    """
+    parts = []
+    for statement in sqlparse.parse(sql or ""):
+        for token in statement.flatten():
+            if token.is_whitespace or token.ttype in T.Comment:
+                continue
+            if token.ttype in T.Literal.String.Symbol or token.value.startswith(("`", "[")):
+                # quoted identifiers are case sensitive
+                parts.append(token.value)
+            elif token.ttype in T.Literal.String or token.ttype in T.Literal.Number:
+                parts.append("?")
+            else:
+                parts.append(token.value.lower())
+    return " ".join(parts).rstrip(" ;")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def find_duplicates(
+    df: pd.DataFrame,
+    embed: Callable[[List[str]], List[List[float]]],
+    similarity_threshold: float = 0.95,
+    keep: str = "latest",
+    usage: Optional[Dict[Tuple[str, str], int]] = None,
+    new_ids: Optional[set] = None,
+) -> List[str]:
+    """
+    Returns the ids of the question-SQL pairs that duplicate a kept representative.
+
+    Args:
+        df (pd.DataFrame): The sql rows of `get_training_data`, oldest first, with id, question and
+            content columns.
+        embed (Callable): Embeds a list of questions.
+        similarity_threshold (float): Minimum cosine similarity of two questions in one cluster.
+        keep (str): "latest" keeps the most recent pair of a cluster, "most_used" the pair retrieved
+            most often, falling back to the most recent one.
+        usage (dict, optional): Retrieval counts by (question, sql).
+        new_ids (set, optional): Only look at fingerprints with at least one of these ids, for
+            incremental runs.
+
+    Returns:
+        List[str]: The ids to remove.
+    """
+    if keep not in KEEP_POLICIES:
+        raise ValueError(f"Unsupported keep policy: {keep}, expected one of {KEEP_POLICIES}")
+    usage = usage or {}
+
+    groups = defaultdict(list)
+    datasets = df["dataset"] if "dataset" in df.columns else pd.Series("default", index=df.index)
+    pairs = zip(df["id"], df["question"], df["content"], datasets)
+    for position, (id, question, sql, dataset) in enumerate(pairs):
+        groups[(dataset, sql_fingerprint(sql))].append((position, id, question or "", sql))
+    groups = [
+        rows for rows in groups.values()
+        if len(rows) > 1 and (new_ids is None or any(row[1] in new_ids for row in rows))
+    ]
+    if not groups:
+        return []
+
+    # one embedding call for the questions of all candidate groups
+    questions = [row[2] for rows in groups for row in rows]
+    vectors = _normalize(np.asarray(embed(questions), dtype=np.float32))
+
+    duplicates = []
+    offset = 0
+    for rows in groups:
+        group_vectors = vectors[offset:offset + len(rows)]
+        offset += len(rows)
+
+        # newest first, so that the first member of a cluster is its most recent pair
+        order = sorted(range(len(rows)), key=lambda i: rows[i][0], reverse=True)
+        clusters = []
+        for i in order:
+            for cluster in clusters:
+                if float(group_vectors[cluster[0]] @ group_vectors[i]) >= similarity_threshold:
+                    cluster.append(i)
+                    break
+            else:
+                clusters.append([i])
+
+        for cluster in clusters:
+            if keep == "most_used":
+                representative = max(
+                    cluster, key=lambda i: (usage.get((rows[i][2], rows[i][3]), 0), rows[i][0])
+                )
+            else:
+                representative = cluster[0]
+            duplicates.extend(rows[i][1] for i in cluster if i != representative)
+    return duplicates
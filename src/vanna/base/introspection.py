@@ -0,0 +1,376 @@
+"""
+Native schema introspection for the supported SQL connectors.
+
+Every dialect reads its catalog with a handful of bulk queries (columns, tables,
+keys), independent of the number of tables, and normalizes the results into the
+same four frames:
+
+- columns: table_schema, table_name, column_name, data_type, is_nullable,
+  column_comment, ordinal_position
+- tables: table_schema, table_name, table_comment
+- primary keys: table_schema, table_name, column_name, ord
+- foreign keys: table_schema, table_name, constraint_name, column_name,
+  ref_schema, ref_table, ref_column, ord
+
+`build_ddl` then renders one compact `CREATE TABLE` statement per table,
+including primary keys, foreign keys and comments.
+"""
+from typing import Callable, Dict, List, Tuple, Union
+
+import pandas as pd
+
+from ..exceptions import ValidationError
+
+# ----------------- SQLite ----------------- #
+
+SQLITE_COLUMNS_SQL = """
+SELECT 'main' AS table_schema, m.name AS table_name, p.name AS column_name, p.type AS data_type,
+       CASE WHEN p."notnull" = 1 THEN 'NO' ELSE 'YES' END AS is_nullable,
+       NULL AS column_comment, p.cid AS ordinal_position, p.pk AS pk_position
+FROM sqlite_master m JOIN pragma_table_info(m.name) p
+WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+"""
+
+SQLITE_FOREIGN_KEYS_SQL = """
+SELECT 'main' AS table_schema, m.name AS table_name, CAST(f.id AS TEXT) AS constraint_name,
+       f."from" AS column_name, 'main' AS ref_schema, f."table" AS ref_table, f."to" AS ref_column,
+       f.seq AS ord
+FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+"""
+
+# ----------------- DuckDB ----------------- #
+
+DUCKDB_COLUMNS_SQL = """
+SELECT schema_name AS table_schema, table_name, column_name, data_type,
+       CASE WHEN is_nullable THEN 'YES' ELSE 'NO' END AS is_nullable,
+       comment AS column_comment, column_index AS ordinal_position
+FROM duckdb_columns()
+WHERE NOT internal AND database_name = current_database()
+"""
+
+DUCKDB_TABLES_SQL = """
+SELECT schema_name AS table_schema, table_name, comment AS table_comment
+FROM duckdb_tables()
+WHERE NOT internal AND database_name = current_database()
+"""
+
+DUCKDB_CONSTRAINTS_SQL = """
+SELECT schema_name AS table_schema, table_name, constraint_type, constraint_index,
+       constraint_column_names, referenced_table, referenced_column_names
+FROM duckdb_constraints()
+WHERE constraint_type IN ('PRIMARY KEY', 'FOREIGN KEY') AND database_name = current_database()
+"""
+
+# ----------------- PostgreSQL ----------------- #
+
+POSTGRES_COLUMNS_SQL = """
+SELECT n.nspname AS table_schema, cl.relname AS table_name, a.attname AS column_name,
+       format_type(a.atttypid, a.atttypmod) AS data_type,
+       CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END AS is_nullable,
+       col_description(cl.oid, a.attnum) AS column_comment, a.attnum AS ordinal_position
+FROM pg_catalog.pg_attribute a
+JOIN pg_catalog.pg_class cl ON cl.oid = a.attrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = cl.relnamespace
+WHERE cl.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'
+"""
+
+POSTGRES_TABLES_SQL = """
+SELECT n.nspname AS table_schema, cl.relname AS table_name,
+       obj_description(cl.oid, 'pg_class') AS table_comment
+FROM pg_catalog.pg_class cl
+JOIN pg_catalog.pg_namespace n ON n.oid = cl.relnamespace
+WHERE cl.relkind IN ('r', 'p')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'
+"""
+
+POSTGRES_CONSTRAINTS_SQL = """
+SELECT n.nspname AS table_schema, cl.relname AS table_name, con.contype AS constraint_type,
+       con.conname AS constraint_name, a.attname AS column_name,
+       rn.nspname AS ref_schema, rcl.relname AS ref_table, ra.attname AS ref_column, k.ord
+FROM pg_catalog.pg_constraint con
+JOIN pg_catalog.pg_class cl ON cl.oid = con.conrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = cl.relnamespace
+CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+LEFT JOIN pg_catalog.pg_class rcl ON rcl.oid = con.confrelid
+LEFT JOIN pg_catalog.pg_namespace rn ON rn.oid = rcl.relnamespace
+LEFT JOIN pg_catalog.pg_attribute ra
+  ON ra.attrelid = con.confrelid AND ra.attnum = con.confkey[k.ord]
+WHERE con.contype IN ('p', 'f')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+"""
+
+# ----------------- MySQL ----------------- #
+
+MYSQL_COLUMNS_SQL = """
+SELECT TABLE_SCHEMA AS table_schema, TABLE_NAME AS table_name, COLUMN_NAME AS column_name,
+       COLUMN_TYPE AS data_type, IS_NULLABLE AS is_nullable, COLUMN_COMMENT AS column_comment,
+       ORDINAL_POSITION AS ordinal_position
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+MYSQL_TABLES_SQL = """
+SELECT TABLE_SCHEMA AS table_schema, TABLE_NAME AS table_name, TABLE_COMMENT AS table_comment
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+"""
+
+MYSQL_KEYS_SQL = """
+SELECT TABLE_SCHEMA AS table_schema, TABLE_NAME AS table_name, CONSTRAINT_NAME AS constraint_name,
+       COLUMN_NAME AS column_name, REFERENCED_TABLE_SCHEMA AS ref_schema,
+       REFERENCED_TABLE_NAME AS ref_table, REFERENCED_COLUMN_NAME AS ref_column,
+       ORDINAL_POSITION AS ord
+FROM information_schema.KEY_COLUMN_USAGE
+WHERE TABLE_SCHEMA = DATABASE()
+  AND (CONSTRAINT_NAME = 'PRIMARY' OR REFERENCED_TABLE_NAME IS NOT NULL)
+"""
+
+# ----------------- Microsoft SQL Server ----------------- #
+
+MSSQL_COLUMNS_SQL = """
+SELECT s.name AS table_schema, t.name AS table_name, c.name AS column_name, ty.name AS data_type,
+       CASE WHEN c.is_nullable = 1 THEN 'YES' ELSE 'NO' END AS is_nullable,
+       CAST(ep.value AS NVARCHAR(4000)) AS column_comment, c.column_id AS ordinal_position
+FROM sys.tables t
+JOIN sys.schemas s ON s.schema_id = t.schema_id
+JOIN sys.columns c ON c.object_id = t.object_id
+JOIN sys.types ty ON ty.user_type_id = c.user_type_id
+LEFT JOIN sys.extended_properties ep
+  ON ep.class = 1 AND ep.major_id = c.object_id AND ep.minor_id = c.column_id
+  AND ep.name = 'MS_Description'
+WHERE t.is_ms_shipped = 0
+"""
+
+MSSQL_TABLES_SQL = """
+SELECT s.name AS table_schema, t.name AS table_name,
+       CAST(ep.value AS NVARCHAR(4000)) AS table_comment
+FROM sys.tables t
+JOIN sys.schemas s ON s.schema_id = t.schema_id
+LEFT JOIN sys.extended_properties ep
+  ON ep.class = 1 AND ep.major_id = t.object_id AND ep.minor_id = 0 AND ep.name = 'MS_Description'
+WHERE t.is_ms_shipped = 0
+"""
+
+MSSQL_PRIMARY_KEYS_SQL = """
+SELECT s.name AS table_schema, t.name AS table_name, c.name AS column_name, ic.key_ordinal AS ord
+FROM sys.indexes i
+JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+JOIN sys.tables t ON t.object_id = i.object_id
+JOIN sys.schemas s ON s.schema_id = t.schema_id
+WHERE i.is_primary_key = 1 AND t.is_ms_shipped = 0
+"""
+
+MSSQL_FOREIGN_KEYS_SQL = """
+SELECT s.name AS table_schema, t.name AS table_name, fk.name AS constraint_name,
+       c.name AS column_name, rs.name AS ref_schema, rt.name AS ref_table,
+       rc.name AS ref_column, fkc.constraint_column_id AS ord
+FROM sys.foreign_key_columns fkc
+JOIN sys.foreign_keys fk ON fk.object_id = fkc.constraint_object_id
+JOIN sys.tables t ON t.object_id = fkc.parent_object_id
+JOIN sys.schemas s ON s.schema_id = t.schema_id
+JOIN sys.columns c ON c.object_id = fkc.parent_object_id AND c.column_id = fkc.parent_column_id
+JOIN sys.tables rt ON rt.object_id = fkc.referenced_object_id
+JOIN sys.schemas rs ON rs.schema_id = rt.schema_id
+JOIN sys.columns rc
+  ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+"""
+
+PK_COLUMNS = ["table_schema", "table_name", "column_name", "ord"]
+FK_COLUMNS = [
+    "table_schema", "table_name", "constraint_name", "column_name",
+    "ref_schema", "ref_table", "ref_column", "ord",
+]
+
+CatalogFrames = Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]
+
+
+def _lower_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # Some drivers (e.g. Snowflake-style upper-casing) return aliases in upper case.
+    df.columns = [str(c).lower() for c in df.columns]
+    return df
+
+
+def _sqlite_catalog(run_sql: Callable[[str], pd.DataFrame]) -> CatalogFrames:
+    df_columns = _lower_columns(run_sql(SQLITE_COLUMNS_SQL))
+    df_pk = df_columns[df_columns["pk_position"] > 0]
+    df_pk = df_pk.rename(columns={"pk_position": "ord"})[PK_COLUMNS]
+    df_fk = _lower_columns(run_sql(SQLITE_FOREIGN_KEYS_SQL))
+    df_tables = pd.DataFrame(columns=["table_schema", "table_name", "table_comment"])
+    return df_columns, df_tables, df_pk, df_fk
+
+
+def _duckdb_catalog(run_sql: Callable[[str], pd.DataFrame]) -> CatalogFrames:
+    df_columns = _lower_columns(run_sql(DUCKDB_COLUMNS_SQL))
+    df_tables = _lower_columns(run_sql(DUCKDB_TABLES_SQL))
+    df_constraints = _lower_columns(run_sql(DUCKDB_CONSTRAINTS_SQL))
+
+    pk_rows, fk_rows = [], []
+    for row in df_constraints.itertuples(index=False):
+        columns = list(row.constraint_column_names)
+        if row.constraint_type == "PRIMARY KEY":
+            pk_rows += [(row.table_schema, row.table_name, c, i) for i, c in enumerate(columns)]
+        else:
+            ref_columns = list(row.referenced_column_names)
+            fk_rows += [
+                (row.table_schema, row.table_name, str(row.constraint_index), c,
+                 row.table_schema, row.referenced_table, r, i)
+                for i, (c, r) in enumerate(zip(columns, ref_columns))
+            ]
+
+    return (
+        df_columns,
+        df_tables,
+        pd.DataFrame(pk_rows, columns=PK_COLUMNS),
+        pd.DataFrame(fk_rows, columns=FK_COLUMNS),
+    )
+
+
+def _postgres_catalog(run_sql: Callable[[str], pd.DataFrame]) -> CatalogFrames:
+    df_columns = _lower_columns(run_sql(POSTGRES_COLUMNS_SQL))
+    df_tables = _lower_columns(run_sql(POSTGRES_TABLES_SQL))
+    df_constraints = _lower_columns(run_sql(POSTGRES_CONSTRAINTS_SQL))
+    df_pk = df_constraints[df_constraints["constraint_type"] == "p"][PK_COLUMNS]
+    df_fk = df_constraints[df_constraints["constraint_type"] == "f"][FK_COLUMNS]
+    return df_columns, df_tables, df_pk, df_fk
+
+
+def _mysql_catalog(run_sql: Callable[[str], pd.DataFrame]) -> CatalogFrames:
+    df_columns = _lower_columns(run_sql(MYSQL_COLUMNS_SQL))
+    df_tables = _lower_columns(run_sql(MYSQL_TABLES_SQL))
+    df_keys = _lower_columns(run_sql(MYSQL_KEYS_SQL))
+    df_pk = df_keys[df_keys["constraint_name"] == "PRIMARY"][PK_COLUMNS]
+    df_fk = df_keys[df_keys["ref_table"].notna()][FK_COLUMNS]
+    return df_columns, df_tables, df_pk, df_fk
+
+
+def _mssql_catalog(run_sql: Callable[[str], pd.DataFrame]) -> CatalogFrames:
+    return (
+        _lower_columns(run_sql(MSSQL_COLUMNS_SQL)),
+        _lower_columns(run_sql(MSSQL_TABLES_SQL)),
+        _lower_columns(run_sql(MSSQL_PRIMARY_KEYS_SQL)),
+        _lower_columns(run_sql(MSSQL_FOREIGN_KEYS_SQL)),
+    )
+
+
+CATALOG_READERS = {
+    "SQLite": _sqlite_catalog,
+    "DuckDB": _duckdb_catalog,
+    "PostgreSQL": _postgres_catalog,
+    "MySQL": _mysql_catalog,
+    "Microsoft SQL Server": _mssql_catalog,
+}
+
+# Schemas that are implied by the dialect and therefore left out of table names.
+DEFAULT_SCHEMAS = {
+    "SQLite": "main",
+    "DuckDB": "main",
+}
+
+
+def _comment(value) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)) or str(value).strip() == "":
+        return ""
+    return " -- " + " ".join(str(value).split())
+
+
+def build_ddl(
+    df_columns: pd.DataFrame,
+    df_tables: pd.DataFrame,
+    df_pk: pd.DataFrame,
+    df_fk: pd.DataFrame,
+    default_schema: Union[str, None] = None,
+) -> List[Tuple[str, str, str]]:
+    """
+    Renders one compact CREATE TABLE statement per table from normalized catalog frames.
+
+    Args:
+        df_columns (pd.DataFrame): The columns frame.
+        df_tables (pd.DataFrame): The tables frame, used for table comments.
+        df_pk (pd.DataFrame): The primary keys frame.
+        df_fk (pd.DataFrame): The foreign keys frame.
+        default_schema (str): A schema that is not written in front of table names.
+
+    Returns:
+        List[Tuple[str, str, str]]: (schema, table, ddl) tuples sorted by schema and table.
+    """
+
+    def qualify(schema, table):
+        return table if schema == default_schema else f"{schema}.{table}"
+
+    table_comments = {
+        (row.table_schema, row.table_name): row.table_comment
+        for row in df_tables.itertuples(index=False)
+    }
+    primary_keys: Dict[Tuple[str, str], List[str]] = {
+        key: group.sort_values("ord")["column_name"].tolist()
+        for key, group in df_pk.groupby(["table_schema", "table_name"])
+    }
+    foreign_keys: Dict[Tuple[str, str], List[str]] = {}
+    constraints = df_fk.groupby(["table_schema", "table_name", "constraint_name"])
+    for (schema, table, _), group in constraints:
+        group = group.sort_values("ord")
+        ref_columns = [c for c in group["ref_column"].tolist() if c is not None and not pd.isna(c)]
+        ref_table = qualify(group["ref_schema"].iloc[0], group["ref_table"].iloc[0])
+        line = f"FOREIGN KEY ({', '.join(group['column_name'])}) REFERENCES {ref_table}"
+        if ref_columns:
+            line += f"({', '.join(ref_columns)})"
+        foreign_keys.setdefault((schema, table), []).append(line)
+
+    results = []
+    for (schema, table), group in df_columns.groupby(["table_schema", "table_name"], sort=True):
+        lines = []
+        for row in group.sort_values("ordinal_position").itertuples(index=False):
+            not_null = " NOT NULL" if str(row.is_nullable).upper() == "NO" else ""
+            definition = f"{row.column_name} {row.data_type}{not_null}"
+            lines.append((definition, _comment(row.column_comment)))
+
+        if (schema, table) in primary_keys:
+            lines.append((f"PRIMARY KEY ({', '.join(primary_keys[(schema, table)])})", ""))
+
+        lines += [(line, "") for line in foreign_keys.get((schema, table), [])]
+
+        body = "\n".join(
+            f"  {definition}{',' if i < len(lines) - 1 else ''}{comment}"
+            for i, (definition, comment) in enumerate(lines)
+        )
+        table_comment = _comment(table_comments.get((schema, table)))
+        ddl = f"CREATE TABLE {qualify(schema, table)} ({table_comment}\n{body}\n);"
+        results.append((schema, table, ddl))
+
+    return results
+
+
+def introspect_ddl(
+    run_sql: Callable[[str], pd.DataFrame],
+    dialect: str,
+    filter_schemas: Union[List[str], None] = None,
+) -> List[Tuple[str, str, str]]:
+    """
+    Reads the catalog of the connected database and returns compact DDL for every table.
+
+    Args:
+        run_sql (Callable): Runs a SQL statement and returns a dataframe.
+        dialect (str): One of the dialects in `CATALOG_READERS`.
+        filter_schemas (List[str]): Only include these schemas, if set.
+
+    Returns:
+        List[Tuple[str, str, str]]: (schema, table, ddl) tuples.
+    """
+    if dialect not in CATALOG_READERS:
+        raise ValidationError(
+            f"Schema introspection is not supported for {dialect}. "
+            f"Supported: {', '.join(CATALOG_READERS)}"
+        )
+
+    df_columns, df_tables, df_pk, df_fk = CATALOG_READERS[dialect](run_sql)
+
+    if filter_schemas is not None:
+        df_columns = df_columns[df_columns["table_schema"].isin(filter_schemas)]
+
+    return build_ddl(
+        df_columns, df_tables, df_pk, df_fk, default_schema=DEFAULT_SCHEMAS.get(dialect)
+    )
@@ -0,0 +1,143 @@
+"""
+A local BM25 index over the training data.
+
+Small sentence embeddings often miss exact table and column names in a question ("orders_fact",
+"mrr_usd"), which a lexical match finds right away. `BM25Index` is an in-memory inverted index
+that is updated item by item as training data is added and removed, so it works next to any
+vector store. `VannaBase` fuses its hits with the vector results by reciprocal-rank fusion, see
+`vanna.base.relevance.reciprocal_rank_fusion`.
+
+Identifiers are indexed whole and by their parts: `orders_fact` yields `orders_fact`, `orders`
+and `fact`, and `mrrUsd` yields `mrrusd`, `mrr` and `usd`.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+_WORD = re.compile(r"\w+")
+_WORD_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased words of `text`, followed by the snake_case and camelCase parts of compound
+    identifiers.
+    """
+    tokens = []
+    for word in _WORD.findall(text or ""):
+        tokens.append(word.lower())
+        parts = [
+            part.lower()
+            for piece in word.split("_")
+            for part in (_WORD_PART.findall(piece) or [piece])
+            if part
+        ]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over documents of several training data types and datasets.
+
+    Args:
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._terms: Dict[str, List[str]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._documents: Dict[str, Tuple[str, str, Any]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._documents
+
+    def add(self, id: str, text: str, item: Any, training_data_type: str, dataset: str = "default"):
+        """
+        Indexes `text` under `id`, replacing an earlier document with the same id. `item` is what
+        searches return.
+        """
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(id)
+            for term, count in counts.items():
+                self._postings[term][id] = count
+            self._terms[id] = list(counts)
+            self._lengths[id] = sum(counts.values())
+            self._total_length += self._lengths[id]
+            self._documents[id] = (training_data_type, dataset, item)
+
+    def remove(self, id: str) -> bool:
+        with self._lock:
+            return self._remove(id)
+
+    def _remove(self, id: str) -> bool:
+        if id not in self._documents:
+            return False
+        del self._documents[id]
+        self._total_length -= self._lengths.pop(id)
+        for term in self._terms.pop(id):
+            del self._postings[term][id]
+            if not self._postings[term]:
+                del self._postings[term]
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._lengths.clear()
+            self._documents.clear()
+            self._total_length = 0
+
+    def search(
+        self,
+        query: str,
+        training_data_type: Optional[str] = None,
+        dataset: Optional[str] = None,
+        n_results: int = 10,
+    ) -> List[Tuple[Any, float]]:
+        """
+        Returns the (item, score) pairs of the best matching documents, best first. Documents that
+        share no term with the query are left out.
+
+        Args:
+            query (str): The text to search for.
+            training_data_type (str, optional): Only search documents of this type.
+            dataset (str, optional): Only search documents of this dataset.
+            n_results (int): Maximum number of results.
+        """
+        with self._lock:
+            if not self._documents:
+                return []
+            count = len(self._documents)
+            average_length = self._total_length / count or 1.0
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for id, frequency in postings.items():
+                    document_type, document_dataset, _ = self._documents[id]
+                    if training_data_type is not None and document_type != training_data_type:
+                        continue
+                    if dataset is not None and document_dataset != dataset:
+                        continue
+                    norm = self.k1 * (1.0 - self.b + self.b * self._lengths[id] / average_length)
+                    scores[id] += idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+            best = heapq.nlargest(n_results, scores.items(), key=lambda pair: pair[1])
+            return [(self._documents[id][2], score) for id, score in best]
@@ -0,0 +1,96 @@
+"""
+Cutting retrieved context down to the relevant items.
+
+Vector stores return their top `n_results` items per training data type together with a
+similarity score, where higher is more similar (cosine similarity for most stores). Two optional
+filters then shorten each list:
+
+- a score threshold, which drops items scored below it, and
+- adaptive k, which cuts the list at the largest drop between consecutive scores, when that drop
+  is at least `gap`, so that a few clearly relevant items are not followed by a long tail of
+  marginal ones.
+
+Items without a score (stores that do not report one) are never filtered.
+
+With hybrid search, the selected vector results are then merged with BM25 hits by reciprocal-rank
+fusion.
+"""
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+
+def select_relevant(
+    scored: List[Tuple[Any, Optional[float]]],
+    threshold: Optional[float] = None,
+    adaptive_k: bool = False,
+    gap: float = 0.1,
+    min_k: int = 1,
+) -> list:
+    """
+    Returns the items of `scored` that pass the threshold and adaptive k, most similar first.
+
+    Args:
+        scored (List[Tuple[Any, float]]): (item, score) pairs, most similar first.
+        threshold (float, optional): Minimum score of an item.
+        adaptive_k (bool): Cut the list at the largest score drop.
+        gap (float): Minimum score drop that adaptive k cuts at.
+        min_k (int): Number of items adaptive k always keeps.
+
+    Returns:
+        list: The selected items.
+    """
+    if not scored or any(score is None for _, score in scored):
+        return [item for item, _ in scored]
+
+    scored = sorted(scored, key=lambda pair: pair[1], reverse=True)
+    if threshold is not None:
+        scored = [(item, score) for item, score in scored if score >= threshold]
+
+    if adaptive_k and len(scored) > min_k:
+        drops = [scored[i - 1][1] - scored[i][1] for i in range(max(min_k, 1), len(scored))]
+        largest = max(drops)
+        if largest >= gap:
+            scored = scored[: max(min_k, 1) + drops.index(largest)]
+
+    return [item for item, _ in scored]
+
+
+def cosine_distance_to_score(distance: float) -> float:
+    return 1.0 - distance
+
+
+def l2_distance_to_score(distance: float, squared: bool = True) -> float:
+    """Cosine similarity of two normalized vectors from their (squared) Euclidean distance."""
+    return 1.0 - (distance if squared else distance ** 2) / 2.0
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[list],
+    k: int = 60,
+    key: Callable[[Any], Hashable] = None,
+    limit: Optional[int] = None,
+) -> list:
+    """
+    Merges ranked lists by reciprocal-rank fusion: an item scores the sum of 1 / (k + rank) over
+    the lists it is in. Rank-based fusion needs no common score scale, so it combines BM25 and
+    vector similarities directly.
+
+    Args:
+        ranked_lists (List[list]): Lists of items, best first.
+        k (int): Damping constant; larger values weigh the lower ranks more.
+        key (Callable, optional): Identity of an item, for unhashable items. An item found in
+            several lists is returned as it appears in the first one.
+        limit (int, optional): Maximum number of items.
+
+    Returns:
+        list: The fused items, best first.
+    """
+    key = key or (lambda item: item)
+    scores = {}
+    items = {}
+    for ranked in ranked_lists:
+        for rank, item in enumerate(ranked, start=1):
+            item_key = key(item)
+            items.setdefault(item_key, item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [items[item_key] for item_key in fused[:limit]]
@@ -0,0 +1,364 @@
+"""
+A join graph of the trained DDL.
+
+Retrieving DDL by embedding similarity finds the tables a question names, but not the bridge
+tables that connect them, e.g. `order_items` between `orders` and `products`. `SchemaGraph` parses
+each `CREATE TABLE` statement once, when it is trained, into a node with edges to the tables it
+joins:
+
+- declared foreign keys, inline (`customer_id INT REFERENCES customers(id)`) or as table
+  constraints, and
+- inferred `*_id` joins: `customer_id` joins a table named `customer` or `customers`
+  (`categories` for `category_id`) on its single primary key, its `id` column or a column of the
+  same name.
+
+Edges are added and removed table by table as DDL is trained and removed, regardless of the order
+in which the tables of a foreign key arrive. `connect` then links the retrieved tables with
+shortest join paths, one breadth-first search per table, so a lookup costs O(tables + edges).
+"""
+import re
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_CREATE_TABLE = re.compile(
+    r"CREATE\s+(?:OR\s+REPLACE\s+)?"
+    r"(?:(?:GLOBAL\s+|LOCAL\s+)?TEMP(?:ORARY)?\s+|EXTERNAL\s+|TRANSIENT\s+)?"
+    r"TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?((?:\"[^\"]+\"|`[^`]+`|\[[^\]]+\]|[^\s(])+)\s*\(",
+    re.IGNORECASE,
+)
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_IDENTIFIER = r"(?:\"[^\"]+\"|`[^`]+`|\[[^\]]+\]|[^\s(),]+)"
+_PRIMARY_KEY = re.compile(r"(?:CONSTRAINT\s+\S+\s+)?PRIMARY\s+KEY\s*\(([^)]*)\)", re.IGNORECASE)
+_FOREIGN_KEY = re.compile(
+    r"(?:CONSTRAINT\s+\S+\s+)?FOREIGN\s+KEY\s*\(([^)]*)\)\s*"
+    rf"REFERENCES\s+({_IDENTIFIER})\s*(?:\(([^)]*)\))?",
+    re.IGNORECASE,
+)
+_INLINE_REFERENCE = re.compile(rf"\bREFERENCES\s+({_IDENTIFIER})\s*(?:\(([^)]*)\))?", re.IGNORECASE)
+_INLINE_PRIMARY_KEY = re.compile(r"\bPRIMARY\s+KEY\b", re.IGNORECASE)
+_COLUMN = re.compile(rf"({_IDENTIFIER})")
+_CONSTRAINT_PREFIXES = (
+    "constraint",
+    "unique",
+    "check",
+    "index",
+    "key",
+    "exclude",
+    "period",
+    "like",
+    "fulltext",
+)
+# (table, column, referenced table, referenced column, declared)
+_Reference = Tuple[str, str, str, Optional[str], bool]
+
+
+def normalize_name(name: str) -> str:
+    """
+    Lowercases an identifier and strips its quotes, part by part: `"Sales"."Orders"` becomes
+    `sales.orders`.
+    """
+    parts = re.findall(r"\"([^\"]+)\"|`([^`]+)`|\[([^\]]+)\]|([^.\"`\[\]]+)", name.strip())
+    return ".".join(next(part for part in groups if part).lower() for groups in parts)
+
+
+def _names(column_list: str) -> List[str]:
+    return [normalize_name(name) for name in column_list.split(",") if name.strip()]
+
+
+def _split_top_level(body: str) -> List[str]:
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(body):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(body[start:i])
+            start = i + 1
+    parts.append(body[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+@dataclass
+class TableSchema:
+    name: str
+    columns: List[str] = field(default_factory=list)
+    primary_key: List[str] = field(default_factory=list)
+    # (column, referenced table, referenced column or None for the primary key)
+    foreign_keys: List[Tuple[str, str, Optional[str]]] = field(default_factory=list)
+
+
+def table_name(ddl: str) -> Optional[str]:
+    """
+    The normalized name of the table a `CREATE TABLE` statement creates, or None for other
+    statements.
+    """
+    match = _CREATE_TABLE.search(_COMMENTS.sub("", ddl or ""))
+    return normalize_name(match.group(1)) if match else None
+
+
+def parse_ddl(ddl: str) -> Optional[TableSchema]:
+    """
+    Parses the columns, primary key and foreign keys of a `CREATE TABLE` statement, or returns
+    None.
+    """
+    ddl = _COMMENTS.sub("", ddl or "")
+    match = _CREATE_TABLE.search(ddl)
+    if not match:
+        return None
+
+    depth, end = 1, len(ddl)
+    for i in range(match.end(), len(ddl)):
+        depth += {"(": 1, ")": -1}.get(ddl[i], 0)
+        if depth == 0:
+            end = i
+            break
+
+    table = TableSchema(normalize_name(match.group(1)))
+    for part in _split_top_level(ddl[match.end():end]):
+        primary_key = _PRIMARY_KEY.match(part)
+        foreign_key = _FOREIGN_KEY.match(part)
+        if primary_key:
+            table.primary_key = _names(primary_key.group(1))
+        elif foreign_key:
+            ref_table = normalize_name(foreign_key.group(2))
+            ref_columns = _names(foreign_key.group(3) or "")
+            for i, column in enumerate(_names(foreign_key.group(1))):
+                ref_column = ref_columns[i] if i < len(ref_columns) else None
+                table.foreign_keys.append((column, ref_table, ref_column))
+        elif not part.lower().startswith(_CONSTRAINT_PREFIXES):
+            column = normalize_name(_COLUMN.match(part).group(1))
+            table.columns.append(column)
+            if _INLINE_PRIMARY_KEY.search(part):
+                table.primary_key = [column]
+            reference = _INLINE_REFERENCE.search(part)
+            if reference:
+                ref_columns = _names(reference.group(2) or "")
+                ref_column = ref_columns[0] if ref_columns else None
+                table.foreign_keys.append(
+                    (column, normalize_name(reference.group(1)), ref_column)
+                )
+    return table
+
+
+def _bare(name: str) -> str:
+    return name.rsplit(".", 1)[-1]
+
+
+def _schema(name: str) -> Optional[str]:
+    return name.rsplit(".", 1)[0] if "." in name else None
+
+
+def _inferred_targets(column: str) -> List[str]:
+    stem = column[: -len("_id")]
+    targets = [stem, stem + "s", stem + "es"]
+    if stem.endswith("y"):
+        targets.append(stem[:-1] + "ies")
+    return targets
+
+
+class SchemaGraph:
+    """
+    Tables of the trained DDL and the joins between them.
+
+    Example:
+    ```python
+    graph = SchemaGraph()
+    graph.add_ddl("CREATE TABLE orders (id INT PRIMARY KEY, customer_id INT)")
+    graph.add_ddl("CREATE TABLE customers (id INT PRIMARY KEY)")
+    graph.connect(["orders", "customers"])  # ([], ["orders.customer_id = customers.id"])
+    ```
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, Tuple[TableSchema, str]] = {}
+        self._by_bare: Dict[str, set] = defaultdict(set)
+        self._ids: Dict[str, str] = {}
+        self._table_ids: Dict[str, str] = {}
+        # table -> neighbour -> (join condition, declared)
+        self._edges: Dict[str, Dict[str, Tuple[str, bool]]] = defaultdict(dict)
+        # bare name of a referenced table -> references to it, kept for tables that are not
+        # trained yet
+        self._references: Dict[str, List[_Reference]] = defaultdict(list)
+        self._table_references: Dict[str, List[_Reference]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def __contains__(self, table: str) -> bool:
+        return self.resolve(table) is not None
+
+    def ddl(self, table: str) -> Optional[str]:
+        name = self.resolve(table)
+        return self._tables[name][1] if name else None
+
+    def resolve(self, table: str) -> Optional[str]:
+        """The trained table a possibly unqualified name refers to, if it is unambiguous."""
+        if not table:
+            return None
+        name = normalize_name(table)
+        if name in self._tables:
+            return name
+        candidates = self._by_bare.get(_bare(name), ())
+        return next(iter(candidates)) if len(candidates) == 1 else None
+
+    def add_ddl(self, ddl: str, id: Optional[str] = None) -> Optional[str]:
+        """
+        Adds the table of a `CREATE TABLE` statement, replacing an earlier version of it, and links
+        it to the trained tables it joins.
+
+        Returns:
+            str: The table name, or None if `ddl` creates no table.
+        """
+        table = parse_ddl(ddl)
+        if table is None:
+            return None
+        with self._lock:
+            self._remove(table.name)
+            self._tables[table.name] = (table, ddl)
+            self._by_bare[_bare(table.name)].add(table.name)
+            if id is not None:
+                self._ids[id] = table.name
+                self._table_ids[table.name] = id
+
+            declared = {column for column, _, _ in table.foreign_keys}
+            references = [
+                (table.name, column, ref_table, ref_column, True)
+                for column, ref_table, ref_column in table.foreign_keys
+            ]
+            for column in table.columns:
+                if column.endswith("_id") and column not in declared:
+                    references += [
+                        (table.name, column, target, None, False)
+                        for target in _inferred_targets(column)
+                    ]
+
+            self._table_references[table.name] = references
+            for reference in references:
+                self._references[_bare(reference[2])].append(reference)
+                self._link(reference)
+            for reference in self._references.get(_bare(table.name), []):
+                if reference[0] != table.name:
+                    self._link(reference)
+        return table.name
+
+    def remove_id(self, id: str) -> bool:
+        """Removes the table that was added with training data id `id`."""
+        with self._lock:
+            name = self._ids.pop(id, None)
+            if name is None or self._table_ids.get(name) != id:
+                return False
+            return self._remove(name)
+
+    def remove_table(self, table: str) -> bool:
+        with self._lock:
+            name = self.resolve(table)
+            return self._remove(name) if name else False
+
+    def _remove(self, name: str) -> bool:
+        if name not in self._tables:
+            return False
+        del self._tables[name]
+        self._by_bare[_bare(name)].discard(name)
+        if not self._by_bare[_bare(name)]:
+            del self._by_bare[_bare(name)]
+        self._ids.pop(self._table_ids.pop(name, None), None)
+        for neighbour in self._edges.pop(name, {}):
+            self._edges[neighbour].pop(name, None)
+        references = self._table_references.pop(name, [])
+        for target in {_bare(ref_table) for _, _, ref_table, _, _ in references}:
+            self._references[target] = [
+                reference for reference in self._references[target] if reference[0] != name
+            ]
+            if not self._references[target]:
+                del self._references[target]
+        return True
+
+    def _target(self, source: str, ref_table: str) -> Optional[str]:
+        if ref_table in self._tables:
+            return ref_table
+        candidates = self._by_bare.get(_bare(ref_table), set())
+        if len(candidates) == 1:
+            return next(iter(candidates))
+        same_schema = [
+            candidate for candidate in candidates if _schema(candidate) == _schema(source)
+        ]
+        return same_schema[0] if len(same_schema) == 1 else None
+
+    def _link(self, reference: _Reference):
+        source, column, ref_table, ref_column, declared = reference
+        target = self._target(source, ref_table)
+        if target is None or target == source or source not in self._tables:
+            return
+        target_table = self._tables[target][0]
+        if ref_column is None:
+            if len(target_table.primary_key) == 1:
+                ref_column = target_table.primary_key[0]
+            elif "id" in target_table.columns:
+                ref_column = "id"
+            elif column in target_table.columns or declared:
+                ref_column = column
+            else:
+                return
+
+        existing = self._edges[source].get(target)
+        if existing is not None and (existing[1] or not declared):
+            # a declared foreign key wins over an inferred join
+            return
+        condition = f"{source}.{column} = {target}.{ref_column}"
+        self._edges[source][target] = (condition, declared)
+        self._edges[target][source] = (condition, declared)
+
+    def _shortest_path(self, sources: Iterable[str], target: str) -> Optional[List[str]]:
+        parents = {source: None for source in sources}
+        queue = deque(parents)
+        while queue:
+            table = queue.popleft()
+            if table == target:
+                path = []
+                while table is not None:
+                    path.append(table)
+                    table = parents[table]
+                return path[::-1]
+            for neighbour in self._edges.get(table, {}):
+                if neighbour not in parents:
+                    parents[neighbour] = table
+                    queue.append(neighbour)
+        return None
+
+    def connect(
+        self, tables: List[str], max_hops: Optional[int] = None
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Links the given tables with shortest join paths, adding each table in turn to the tables
+        linked so far.
+
+        Args:
+            tables (List[str]): Table names, most relevant first. Unknown tables are skipped.
+            max_hops (int, optional): Maximum number of joins of a path.
+
+        Returns:
+            Tuple[List[str], List[str]]: The bridge tables on the paths that are not in `tables`,
+                in path order, and the join conditions of the paths.
+        """
+        with self._lock:
+            names = list(dict.fromkeys(name for name in map(self.resolve, tables) if name))
+            bridges, conditions = [], []
+            linked = set(names[:1])
+            for name in names[1:]:
+                if name in linked:
+                    continue
+                path = self._shortest_path(linked, name)
+                if path is None or (max_hops is not None and len(path) - 1 > max_hops):
+                    linked.add(name)
+                    continue
+                for left, right in zip(path, path[1:]):
+                    conditions.append(self._edges[left][right][0])
+                bridges += [
+                    table for table in path[1:-1] if table not in linked and table not in names
+                ]
+                linked.update(path)
+            return list(dict.fromkeys(bridges)), conditions
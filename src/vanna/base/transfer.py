@@ -0,0 +1,148 @@
+"""
+Streaming export and import of training data between vector stores.
+
+Training data is written to Parquet in row groups of `batch_size` rows with the columns
+
+| Column | Type |
+| --- | --- |
+| id | string |
+| training_data_type | string (sql, ddl or documentation) |
+| dataset | string |
+| question | string |
+| content | string |
+| embedding | list<float32>, null if the store does not return its vectors |
+
+and the embedding model of the exporting store in the file metadata. Imports read one row group
+at a time and bulk-load it with the `add_*_batch` methods, passing the stored vectors along when
+the embedding model of the importing store matches, so that nothing is embedded twice.
+"""
+import json
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from ..exceptions import DependencyError
+
+FORMAT_VERSION = "1"
+EMBEDDING_MODEL_KEY = b"vanna.embedding_model"
+FORMAT_VERSION_KEY = b"vanna.format_version"
+COLUMNS = ["id", "training_data_type", "dataset", "question", "content", "embedding"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise DependencyError(
+            "pyarrow is not installed. "
+            "Please install it with 'pip install vanna[parquet]' or 'pip install pyarrow'."
+        )
+    return pa, pq
+
+
+def _schema(pa, embedding_model: Optional[str]):
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("training_data_type", pa.string()),
+            ("dataset", pa.string()),
+            ("question", pa.string()),
+            ("content", pa.string()),
+            ("embedding", pa.list_(pa.float32())),
+        ],
+        metadata={
+            EMBEDDING_MODEL_KEY: json.dumps(embedding_model).encode("utf-8"),
+            FORMAT_VERSION_KEY: FORMAT_VERSION.encode("utf-8"),
+        },
+    )
+
+
+def normalize_training_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Brings a `get_training_data` frame into the export columns, with null embeddings."""
+    df = df.copy()
+    for column in COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    df["dataset"] = df["dataset"].fillna("default")
+    df["question"] = df["question"].where(df["question"].notna() & (df["question"] != ""), None)
+    return df[COLUMNS]
+
+
+def export_training_data(vn, path: str, batch_size: int = 1000) -> int:
+    """
+    Writes the training data of a store to a Parquet file, one row group per chunk of `batch_size`
+    rows.
+
+    Returns:
+        int: The number of exported rows.
+    """
+    pa, pq = _pyarrow()
+    schema = _schema(pa, vn.get_embedding_model_name())
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in vn.iter_training_data_with_embeddings(batch_size=batch_size):
+            chunk = normalize_training_data(chunk)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            count += len(chunk)
+    return count
+
+
+def read_embedding_model_name(path: str) -> Optional[str]:
+    _, pq = _pyarrow()
+    metadata = pq.read_schema(path).metadata or {}
+    if EMBEDDING_MODEL_KEY not in metadata:
+        return None
+    return json.loads(metadata[EMBEDDING_MODEL_KEY])
+
+
+def iter_export(path: str, batch_size: int = 1000) -> Iterator[pd.DataFrame]:
+    """Yields the rows of an export as DataFrames of at most `batch_size` rows."""
+    _, pq = _pyarrow()
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=COLUMNS):
+        yield batch.to_pandas()
+
+
+def import_training_data(
+    vn, path: str, batch_size: int = 1000, reuse_embeddings: Optional[bool] = None
+) -> int:
+    """
+    Bulk-loads an export into a store. New ids are assigned by the importing store.
+
+    Args:
+        vn: The importing store.
+        path (str): The Parquet file written by `export_training_data`.
+        batch_size (int): Number of rows read and added at a time.
+        reuse_embeddings (bool, optional): Pass the stored vectors to the store. Defaults to reusing
+            them when both stores name the same embedding model.
+
+    Returns:
+        int: The number of imported rows.
+    """
+    if reuse_embeddings is None:
+        embedding_model = vn.get_embedding_model_name()
+        reuse_embeddings = (
+            embedding_model is not None and embedding_model == read_embedding_model_name(path)
+        )
+
+    count = 0
+    for chunk in iter_export(path, batch_size=batch_size):
+        groups = chunk.groupby(["training_data_type", "dataset"], sort=False)
+        for (training_data_type, dataset), group in groups:
+            kwargs = {"dataset": dataset}
+            if reuse_embeddings and group["embedding"].notna().all():
+                kwargs["embeddings"] = [list(embedding) for embedding in group["embedding"]]
+
+            if training_data_type == "sql":
+                vn.add_question_sql_batch(list(zip(group["question"], group["content"])), **kwargs)
+            elif training_data_type == "ddl":
+                vn.add_ddl_batch(group["content"].tolist(), **kwargs)
+            elif training_data_type == "documentation":
+                vn.add_documentation_batch(group["content"].tolist(), **kwargs)
+            else:
+                print(
+                    f"Skipping {len(group)} rows of unknown training data type {training_data_type}"
+                )
+                continue
+            count += len(group)
+    return count
@@ -2,37 +2,37 @@
 Features
 - [2024-11-23] 
     - add dataset concept support in embedding
+- [2026-10-19]
+    - store dataset and doc_type as metadata, filter with `where` (see migrate_metadata)
 """
 import json
-from typing import List
+from typing import List, Optional, Tuple
 
 import chromadb
 import pandas as pd
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 
-from ..base import VannaBase
+from ..base import VannaBase, relevance
 from ..utils import deterministic_uuid
 
 default_ef = embedding_functions.DefaultEmbeddingFunction()
 
-def filter_collection_by_dataset(dataset, train_data):
-    ids = []
-    documents = []
-    try:
-        doc_list = train_data.get("documents", [])
-        id_list = train_data.get("ids", [])
-        # print(f"doc_list = {doc_list}")
-        for n, doc in enumerate(doc_list):
-            dic = json.loads(doc)
-            if not dic: continue
-            if dic.get("dataset", "") == dataset:
-                ids.append(id_list[n])
-                documents.append(dic)
-    except Exception as e:
-        print(f"[ERROR] filter_collection_by_dataset():\n {str(e)}")
-    return ids, documents
+SCAN_PAGE_SIZE = 1000
 
+def _parse_document(doc: str, doc_type: str) -> dict:
+    """
+    Parses a stored JSON document; plain-text documents of older versions go to the default
+    dataset.
+    """
+    try:
+        dic = json.loads(doc)
+    except (TypeError, ValueError):
+        dic = None
+    if not isinstance(dic, dict):
+        dic = {doc_type: doc}
+    dic.setdefault("dataset", "default")
+    return dic
 
 
 class ChromaDB_VectorStore(VannaBase):
@@ -48,6 +48,8 @@ class ChromaDB_VectorStore(VannaBase):
         self.n_results_sql = config.get("n_results_sql", config.get("n_results", 10))
         self.n_results_documentation = config.get("n_results_documentation", config.get("n_results", 10))
         self.n_results_ddl = config.get("n_results_ddl", config.get("n_results", 10))
+        # one collection for all training data, told apart by the doc_type metadata
+        self.unified_collection = config.get("unified_collection", None)
 
         if curr_client == "persistent":
             self.chroma_client = chromadb.PersistentClient(
@@ -64,27 +66,78 @@ class ChromaDB_VectorStore(VannaBase):
             raise ValueError(f"Unsupported client was set in config: {curr_client}")
 
         self.documentation_collection = self.chroma_client.get_or_create_collection(
-            name="documentation",
+            name=self.unified_collection or "documentation",
             embedding_function=self.embedding_function,
             metadata=collection_metadata,
         )
         self.ddl_collection = self.chroma_client.get_or_create_collection(
-            name="ddl",
+            name=self.unified_collection or "ddl",
             embedding_function=self.embedding_function,
             metadata=collection_metadata,
         )
         self.sql_collection = self.chroma_client.get_or_create_collection(
-            name="sql",
+            name=self.unified_collection or "sql",
             embedding_function=self.embedding_function,
             metadata=collection_metadata,
         )
 
+        # the unified collection is always written with metadata
+        if config.get("migrate_metadata", True) and not self.unified_collection:
+            self.migrate_metadata()
+
+    def migrate_metadata(self, force: bool = False) -> int:
+        """
+        Copies `dataset` and `doc_type` from the JSON documents into Chroma metadata, so that
+        collections written before metadata filtering can be filtered with `where`.
+        Runs on startup; the check is a single-item read once a collection has been migrated.
+
+        Args:
+            force (bool): Scan the collections even if their oldest item already has metadata.
+
+        Returns:
+            int: The number of migrated items.
+        """
+        migrated = 0
+        for doc_type, collection in [
+            ("sql", self.sql_collection),
+            ("ddl", self.ddl_collection),
+            ("documentation", self.documentation_collection),
+        ]:
+            # items are returned in insertion order, so legacy items without metadata come first
+            first = collection.get(limit=1, include=["metadatas"])
+            migrated = not first["ids"] or (first["metadatas"][0] or {}).get("dataset") is not None
+            if not force and migrated:
+                continue
+
+            count = 0
+            for page in self._scan(collection, include=["documents", "metadatas"]):
+                ids, metadatas = [], []
+                for id, doc, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    if (metadata or {}).get("dataset") is not None:
+                        continue
+                    ids.append(id)
+                    metadatas.append({
+                        **(metadata or {}),
+                        "dataset": _parse_document(doc, doc_type)["dataset"],
+                        "doc_type": doc_type,
+                    })
+                if ids:
+                    collection.update(ids=ids, metadatas=metadatas)
+                count += len(ids)
+            if count:
+                print(f"Migrated {count} {doc_type} items to dataset metadata")
+            migrated += count
+        return migrated
+
     def generate_embedding(self, data: str, **kwargs) -> List[float]:
         embedding = self.embedding_function([data])
         if len(embedding) == 1:
             return embedding[0]
         return embedding
 
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        return self.embedding_function(data)
+
     def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
         """Adds a question-SQL pair to the collection with dataset metadata.
         
@@ -121,6 +174,7 @@ class ChromaDB_VectorStore(VannaBase):
         self.sql_collection.add(
             documents=doc_json,
             embeddings=self.generate_embedding(doc_json),
+            metadatas={"dataset": document["dataset"], "doc_type": doc_type},
             ids=doc_id
         )
         
@@ -146,6 +200,7 @@ class ChromaDB_VectorStore(VannaBase):
         self.ddl_collection.add(
             documents=doc_json,
             embeddings=self.generate_embedding(doc_json),
+            metadatas={"dataset": document["dataset"], "doc_type": doc_type},
             ids=doc_id
         )
         
@@ -172,11 +227,101 @@ class ChromaDB_VectorStore(VannaBase):
         self.documentation_collection.add(
             documents=doc_json,
             embeddings=self.generate_embedding(doc_json),
+            metadatas={"dataset": document["dataset"], "doc_type": doc_type},
             ids=doc_id
         )
         
         return doc_id   
 
+    def _add_batch(
+        self,
+        collection,
+        doc_type: str,
+        id_suffix: str,
+        documents: List[dict],
+        embeddings: List[List[float]] = None,
+    ) -> List[str]:
+        """
+        Embeds (unless `embeddings` are given) and upserts documents in chunks of the client's
+        maximum batch size.
+        """
+        docs = {}
+        for i, document in enumerate(documents):
+            doc_json = json.dumps(document, ensure_ascii=False)
+            embedding = embeddings[i] if embeddings else None
+            docs[f"{deterministic_uuid(doc_json)}-{id_suffix}"] = (
+                doc_json, document["dataset"], embedding
+            )
+
+        # ids are deterministic, so duplicates within the batch collapse into one document
+        ids = list(docs.keys())
+        doc_jsons = [doc_json for doc_json, _, _ in docs.values()]
+        metadatas = [{"dataset": dataset, "doc_type": doc_type} for _, dataset, _ in docs.values()]
+        batch_size = self.chroma_client.get_max_batch_size()
+        for i in range(0, len(ids), batch_size):
+            if embeddings:
+                batch_embeddings = [
+                    embedding for _, _, embedding in list(docs.values())[i : i + batch_size]
+                ]
+            else:
+                batch_embeddings = self.generate_embeddings(doc_jsons[i : i + batch_size])
+            collection.upsert(
+                documents=doc_jsons[i : i + batch_size],
+                embeddings=batch_embeddings,
+                metadatas=metadatas[i : i + batch_size],
+                ids=ids[i : i + batch_size],
+            )
+        return ids
+
+    @staticmethod
+    def _keep(items: list, keep: List[bool], embeddings: List[List[float]] = None):
+        """Drops the items (and their embeddings, if given) that are not kept."""
+        items = [item for item, k in zip(items, keep) if k]
+        if embeddings:
+            embeddings = [embedding for embedding, k in zip(embeddings, keep) if k]
+        return items, embeddings
+
+    def add_question_sql_batch(
+        self, question_sql_pairs: List[Tuple[str, str]], **kwargs
+    ) -> List[str]:
+        dataset = kwargs.get("dataset", "default")
+        question_sql_pairs, embeddings = self._keep(
+            question_sql_pairs,
+            [
+                bool(question and question.strip() and sql and sql.strip())
+                for question, sql in question_sql_pairs
+            ],
+            kwargs.get("embeddings"),
+        )
+        documents = [
+            {"dataset": dataset, "question": question, "sql": sql}
+            for question, sql in question_sql_pairs
+        ]
+        return self._add_batch(self.sql_collection, "sql", "sql", documents, embeddings)
+
+    def add_ddl_batch(self, ddls: List[str], **kwargs) -> List[str]:
+        dataset = kwargs.get("dataset", "default")
+        ddls, embeddings = self._keep(
+            ddls, [bool(ddl and ddl.strip()) for ddl in ddls], kwargs.get("embeddings")
+        )
+        documents = [{"dataset": dataset, "ddl": ddl} for ddl in ddls]
+        return self._add_batch(self.ddl_collection, "ddl", "ddl", documents, embeddings)
+
+    def add_documentation_batch(self, documentations: List[str], **kwargs) -> List[str]:
+        dataset = kwargs.get("dataset", "default")
+        documentations, embeddings = self._keep(
+            documentations,
+            [bool(documentation and documentation.strip()) for documentation in documentations],
+            kwargs.get("embeddings"),
+        )
+        documents = [
+            {"dataset": dataset, "documentation": documentation}
+            for documentation in documentations
+        ]
+        return self._add_batch(
+            self.documentation_collection, "documentation", "doc", documents, embeddings
+        )
+
     def search_tables_metadata(self,
                             engine: str = None,
                             catalog: str = None,
@@ -187,88 +332,101 @@ class ChromaDB_VectorStore(VannaBase):
                             **kwargs) -> list:
         return []
 
+    @staticmethod
+    def _scan(collection, where=None, include=None):
+        """
+        Yields the items of a collection page by page, so large collections are never read in one
+        call.
+        """
+        offset = 0
+        while True:
+            page = collection.get(
+                where=where, include=include or [], limit=SCAN_PAGE_SIZE, offset=offset
+            )
+            if not page["ids"]:
+                return
+            yield page
+            if len(page["ids"]) < SCAN_PAGE_SIZE:
+                return
+            offset += len(page["ids"])
+
+    def _delete_where(self, collection, where) -> int:
+        """
+        Deletes the matching items in chunks; always reads the first page, since deleting shifts
+        offsets.
+        """
+        deleted = 0
+        while True:
+            ids = collection.get(where=where, include=[], limit=SCAN_PAGE_SIZE)["ids"]
+            if not ids:
+                return deleted
+            collection.delete(ids=ids)
+            deleted += len(ids)
+
     def get_training_data(self, **kwargs) -> pd.DataFrame:
         df = pd.DataFrame()
         dataset = kwargs.get("dataset", "default")
-        # print(f"get_training_data(): dataset = {dataset}")
-        DEBUG_FLAG = False # True
-        try:
-            # get DDL metadata
-            ddl_data = self.ddl_collection.get()
-            if DEBUG_FLAG: print(f"\n1) ddl_data : {str(ddl_data)}")
-            if ddl_data is not None:
-                # Extract the documents and ids
-                ids, documents = filter_collection_by_dataset(dataset, ddl_data)
-                # documents = [doc for doc in ddl_data["documents"]]
-                # ids = ddl_data["ids"]
 
-                if ids:
-                    # Create a DataFrame
-                    df_ddl = pd.DataFrame(
-                        {
-                            "id": ids,
-                            "dataset": [doc["dataset"] for doc in documents],
-                            "question": [None for doc in documents],
-                            "content": [doc["ddl"] for doc in documents],
-                        }
-                    )
-                    df_ddl["training_data_type"] = "ddl"
-                    df = pd.concat([df, df_ddl])
-        except Exception as e:
-            print(str(e))
-
-        try:
-            # get question/SQL pair
-            sql_data = self.sql_collection.get()
-            if DEBUG_FLAG: print(f"\n2) sql_data : {str(sql_data)}")
-            if sql_data is not None:
-                # Extract the documents and ids
-                ids, documents = filter_collection_by_dataset(dataset, sql_data)
-                # documents = [json.loads(doc) for doc in sql_data["documents"]]
-                # ids = sql_data["ids"]
-
-                if ids:
-                    # Create a DataFrame
-                    df_sql = pd.DataFrame(
+        for training_data_type, collection, question_key in [
+            ("ddl", self.ddl_collection, None),
+            ("sql", self.sql_collection, "question"),
+            ("documentation", self.documentation_collection, None),
+        ]:
+            try:
+                where = self._where(training_data_type, dataset=dataset)
+                for page in self._scan(collection, where=where, include=["documents"]):
+                    documents = [
+                        _parse_document(doc, training_data_type) for doc in page["documents"]
+                    ]
+                    df_data = pd.DataFrame(
                         {
-                            "id": ids,
+                            "id": page["ids"],
                             "dataset": [doc["dataset"] for doc in documents],
-                            "question": [doc["question"] for doc in documents],
-                            "content": [doc["sql"] for doc in documents],
+                            "question": [
+                                doc.get(question_key) if question_key else None
+                                for doc in documents
+                            ],
+                            "content": [doc.get(training_data_type) for doc in documents],
                         }
                     )
-                    df_sql["training_data_type"] = "sql"
-                    df = pd.concat([df, df_sql])
-        except Exception as e:
-            print(str(e))
-
-        try:
-            # get bus_term metadata
-            doc_data = self.documentation_collection.get()
-            if DEBUG_FLAG: print(f"\n3) doc_data : {str(doc_data)}")
-            if doc_data is not None:
-                # Extract the documents and ids
-                ids, documents = filter_collection_by_dataset(dataset, doc_data)
-                # documents = [doc for doc in doc_data["documents"]]
-                # ids = doc_data["ids"]
-
-                if ids:
-                    # Create a DataFrame
-                    df_doc = pd.DataFrame(
-                        {
-                            "id": ids,
-                            "dataset": [doc["dataset"] for doc in documents],
-                            "question": [None for doc in documents],
-                            "content": [doc["documentation"] for doc in documents],
-                        }
-                    )
-                    df_doc["training_data_type"] = "documentation"
-                    df = pd.concat([df, df_doc])
-        except Exception as e:
-            print(str(e))
+                    df_data["training_data_type"] = training_data_type
+                    df = pd.concat([df, df_data])
+            except Exception as e:
+                print(str(e))
 
         return df
 
+    def get_embedding_model_name(self) -> Optional[str]:
+        if (self.config or {}).get("embedding_model"):
+            return self.config["embedding_model"]
+        model_name = getattr(self.embedding_function, "model_name", None)
+        name = type(self.embedding_function).__name__
+        return f"{name}:{model_name}" if model_name else name
+
+    def iter_training_data_with_embeddings(self, batch_size: int = 1000, **kwargs):
+        # all datasets, with the stored vectors; one DataFrame per page of a collection
+        for training_data_type, collection, question_key in [
+            ("sql", self.sql_collection, "question"),
+            ("ddl", self.ddl_collection, None),
+            ("documentation", self.documentation_collection, None),
+        ]:
+            where = self._where(training_data_type)
+            for page in self._scan(collection, where=where, include=["documents", "embeddings"]):
+                documents = [_parse_document(doc, training_data_type) for doc in page["documents"]]
+                yield pd.DataFrame(
+                    {
+                        "id": page["ids"],
+                        "training_data_type": training_data_type,
+                        "dataset": [doc["dataset"] for doc in documents],
+                        "question": [
+                            doc.get(question_key) if question_key else None
+                            for doc in documents
+                        ],
+                        "content": [doc.get(training_data_type) for doc in documents],
+                        "embedding": [list(embedding) for embedding in page["embeddings"]],
+                    }
+                )
+
     def remove_training_data(self, id: str, **kwargs) -> bool:
         if id.endswith("-sql"):
             self.sql_collection.delete(ids=id)
@@ -282,6 +440,28 @@ class ChromaDB_VectorStore(VannaBase):
         else:
             return False
 
+    def remove_training_data_batch(self, ids: List[str], **kwargs) -> int:
+        """
+        Removes many training data items with one delete call per collection and chunk.
+
+        Args:
+            ids (List[str]): The IDs of the training data to remove.
+
+        Returns:
+            int: The number of IDs that belonged to a collection.
+        """
+        removed = 0
+        for suffix, collection in [
+            ("-sql", self.sql_collection),
+            ("-ddl", self.ddl_collection),
+            ("-doc", self.documentation_collection),
+        ]:
+            collection_ids = [id for id in ids if id.endswith(suffix)]
+            for i in range(0, len(collection_ids), SCAN_PAGE_SIZE):
+                collection.delete(ids=collection_ids[i : i + SCAN_PAGE_SIZE])
+            removed += len(collection_ids)
+        return removed
+
     def remove_collections(self, dataset, collection_name=None, ACCEPTED_TYPES = ["sql", "ddl", "documentation"]) -> bool:
         """
         This function is a wrapper to delete multiple collections
@@ -319,32 +499,26 @@ class ChromaDB_VectorStore(VannaBase):
         if collection_name == "sql":
             # self.chroma_client.delete_collection(name="sql")
             self.sql_collection = self.chroma_client.get_or_create_collection(
-                name="sql", embedding_function=self.embedding_function
+                name=self.unified_collection or "sql", embedding_function=self.embedding_function
             )
-            sql_data = self.sql_collection.get()
-            ids, _ = filter_collection_by_dataset(dataset, sql_data)
-            for collection_id in ids:
-                self.remove_training_data(id=collection_id)
+            self._delete_where(self.sql_collection, where=self._where("sql", dataset=dataset))
             return True
         elif collection_name == "ddl":
             # self.chroma_client.delete_collection(name="ddl")
             self.ddl_collection = self.chroma_client.get_or_create_collection(
-                name="ddl", embedding_function=self.embedding_function
+                name=self.unified_collection or "ddl", embedding_function=self.embedding_function
             )
-            ddl_data = self.ddl_collection.get()
-            ids, _ = filter_collection_by_dataset(dataset, ddl_data)
-            for collection_id in ids:
-                self.remove_training_data(id=collection_id)
+            self._delete_where(self.ddl_collection, where=self._where("ddl", dataset=dataset))
             return True
         elif collection_name == "documentation":
             # self.chroma_client.delete_collection(name="documentation")
             self.documentation_collection = self.chroma_client.get_or_create_collection(
-                name="documentation", embedding_function=self.embedding_function
+                name=self.unified_collection or "documentation",
+                embedding_function=self.embedding_function,
+            )
+            self._delete_where(
+                self.documentation_collection, where=self._where("documentation", dataset=dataset)
             )
-            doc_data = self.documentation_collection.get()
-            ids, _ = filter_collection_by_dataset(dataset, doc_data)
-            for collection_id in ids:
-                self.remove_training_data(id=collection_id)
             return True
         else:
             return False
@@ -375,26 +549,118 @@ class ChromaDB_VectorStore(VannaBase):
 
             return documents
 
+    def _where(self, doc_type: str = None, **kwargs):
+        # queries are only scoped when a dataset is asked for, e.g.
+        # vn.generate_sql(question, dataset="sales"), and to a training data type in the unified
+        # collection
+        conditions = []
+        if kwargs.get("dataset"):
+            conditions.append({"dataset": kwargs["dataset"]})
+        if doc_type and self.unified_collection:
+            conditions.append({"doc_type": doc_type})
+        if len(conditions) > 1:
+            return {"$and": conditions}
+        return conditions[0] if conditions else None
+
+    def _distance_to_score(self, collection, distance: float) -> float:
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        if space == "l2":
+            return relevance.l2_distance_to_score(distance)
+        # cosine and ip distances are 1 - similarity
+        return relevance.cosine_distance_to_score(distance)
+
+    def _query_with_scores(
+        self, collection, doc_type: str, question: str, n_results: int, **kwargs
+    ) -> list:
+        query_results = collection.query(
+            query_texts=[question],
+            n_results=n_results,
+            where=self._where(doc_type, **kwargs),
+        )
+        documents = ChromaDB_VectorStore._extract_documents(query_results) or []
+        distances = (query_results.get("distances") or [[]])[0]
+        return [
+            (document, self._distance_to_score(collection, distance))
+            for document, distance in zip(documents, distances)
+        ]
+
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        return self._query_with_scores(
+            self.sql_collection, "sql", question, self.n_results_sql, **kwargs
+        )
+
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return self._query_with_scores(
+            self.ddl_collection, "ddl", question, self.n_results_ddl, **kwargs
+        )
+
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        return self._query_with_scores(
+            self.documentation_collection,
+            "documentation",
+            question,
+            self.n_results_documentation,
+            **kwargs,
+        )
+
+    def get_related_training_data_with_scores(
+        self, question: str, **kwargs
+    ) -> Tuple[list, list, list]:
+        if not self.unified_collection:
+            return super().get_related_training_data_with_scores(question, **kwargs)
+
+        # one query for the sum of the per-type quotas, split by doc_type
+        quotas = {
+            "sql": self.n_results_sql,
+            "ddl": self.n_results_ddl,
+            "documentation": self.n_results_documentation,
+        }
+        collection = self.sql_collection
+        query_embeddings = [self.generate_embedding(question)]
+        query_results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=sum(quotas.values()),
+            where=self._where(**kwargs),
+            include=["documents", "metadatas", "distances"],
+        )
+        results = {doc_type: [] for doc_type in quotas}
+        for doc, metadata, distance in zip(
+            query_results["documents"][0],
+            query_results["metadatas"][0],
+            query_results["distances"][0],
+        ):
+            doc_type = (metadata or {}).get("doc_type")
+            if doc_type in results and len(results[doc_type]) < quotas[doc_type]:
+                score = self._distance_to_score(collection, distance)
+                results[doc_type].append((json.loads(doc), score))
+
+        # a full result may have crowded out a type; only then is that type fetched on its own
+        if len(query_results["ids"][0]) == sum(quotas.values()):
+            for doc_type, quota in quotas.items():
+                if len(results[doc_type]) < quota:
+                    top_up = collection.query(
+                        query_embeddings=query_embeddings,
+                        n_results=quota,
+                        where=self._where(doc_type, **kwargs),
+                    )
+                    results[doc_type] = [
+                        (document, self._distance_to_score(collection, distance))
+                        for document, distance in zip(
+                            ChromaDB_VectorStore._extract_documents(top_up) or [],
+                            top_up["distances"][0],
+                        )
+                    ]
+        return results["sql"], results["ddl"], results["documentation"]
+
     def get_similar_question_sql(self, question: str, **kwargs) -> list:
-        return ChromaDB_VectorStore._extract_documents(
-            self.sql_collection.query(
-                query_texts=[question],
-                n_results=self.n_results_sql,
-            )
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
         )
 
     def get_related_ddl(self, question: str, **kwargs) -> list:
-        return ChromaDB_VectorStore._extract_documents(
-            self.ddl_collection.query(
-                query_texts=[question],
-                n_results=self.n_results_ddl,
-            )
-        )
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
 
     def get_related_documentation(self, question: str, **kwargs) -> list:
-        return ChromaDB_VectorStore._extract_documents(
-            self.documentation_collection.query(
-                query_texts=[question],
-                n_results=self.n_results_documentation,
-            )
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
         )
@@ -1,22 +1,83 @@
-import os 
+import os
 import json
 import uuid
-from typing import List, Dict, Any
+import base64
+import hashlib
+from typing import List
 
 import faiss
 import numpy as np
 import pandas as pd
 
-from ..base import VannaBase
+from ..base import VannaBase, relevance
 from ..exceptions import DependencyError
+from . import metadata as metadata_store
+
+COLLECTIONS = ('sql', 'ddl', 'doc')
+INDEX_TYPES = ('flat', 'hnsw', 'ivf_flat', 'ivf_pq')
+
+
+def create_index(index_type: str, dim: int, metric: str = 'l2', n_vectors: int = 0,
+                 hnsw_m: int = 32, ef_construction: int = 40, nlist: int = None, pq_m: int = 16):
+    """
+    Creates an empty FAISS index (IVF indexes still need to be trained).
+
+    Args:
+        index_type (str): One of 'flat', 'hnsw', 'ivf_flat' or 'ivf_pq'.
+        dim (int): The dimension of the vectors.
+        metric (str): 'l2', or 'ip' for inner product on normalized vectors (cosine similarity).
+        n_vectors (int): The number of vectors the index is built for, used to pick `nlist` for IVF
+            indexes.
+        hnsw_m (int): Neighbors per HNSW node.
+        ef_construction (int): HNSW construction depth.
+        nlist (int): Number of IVF cells, defaults to sqrt(n_vectors).
+        pq_m (int): Number of PQ sub-quantizers, must divide `dim`.
+    """
+    metric_type = faiss.METRIC_INNER_PRODUCT if metric == 'ip' else faiss.METRIC_L2
+    if index_type == 'flat':
+        return faiss.IndexFlat(dim, metric_type)
+    if index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, metric_type)
+        index.hnsw.efConstruction = ef_construction
+        return index
+
+    nlist = nlist or max(1, int(np.sqrt(n_vectors)))
+    quantizer = faiss.IndexFlat(dim, metric_type)
+    if index_type == 'ivf_flat':
+        return faiss.IndexIVFFlat(quantizer, dim, nlist, metric_type)
+    if index_type == 'ivf_pq':
+        return faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, 8, metric_type)
+    raise ValueError(
+        f"Unsupported index type was set in config: {index_type}, expected one of {INDEX_TYPES}"
+    )
+
+
+def _index_ids(index) -> np.ndarray:
+    """Returns the ids stored in an id-mapped flat/HNSW index or an IVF index."""
+    if isinstance(index, faiss.IndexIVF):
+        invlists = index.invlists
+        return np.concatenate([
+            faiss.rev_swig_ptr(invlists.get_ids(i), invlists.list_size(i)).copy()
+            for i in range(index.nlist) if invlists.list_size(i) > 0
+        ] + [np.empty(0, dtype=np.int64)])
+    return faiss.vector_to_array(index.id_map)
+
+
+def _index_ids_and_vectors(index):
+    ids = _index_ids(index)
+    if isinstance(index, faiss.IndexIVF):
+        if not len(ids):
+            return ids, np.empty((0, index.d), dtype=np.float32)
+        return ids, index.reconstruct_batch(ids)
+    return ids, index.index.reconstruct_n(0, index.ntotal)
 
 class FAISS(VannaBase):
     def __init__(self, config=None):
         if config is None:
             config = {}
-        
+
         VannaBase.__init__(self, config=config)
-        
+
         try:
             import faiss
         except ImportError:
@@ -30,59 +91,273 @@ class FAISS(VannaBase):
             raise DependencyError(
                 "SentenceTransformer is not installed. Please install it with 'pip install sentence-transformers'."
             )
-        
+
         self.path = config.get("path", ".")
         self.embedding_dim = config.get('embedding_dim', 384)
         self.n_results_sql = config.get('n_results_sql', config.get("n_results", 10))
         self.n_results_ddl = config.get('n_results_ddl', config.get("n_results", 10))
         self.n_results_documentation = config.get('n_results_documentation', config.get("n_results", 10))
         self.curr_client = config.get("client", "persistent")
+        # stores start with a flat index and switch to index_type once a collection reaches
+        # train_threshold vectors
+        self.index_type = config.get("index_type", "flat")
+        self.metric = config.get("metric", "l2")
+        self.train_threshold = config.get("train_threshold", 10_000)
+        self.index_params = {
+            key: config[key]
+            for key in ("hnsw_m", "ef_construction", "nlist", "pq_m")
+            if key in config
+        }
+        self.nprobe = config.get("nprobe", 8)
+        self.ef_search = config.get("ef_search", 64)
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unsupported index type was set in config: {self.index_type}, "
+                f"expected one of {INDEX_TYPES}"
+            )
+        # persistent stores append every change to a write-ahead log and rewrite the index files
+        # only on checkpoint
+        self.checkpoint_interval = config.get("checkpoint_interval", 1000)
+        self.flush_mode = config.get("flush_mode", "sync")
+        self._wal_records = 0
+        # ids removed from indexes that cannot remove vectors (HNSW) are filtered out of searches,
+        # and the index is rebuilt without them on checkpoint or once they exceed
+        # max_tombstone_ratio of the index
+        self.max_tombstone_ratio = config.get("max_tombstone_ratio", 0.1)
+        self._tombstones = {name: set() for name in COLLECTIONS}
+
+        # metadata lives in SQLite, keyed by the int64 id of the vector in the index
+        self._legacy_files = []
+        self._upgraded = False
+        self._metadata_conn = metadata_store.connect(
+            ":memory:" if self.curr_client == 'in-memory'
+            else os.path.join(self.path, 'metadata.sqlite'),
+            mmap_size=config.get("metadata_mmap_size", 256 * 1024 * 1024),
+        )
+        self.sql_metadata = self._load_or_create_metadata('sql_metadata.json', 'sql', 'sql')
+        self.ddl_metadata = self._load_or_create_metadata('ddl_metadata.json', 'ddl', 'ddl')
+        self.doc_metadata = self._load_or_create_metadata(
+            'doc_metadata.json', 'doc', 'documentation'
+        )
 
         if self.curr_client == 'persistent':
-            self.sql_index = self._load_or_create_index('sql_index.faiss')
-            self.ddl_index = self._load_or_create_index('ddl_index.faiss')
-            self.doc_index = self._load_or_create_index('doc_index.faiss')
+            self.sql_index = self._load_or_create_index('sql_index.faiss', self.sql_metadata)
+            self.ddl_index = self._load_or_create_index('ddl_index.faiss', self.ddl_metadata)
+            self.doc_index = self._load_or_create_index('doc_index.faiss', self.doc_metadata)
         elif self.curr_client == 'in-memory':
-            self.sql_index = faiss.IndexFlatL2(self.embedding_dim)
-            self.ddl_index = faiss.IndexFlatL2(self.embedding_dim)
-            self.doc_index = faiss.IndexFlatL2(self.embedding_dim)
+            self.sql_index = self._create_index()
+            self.ddl_index = self._create_index()
+            self.doc_index = self._create_index()
         elif isinstance(self.curr_client, list) and len(self.curr_client) == 3 and all(isinstance(idx, faiss.Index) for idx in self.curr_client):
-            self.sql_index = self.curr_client[0]
-            self.ddl_index = self.curr_client[1]
-            self.doc_index = self.curr_client[2]
+            self.sql_index = self._to_id_map(self.curr_client[0], self.sql_metadata)
+            self.ddl_index = self._to_id_map(self.curr_client[1], self.ddl_metadata)
+            self.doc_index = self._to_id_map(self.curr_client[2], self.doc_metadata)
         else:
             raise ValueError(f"Unsupported storage type was set in config: {self.curr_client}")
 
-        self.sql_metadata: List[Dict[str, Any]] = self._load_or_create_metadata('sql_metadata.json')
-        self.ddl_metadata: List[Dict[str, str]] = self._load_or_create_metadata('ddl_metadata.json')
-        self.doc_metadata: List[Dict[str, str]] = self._load_or_create_metadata('doc_metadata.json')
+        if self._upgraded:
+            # the converted id-mapped indexes are written before the legacy JSON is moved away,
+            # so the next open never pairs a positional index with the SQLite metadata
+            self.checkpoint()
+        for filepath in self._legacy_files:
+            os.replace(filepath, filepath + '.bak')
+
+        if self.curr_client == 'persistent':
+            replayed = sum(self._replay_wal(name) for name in COLLECTIONS)
+            if replayed:
+                # folds the log into the index files, dropping a torn last record if the process
+                # crashed mid-write
+                self.checkpoint()
+            for name in COLLECTIONS:
+                self._maybe_build_index(name)
+
+        self.embedding_model_name = config.get('embedding_model', 'all-MiniLM-L6-v2')
+        self.embedding_model = SentenceTransformer(self.embedding_model_name)
+
+    @staticmethod
+    def _to_faiss_id(entry_id: str) -> int:
+        # stable positive int64 derived from the string id, so ids survive restarts and rebuilds
+        return int(hashlib.sha256(entry_id.encode("utf-8")).hexdigest()[:15], 16)
+
+    def _create_index(self):
+        return faiss.IndexIDMap2(create_index('flat', self.embedding_dim, self.metric))
+
+    def _to_id_map(self, index, metadata):
+        """
+        Wraps a positional index of an older version, whose n-th vector belongs to the n-th
+        metadata entry.
+        """
+        if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexIVF)):
+            return self._apply_search_params(index)
+        id_map = self._create_index()
+        self._upgraded = True
+        if index.ntotal > 0:
+            vectors = index.reconstruct_n(0, index.ntotal)
+            ids = np.array(list(metadata.keys())[:index.ntotal], dtype=np.int64)
+            id_map.add_with_ids(vectors, ids)
+        return id_map
 
-        model_name = config.get('embedding_model', 'all-MiniLM-L6-v2')
-        self.embedding_model = SentenceTransformer(model_name)
+    def _apply_search_params(self, index):
+        inner = index if isinstance(index, faiss.IndexIVF) else faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            inner.hnsw.efSearch = self.ef_search
+        elif isinstance(inner, faiss.IndexIVF):
+            inner.nprobe = self.nprobe
+        return index
+
+    def _rebuild_index(self, name, exclude_ids=None):
+        """
+        Rebuilds a collection's index from its stored vectors, without its tombstones,
+        as index_type once it has reached train_threshold.
+        """
+        ids, vectors = _index_ids_and_vectors(getattr(self, f'{name}_index'))
+        exclude_ids = list(self._tombstones[name]) + list(exclude_ids or [])
+        if exclude_ids:
+            keep = ~np.isin(ids, np.array(exclude_ids, dtype=np.int64))
+            ids, vectors = ids[keep], vectors[keep]
+        self._tombstones[name].clear()
+
+        index_type = self.index_type if len(ids) >= self.train_threshold else 'flat'
+        inner = create_index(
+            index_type, self.embedding_dim, self.metric, n_vectors=len(ids), **self.index_params
+        )
+        if not inner.is_trained:
+            inner.train(vectors)
+        if isinstance(inner, faiss.IndexIVF):
+            # IVF lists store the ids themselves; an id map would go out of sync on removal,
+            # the hashtable lets single vectors be removed and reconstructed by id
+            inner.set_direct_map_type(faiss.DirectMap.Hashtable)
+            new_index = inner
+        else:
+            new_index = faiss.IndexIDMap2(inner)
+        if len(ids):
+            new_index.add_with_ids(vectors, ids)
+        setattr(self, f'{name}_index', self._apply_search_params(new_index))
+
+    def _maybe_build_index(self, name):
+        index = getattr(self, f'{name}_index')
+        if (self.index_type != 'flat' and index.ntotal >= self.train_threshold
+                and isinstance(index, faiss.IndexIDMap2)
+                and isinstance(faiss.downcast_index(index.index), faiss.IndexFlat)):
+            self._rebuild_index(name)
+            print(f"Built {self.index_type} index for {name} with {index.ntotal} vectors")
+            self.checkpoint()
+
+    def _remove_ids(self, name, faiss_ids):
+        index = getattr(self, f'{name}_index')
+        try:
+            index.remove_ids(np.array(faiss_ids, dtype=np.int64))
+        except RuntimeError:
+            # HNSW graphs do not support removal, the vectors stay in the graph as tombstones until
+            # the next rebuild
+            self._tombstones[name].update(int(faiss_id) for faiss_id in faiss_ids)
+            if len(self._tombstones[name]) > self.max_tombstone_ratio * index.ntotal:
+                self._rebuild_index(name)
 
-    def _load_or_create_index(self, filename):
+    def _load_or_create_index(self, filename, metadata):
         filepath = os.path.join(self.path, filename)
         if os.path.exists(filepath):
-            return faiss.read_index(filepath)
-        return faiss.IndexFlatL2(self.embedding_dim)
+            return self._to_id_map(faiss.read_index(filepath), metadata)
+        return self._create_index()
 
-    def _load_or_create_metadata(self, filename):
+    def _load_or_create_metadata(self, filename, table, content_key):
+        metadata = metadata_store.SQLiteMetadata(self._metadata_conn, table, content_key)
         filepath = os.path.join(self.path, filename)
-        if os.path.exists(filepath):
+        if self.curr_client != 'in-memory' and os.path.exists(filepath):
+            # JSON metadata of older versions is imported once, in order, and kept as a backup
             with open(filepath, 'r') as f:
-                return json.load(f)
-        return []
+                metadata.set_many({self._to_faiss_id(item["id"]): item for item in json.load(f)})
+            self._legacy_files.append(filepath)
+        return metadata
+
+    @staticmethod
+    def _replace_file(tmp_filepath, filepath):
+        with open(tmp_filepath, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_filepath, filepath)
 
     def _save_index(self, index, filename):
         if self.curr_client == 'persistent':
             filepath = os.path.join(self.path, filename)
-            faiss.write_index(index, filepath)
+            faiss.write_index(index, filepath + '.tmp')
+            self._replace_file(filepath + '.tmp', filepath)
 
-    def _save_metadata(self, metadata, filename):
-        if self.curr_client == 'persistent':
-            filepath = os.path.join(self.path, filename)
-            with open(filepath, 'w') as f:
-                json.dump(metadata, f)
+    def _wal_path(self, name):
+        return os.path.join(self.path, f'{name}.wal')
+
+    def _log(self, name, records):
+        if self.curr_client != 'persistent':
+            return
+        with open(self._wal_path(name), 'a') as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            if self.flush_mode == "sync":
+                f.flush()
+                os.fsync(f.fileno())
+        self._wal_records += len(records)
+        if self.checkpoint_interval and self._wal_records >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def _replay_wal(self, name) -> int:
+        """
+        Re-applies the logged changes on top of the last checkpoint. Adds and removes are checked
+        against the ids in the index, so a crash between writing the index and truncating the log
+        is harmless.
+        """
+        wal_path = self._wal_path(name)
+        if not os.path.exists(wal_path):
+            return 0
+        index, metadata = getattr(self, f'{name}_index'), getattr(self, f'{name}_metadata')
+        index_ids = set(_index_ids(index).tolist())
+        replayed = 0
+        with open(wal_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                faiss_id = record["faiss_id"]
+                if record["op"] == "add":
+                    if faiss_id not in index_ids:
+                        vector = np.frombuffer(base64.b64decode(record["vector"]), dtype=np.float32)
+                        ids = np.array([faiss_id], dtype=np.int64)
+                        index.add_with_ids(vector.reshape(1, -1), ids)
+                        index_ids.add(faiss_id)
+                    metadata[faiss_id] = record["metadata"]
+                elif record["op"] == "remove":
+                    if faiss_id in index_ids:
+                        self._remove_ids(name, [faiss_id])
+                        index = getattr(self, f'{name}_index')
+                        index_ids.discard(faiss_id)
+                    metadata.pop(faiss_id, None)
+                replayed += 1
+        return replayed
+
+    def checkpoint(self):
+        """
+        Writes the indexes to disk with an atomic rename and truncates the write-ahead logs
+        (metadata is committed to SQLite as it changes).
+        Runs automatically every `checkpoint_interval` logged changes (default 1000, 0 to disable).
+        """
+        if self.curr_client != 'persistent':
+            return
+        for name in COLLECTIONS:
+            if self._tombstones[name]:
+                self._rebuild_index(name)
+            self._save_index(getattr(self, f'{name}_index'), f'{name}_index.faiss')
+            open(self._wal_path(name), 'w').close()
+        self._wal_records = 0
+
+    def flush(self):
+        """
+        Forces logged changes to disk. With `flush_mode="batch"` writes are not fsynced one by one,
+        which makes bulk loads faster; call this (or `checkpoint`) at the end of the load.
+        """
+        if self.curr_client != 'persistent':
+            return
+        for name in COLLECTIONS:
+            if os.path.exists(self._wal_path(name)):
+                with open(self._wal_path(name), 'a') as f:
+                    os.fsync(f.fileno())
 
     def generate_embedding(self, data: str, **kwargs) -> List[float]:
         embedding = self.embedding_model.encode(data)
@@ -90,87 +365,173 @@ class FAISS(VannaBase):
             f"Embedding dimension mismatch: expected {self.embedding_dim}, got {embedding.shape[0]}"
         return embedding.tolist()
 
-    def _add_to_index(self, index, metadata_list, text, extra_metadata=None) -> str:
-        embedding = self.generate_embedding(text)
-        index.add(np.array([embedding], dtype=np.float32))
-        entry_id = str(uuid.uuid4())
-        metadata_list.append({"id": entry_id, **(extra_metadata or {})})
-        return entry_id
-    
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        return self.embedding_model.encode(data, batch_size=64).tolist()
+
+    def _add_batch_to_index(self, name, texts, extra_metadata_list, embeddings=None) -> List[str]:
+        if not texts:
+            return []
+        index, metadata = getattr(self, f'{name}_index'), getattr(self, f'{name}_metadata')
+        entry_ids = [str(uuid.uuid4()) for _ in texts]
+        faiss_ids = [self._to_faiss_id(entry_id) for entry_id in entry_ids]
+        vectors = np.array(embeddings or self.generate_embeddings(texts), dtype=np.float32)
+        if self.metric == 'ip':
+            faiss.normalize_L2(vectors)
+        index.add_with_ids(vectors, np.array(faiss_ids, dtype=np.int64))
+
+        entries = {
+            faiss_id: {"id": entry_id, **extra_metadata}
+            for faiss_id, entry_id, extra_metadata in zip(faiss_ids, entry_ids, extra_metadata_list)
+        }
+        # logged before the metadata is committed, so a crash in between is repaired by the replay
+        self._log(name, [
+            {
+                "op": "add",
+                "faiss_id": faiss_id,
+                "vector": base64.b64encode(vector.tobytes()).decode("ascii"),
+                "metadata": entries[faiss_id],
+            }
+            for faiss_id, vector in zip(faiss_ids, vectors)
+        ])
+        metadata.set_many(entries)
+        self._maybe_build_index(name)
+        return entry_ids
+
+    def add_question_sql_batch(self, question_sql_pairs, **kwargs) -> List[str]:
+        return self._add_batch_to_index(
+            'sql',
+            [question + " " + sql for question, sql in question_sql_pairs],
+            [{"question": question, "sql": sql} for question, sql in question_sql_pairs],
+            kwargs.get("embeddings"),
+        )
+
+    def add_ddl_batch(self, ddls: List[str], **kwargs) -> List[str]:
+        return self._add_batch_to_index(
+            'ddl', ddls, [{"ddl": ddl} for ddl in ddls], kwargs.get("embeddings")
+        )
+
+    def add_documentation_batch(self, documentations: List[str], **kwargs) -> List[str]:
+        return self._add_batch_to_index(
+            'doc',
+            documentations,
+            [{"documentation": doc} for doc in documentations],
+            kwargs.get("embeddings"),
+        )
+
     def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
-        entry_id = self._add_to_index(self.sql_index, self.sql_metadata, question + " " + sql, {"question": question, "sql": sql})
-        self._save_index(self.sql_index, 'sql_index.faiss')
-        self._save_metadata(self.sql_metadata, 'sql_metadata.json')
-        return entry_id
+        return self.add_question_sql_batch([(question, sql)])[0]
 
     def add_ddl(self, ddl: str, **kwargs) -> str:
-        entry_id = self._add_to_index(self.ddl_index, self.ddl_metadata, ddl, {"ddl": ddl})
-        self._save_index(self.ddl_index, 'ddl_index.faiss')
-        self._save_metadata(self.ddl_metadata, 'ddl_metadata.json')
-        return entry_id
+        return self.add_ddl_batch([ddl])[0]
 
     def add_documentation(self, documentation: str, **kwargs) -> str:
-        entry_id = self._add_to_index(self.doc_index, self.doc_metadata, documentation, {"documentation": documentation})
-        self._save_index(self.doc_index, 'doc_index.faiss')
-        self._save_metadata(self.doc_metadata, 'doc_metadata.json')
-        return entry_id
+        return self.add_documentation_batch([documentation])[0]
+
+    def _get_similar_with_scores(self, name, text, n_results) -> list:
+        index, metadata = getattr(self, f'{name}_index'), getattr(self, f'{name}_metadata')
+        tombstones = self._tombstones[name]
+        embedding = np.array([self.generate_embedding(text)], dtype=np.float32)
+        if self.metric == 'ip':
+            faiss.normalize_L2(embedding)
+        D, I = index.search(embedding, k=n_results + len(tombstones))
+        hits = [
+            (int(i), float(d)) for d, i in zip(D[0], I[0]) if i != -1 and int(i) not in tombstones
+        ][:n_results]
+        scores = {
+            i: d if self.metric == 'ip' else relevance.l2_distance_to_score(d)
+            for i, d in hits
+        }
+        entries = metadata.get_many(list(scores))
+        return [(entry, scores[self._to_faiss_id(entry["id"])]) for entry in entries]
+
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        return self._get_similar_with_scores('sql', question, self.n_results_sql)
 
-    def _get_similar(self, index, metadata_list, text, n_results) -> list:
-        embedding = self.generate_embedding(text)
-        D, I = index.search(np.array([embedding], dtype=np.float32), k=n_results)
-        return [] if len(I[0]) == 0 or I[0][0] == -1 else [metadata_list[i] for i in I[0]]
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return [
+            (entry["ddl"], score)
+            for entry, score in self._get_similar_with_scores('ddl', question, self.n_results_ddl)
+        ]
+
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        return [
+            (entry["documentation"], score)
+            for entry, score in self._get_similar_with_scores(
+                'doc', question, self.n_results_documentation
+            )
+        ]
 
     def get_similar_question_sql(self, question: str, **kwargs) -> list:
-        return self._get_similar(self.sql_index, self.sql_metadata, question, self.n_results_sql)
-    
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), 'sql'
+        )
+
     def get_related_ddl(self, question: str, **kwargs) -> list:
-        return [metadata["ddl"] for metadata in self._get_similar(self.ddl_index, self.ddl_metadata, question, self.n_results_ddl)]
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), 'ddl')
 
     def get_related_documentation(self, question: str, **kwargs) -> list:
-        return [metadata["documentation"] for metadata in self._get_similar(self.doc_index, self.doc_metadata, question, self.n_results_documentation)]
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), 'documentation'
+        )
 
     def get_training_data(self, **kwargs) -> pd.DataFrame:
-        sql_data = pd.DataFrame(self.sql_metadata)
+        sql_data = self.sql_metadata.to_frame()
         sql_data['training_data_type'] = 'sql'
 
-        ddl_data = pd.DataFrame(self.ddl_metadata)
+        ddl_data = self.ddl_metadata.to_frame()
         ddl_data['training_data_type'] = 'ddl'
 
-        doc_data = pd.DataFrame(self.doc_metadata)
+        doc_data = self.doc_metadata.to_frame()
         doc_data['training_data_type'] = 'documentation'
 
         return pd.concat([sql_data, ddl_data, doc_data], ignore_index=True)
 
-    def remove_training_data(self, id: str, **kwargs) -> bool:
-        for metadata_list, index, index_name in [
-            (self.sql_metadata, self.sql_index, 'sql_index.faiss'),
-            (self.ddl_metadata, self.ddl_index, 'ddl_index.faiss'),
-            (self.doc_metadata, self.doc_index, 'doc_index.faiss')
+    def get_embedding_model_name(self):
+        return self.embedding_model_name
+
+    def iter_training_data_with_embeddings(self, batch_size: int = 1000, **kwargs):
+        for name, training_data_type, content_key in [
+            ('sql', 'sql', 'sql'), ('ddl', 'ddl', 'ddl'), ('doc', 'documentation', 'documentation')
         ]:
-            for i, item in enumerate(metadata_list):
-                if item['id'] == id:
-                    del metadata_list[i]
-                    new_index = faiss.IndexFlatL2(self.embedding_dim)
-                    embeddings = [self.generate_embedding(json.dumps(m)) for m in metadata_list]
-                    if embeddings:
-                        new_index.add(np.array(embeddings, dtype=np.float32))
-                    setattr(self, index_name.split('.')[0], new_index)
-                    
-                    if self.curr_client == 'persistent':
-                        self._save_index(new_index, index_name)
-                        self._save_metadata(metadata_list, f"{index_name.split('.')[0]}_metadata.json")
-                    
-                    return True
+            metadata = getattr(self, f'{name}_metadata')
+            faiss_ids, vectors = _index_ids_and_vectors(getattr(self, f'{name}_index'))
+            for start in range(0, len(faiss_ids), batch_size):
+                chunk_ids = faiss_ids[start:start + batch_size].tolist()
+                entries = {
+                    self._to_faiss_id(entry["id"]): entry for entry in metadata.get_many(chunk_ids)
+                }
+                chunk_vectors = vectors[start:start + batch_size]
+                rows = [(entries[faiss_id], vector)
+                        for faiss_id, vector in zip(chunk_ids, chunk_vectors)
+                        if faiss_id in entries]
+                yield pd.DataFrame({
+                    "id": [entry["id"] for entry, _ in rows],
+                    "training_data_type": training_data_type,
+                    "dataset": "default",
+                    "question": [entry.get("question") for entry, _ in rows],
+                    "content": [entry[content_key] for entry, _ in rows],
+                    "embedding": [vector.tolist() for _, vector in rows],
+                })
+
+    def remove_training_data(self, id: str, **kwargs) -> bool:
+        faiss_id = self._to_faiss_id(id)
+        for name in COLLECTIONS:
+            metadata = getattr(self, f'{name}_metadata')
+            if faiss_id in metadata:
+                self._remove_ids(name, [faiss_id])
+                self._log(name, [{"op": "remove", "faiss_id": faiss_id}])
+                del metadata[faiss_id]
+                return True
         return False
 
     def remove_collection(self, collection_name: str) -> bool:
-        if collection_name in ["sql", "ddl", "documentation"]:
-            setattr(self, f"{collection_name}_index", faiss.IndexFlatL2(self.embedding_dim))
-            setattr(self, f"{collection_name}_metadata", [])
-            
-            if self.curr_client == 'persistent':
-                self._save_index(getattr(self, f"{collection_name}_index"), f"{collection_name}_index.faiss")
-                self._save_metadata([], f"{collection_name}_metadata.json")
-            
+        names = {"sql": "sql", "ddl": "ddl", "documentation": "doc"}
+        if collection_name in names:
+            name = names[collection_name]
+            setattr(self, f"{name}_index", self._create_index())
+            getattr(self, f"{name}_metadata").clear()
+            self._tombstones[name].clear()
+
+            self.checkpoint()
             return True
-        return False
\ No newline at end of file
+        return False
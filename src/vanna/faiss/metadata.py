@@ -0,0 +1,120 @@
+import sqlite3
+from collections.abc import MutableMapping
+from typing import Dict, List
+
+import pandas as pd
+
+
+def connect(path: str, mmap_size: int = 256 * 1024 * 1024) -> sqlite3.Connection:
+    """
+    Opens the metadata database of a FAISS store. File databases are memory-mapped and use WAL
+    journaling, so processes serving the same store share its pages and readers do not block the
+    writer.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    if path != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+        # the store's own write-ahead log replays metadata of the last changes, so commits need
+        # not be fsynced
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    return conn
+
+
+class SQLiteMetadata(MutableMapping):
+    """
+    The metadata of one FAISS collection, as a mapping from the int64 id of a vector to its entry,
+    e.g. `{"id": ..., "question": ..., "sql": ...}`. Entries are read from SQLite on access
+    instead of being held in memory, and iterate in insertion order.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str, content_key: str):
+        self.conn = conn
+        self.table = table
+        self.content_key = content_key
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " faiss_id INTEGER NOT NULL UNIQUE,"
+            " id TEXT NOT NULL,"
+            " question TEXT,"
+            " content TEXT)"
+        )
+        self.conn.commit()
+
+    def _to_entry(self, row) -> dict:
+        id, question, content = row
+        if self.content_key == "sql":
+            return {"id": id, "question": question, "sql": content}
+        return {"id": id, self.content_key: content}
+
+    def __getitem__(self, faiss_id) -> dict:
+        row = self.conn.execute(
+            f"SELECT id, question, content FROM {self.table} WHERE faiss_id = ?", (int(faiss_id),)
+        ).fetchone()
+        if row is None:
+            raise KeyError(faiss_id)
+        return self._to_entry(row)
+
+    def get_many(self, faiss_ids) -> List[dict]:
+        """Returns the entries of the given ids in the given order, skipping unknown ids."""
+        faiss_ids = [int(faiss_id) for faiss_id in faiss_ids]
+        if not faiss_ids:
+            return []
+        rows = self.conn.execute(
+            f"SELECT faiss_id, id, question, content FROM {self.table}"
+            f" WHERE faiss_id IN ({','.join('?' * len(faiss_ids))})",
+            faiss_ids,
+        ).fetchall()
+        entries = {row[0]: self._to_entry(row[1:]) for row in rows}
+        return [entries[faiss_id] for faiss_id in faiss_ids if faiss_id in entries]
+
+    def set_many(self, entries: Dict[int, dict]):
+        self.conn.executemany(
+            f"INSERT INTO {self.table} (faiss_id, id, question, content) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(faiss_id) DO UPDATE SET"
+            " id = excluded.id, question = excluded.question, content = excluded.content",
+            [
+                (int(faiss_id), entry["id"], entry.get("question"), entry.get(self.content_key))
+                for faiss_id, entry in entries.items()
+            ],
+        )
+        self.conn.commit()
+
+    def __setitem__(self, faiss_id, entry: dict):
+        self.set_many({faiss_id: entry})
+
+    def __delitem__(self, faiss_id):
+        cursor = self.conn.execute(f"DELETE FROM {self.table} WHERE faiss_id = ?", (int(faiss_id),))
+        self.conn.commit()
+        if cursor.rowcount == 0:
+            raise KeyError(faiss_id)
+
+    def __contains__(self, faiss_id) -> bool:
+        return self.conn.execute(
+            f"SELECT 1 FROM {self.table} WHERE faiss_id = ?", (int(faiss_id),)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        for (faiss_id,) in self.conn.execute(f"SELECT faiss_id FROM {self.table} ORDER BY seq"):
+            yield faiss_id
+
+    def __len__(self) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def values(self) -> List[dict]:
+        rows = self.conn.execute(
+            f"SELECT id, question, content FROM {self.table} ORDER BY seq"
+        ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def clear(self):
+        self.conn.execute(f"DELETE FROM {self.table}")
+        self.conn.commit()
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.read_sql_query(
+            f"SELECT id, question, content AS {self.content_key} FROM {self.table} ORDER BY seq",
+            self.conn,
+        )
+        return df if self.content_key == "sql" else df.drop(columns=["question"])
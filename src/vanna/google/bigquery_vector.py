@@ -1,7 +1,7 @@
 import datetime
 import os
 import uuid
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from vertexai.language_models import (
   TextEmbeddingInput,
   TextEmbeddingModel
@@ -12,14 +12,44 @@ from google.cloud import bigquery
 
 from ..base import VannaBase
 
+LOAD_BATCH_SIZE = 10_000
+EMBEDDING_BATCH_SIZE = 250
+VECTOR_INDEX_MIN_ROWS = 5_000
+
 
 class BigQuery_VectorStore(VannaBase):
+    """
+    Vectorstore using a BigQuery table and VECTOR_SEARCH.
+
+    Args:
+        config (dict): Configuration dictionary.
+            - project_id (str, optional): Google Cloud project. Defaults to the
+              GOOGLE_CLOUD_PROJECT environment variable.
+            - client (bigquery.Client, optional): BigQuery client. Defaults to a client of
+              `project_id`.
+            - bigquery_dataset_name (str, optional): Dataset of the training data table.
+              Defaults to "vanna_managed".
+            - n_results, n_results_sql, n_results_ddl, n_results_documentation (int, optional):
+              Top-k of the searches. Defaults to 10.
+            - vector_index (bool, optional): Create an IVF vector index on the embeddings and
+              search it. BigQuery builds the index once the table has 5000 rows and searches by
+              brute force until then. Defaults to True.
+            - vector_index_num_lists (int, optional): Number of IVF lists of the index.
+              Defaults to 1000.
+            - fraction_lists_to_search (float, optional): Fraction of the IVF lists searched per
+              query. Defaults to 0.05.
+    """
+
     def __init__(self, config: dict, **kwargs):
-        self.config = config
+        VannaBase.__init__(self, config=config)
 
         self.n_results_sql = config.get("n_results_sql", config.get("n_results", 10))
         self.n_results_documentation = config.get("n_results_documentation", config.get("n_results", 10))
         self.n_results_ddl = config.get("n_results_ddl", config.get("n_results", 10))
+        self.vector_index = config.get("vector_index", True)
+        self.vector_index_num_lists = config.get("vector_index_num_lists", 1000)
+        self.fraction_lists_to_search = config.get("fraction_lists_to_search", 0.05)
+        self._vertex_embedding_model = None
 
         if "api_key" in config or os.getenv("GOOGLE_API_KEY"):
             """
@@ -45,7 +75,7 @@ class BigQuery_VectorStore(VannaBase):
         if self.project_id is None:
             raise ValueError("Project ID is not set")
 
-        self.conn = bigquery.Client(project=self.project_id)
+        self.conn = self.config.get("client") or bigquery.Client(project=self.project_id)
 
         dataset_name = self.config.get('bigquery_dataset_name', 'vanna_managed')
         self.dataset_id = f"{self.project_id}.{dataset_name}"
@@ -64,7 +94,7 @@ class BigQuery_VectorStore(VannaBase):
         # id, training_data_type, question, content, embedding, created_at
 
         self.table_id = f"{self.dataset_id}.training_data"
-        schema = [
+        self.schema = schema = [
             bigquery.SchemaField("id", "STRING", mode="REQUIRED"),
             bigquery.SchemaField("training_data_type", "STRING", mode="REQUIRED"),
             bigquery.SchemaField("question", "STRING", mode="REQUIRED"),
@@ -83,23 +113,34 @@ class BigQuery_VectorStore(VannaBase):
             self.conn.create_table(table, timeout=30)  # Make an API request.
             print(f"Created table {self.table_id}")
 
-        # Create VECTOR INDEX IF NOT EXISTS
-        # TODO: This requires 5000 rows before it can be created
-        # vector_index_query = f"""
-        # CREATE VECTOR INDEX IF NOT EXISTS my_index
-        # ON `{self.table_id}`(embedding)
-        # OPTIONS(
-        #     distance_type='COSINE',
-        #     index_type='IVF',
-        #     ivf_options='{{"num_lists": 1000}}'
-        # )
-        # """
-
-        # try:
-        #     self.conn.query(vector_index_query).result()  # Make an API request.
-        #     print(f"Vector index on {self.table_id} created or already exists")
-        # except Exception as e:
-        #     print(f"Failed to create vector index: {e}")
+        if self.vector_index:
+            self.create_vector_index()
+
+    def create_vector_index(self) -> bool:
+        """
+        Creates the IVF vector index of the embeddings if it does not exist. The training data type
+        is stored in the index, so that searches filtered by type can use it. Older BigQuery
+        releases reject the index below 5000 rows; `add_*_batch` retries once a batch brings the
+        table past that size.
+        """
+        vector_index_query = f"""
+        CREATE VECTOR INDEX IF NOT EXISTS training_data_embedding_index
+        ON `{self.table_id}`(embedding)
+        STORING(training_data_type)
+        OPTIONS(
+            distance_type='COSINE',
+            index_type='IVF',
+            ivf_options='{{"num_lists": {int(self.vector_index_num_lists)}}}'
+        )
+        """
+
+        try:
+            self.conn.query(vector_index_query).result()  # Make an API request.
+            print(f"Vector index on {self.table_id} created or already exists")
+            return True
+        except Exception as e:
+            print(f"Failed to create vector index: {e}")
+            return False
 
     def store_training_data(self, training_data_type: str, question: str, content: str, embedding: List[float], **kwargs) -> str:
         id = str(uuid.uuid4())
@@ -115,38 +156,103 @@ class BigQuery_VectorStore(VannaBase):
 
         return id
 
-    def fetch_similar_training_data(self, training_data_type: str, question: str, n_results, **kwargs) -> pd.DataFrame:
+    def store_training_data_batch(self, rows: List[dict], **kwargs) -> List[str]:
+        """
+        Stores rows of `training_data_type`, `question`, `content` and `embedding` with load jobs of
+        up to 10,000 rows. Unlike streaming inserts, loaded rows can be deleted right away.
+        """
+        created_at = datetime.datetime.now().isoformat()
+        rows = [{"id": str(uuid.uuid4()), **row, "created_at": created_at} for row in rows]
+        job_config = bigquery.LoadJobConfig(
+            schema=self.schema,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        for i in range(0, len(rows), LOAD_BATCH_SIZE):
+            self.conn.load_table_from_json(
+                rows[i : i + LOAD_BATCH_SIZE], self.table_id, job_config=job_config
+            ).result()
+
+        if self.vector_index and len(rows) >= VECTOR_INDEX_MIN_ROWS:
+            self.create_vector_index()
+
+        return [row["id"] for row in rows]
+
+    def _vector_search_query(self, n_results: Dict[str, int]) -> str:
+        """
+        Builds one query that returns the top-k rows of each training data type, e.g.
+        `{"sql": 10, "ddl": 10}`. Each type is searched with its own VECTOR_SEARCH over the rows of
+        that type, so every type gets its full top-k, and the question embedding is passed once as
+        the `@question_embedding` parameter.
+        """
+        if self.vector_index:
+            options = f'{{"fraction_lists_to_search": {float(self.fraction_lists_to_search)}}}'
+        else:
+            options = '{"use_brute_force": true}'
+
+        searches = [
+            f"""
+            SELECT
+                base.id as id,
+                base.question as question,
+                base.training_data_type as training_data_type,
+                base.content as content,
+                distance
+            FROM
+                VECTOR_SEARCH(
+                    (
+                        SELECT * FROM `{self.table_id}`
+                        WHERE training_data_type = '{training_data_type}'
+                    ),
+                    'embedding',
+                    (SELECT @question_embedding AS embedding),
+                    top_k => {int(top_k)},
+                    distance_type => 'COSINE',
+                    options => '{options}'
+                )
+            """
+            for training_data_type, top_k in n_results.items()
+        ]
+        return "\nUNION ALL\n".join(searches) + "\nORDER BY training_data_type, distance"
+
+    def fetch_similar_training_data_by_type(
+        self, question: str, n_results: Dict[str, int], **kwargs
+    ) -> Dict[str, pd.DataFrame]:
         question_embedding = self.generate_question_embedding(question)
 
-        query = f"""
-        SELECT
-            base.id as id,
-            base.question as question,
-            base.training_data_type as training_data_type,
-            base.content as content,
-            distance
-        FROM
-            VECTOR_SEARCH(
-                TABLE `{self.table_id}`,
-                'embedding',
-                (SELECT * FROM UNNEST([STRUCT({question_embedding})])),
-                top_k => 5,
-                distance_type => 'COSINE',
-                options => '{{"use_brute_force":true}}'
-            )
-        WHERE
-            base.training_data_type = '{training_data_type}'
-        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("question_embedding", "FLOAT64", question_embedding),
+            ]
+        )
+        query = self._vector_search_query(n_results)
+        results = self.conn.query(query, job_config=job_config).result().to_dataframe()
+        return {
+            training_data_type: results[
+                results["training_data_type"] == training_data_type
+            ].reset_index(drop=True)
+            for training_data_type in n_results
+        }
+
+    def fetch_similar_training_data(
+        self, training_data_type: str, question: str, n_results, **kwargs
+    ) -> pd.DataFrame:
+        results = self.fetch_similar_training_data_by_type(
+            question, {training_data_type: n_results}
+        )
+        return results[training_data_type]
 
-        results = self.conn.query(query).result().to_dataframe()
-        return results
+    @property
+    def vertex_embedding_model(self) -> TextEmbeddingModel:
+        if self._vertex_embedding_model is None:
+            self._vertex_embedding_model = TextEmbeddingModel.from_pretrained("text-embedding-004")
+        return self._vertex_embedding_model
 
     def get_embeddings(self, data: str, task: str) -> List[float]:
         embeddings = None
 
         if self.type == "VERTEX_AI":
           input = [TextEmbeddingInput(data, task)]
-          model = TextEmbeddingModel.from_pretrained("text-embedding-004")
+          model = self.vertex_embedding_model
 
           result = model.get_embeddings(input)
 
@@ -164,6 +270,27 @@ class BigQuery_VectorStore(VannaBase):
 
         return embeddings
 
+    def get_embeddings_batch(self, data: List[str], task: str) -> List[List[float]]:
+        embeddings = []
+
+        for i in range(0, len(data), EMBEDDING_BATCH_SIZE):
+          batch = data[i : i + EMBEDDING_BATCH_SIZE]
+          if self.type == "VERTEX_AI":
+            inputs = [TextEmbeddingInput(text, task) for text in batch]
+            result = self.vertex_embedding_model.get_embeddings(inputs)
+            embeddings.extend(embedding.values for embedding in result)
+          else:
+            result = self.genai.embed_content(
+              model="models/text-embedding-004",
+              content=batch,
+              task_type=task)
+            embeddings.extend(result.get('embedding', []))
+
+        if len(embeddings) != len(data):
+            raise ValueError("No embeddings returned")
+
+        return embeddings
+
     def generate_question_embedding(self, data: str, **kwargs) -> List[float]:
         result = self.get_embeddings(data, "RETRIEVAL_QUERY")
 
@@ -194,23 +321,73 @@ class BigQuery_VectorStore(VannaBase):
     def generate_embedding(self, data: str, **kwargs) -> List[float]:
         return self.generate_storage_embedding(data, **kwargs)
 
-    def get_similar_question_sql(self, question: str, **kwargs) -> list:
-        df = self.fetch_similar_training_data(training_data_type="sql", question=question, n_results=self.n_results_sql)
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        return self.get_embeddings_batch(data, "RETRIEVAL_DOCUMENT")
+
+    @staticmethod
+    def _question_sql_with_scores(df: pd.DataFrame) -> list:
+        # Pair dictionaries with only question, sql fields with the cosine similarity. The content
+        # field needs to be renamed to sql
+        df_sql = df.rename(columns={"content": "sql"})[["question", "sql"]]
+        records = df_sql.to_dict(orient="records")
+        return list(zip(records, (1 - df["distance"]).tolist()))
+
+    @staticmethod
+    def _content_with_scores(df: pd.DataFrame) -> list:
+        return list(zip(df["content"].tolist(), (1 - df["distance"]).tolist()))
+
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        return self._question_sql_with_scores(
+            self.fetch_similar_training_data(
+                training_data_type="sql", question=question, n_results=self.n_results_sql
+            )
+        )
 
-        # Return a list of dictionaries with only question, sql fields. The content field needs to be renamed to sql
-        return df.rename(columns={"content": "sql"})[["question", "sql"]].to_dict(orient="records")
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return self._content_with_scores(
+            self.fetch_similar_training_data(
+                training_data_type="ddl", question=question, n_results=self.n_results_ddl
+            )
+        )
+
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        return self._content_with_scores(
+            self.fetch_similar_training_data(
+                training_data_type="documentation",
+                question=question,
+                n_results=self.n_results_documentation,
+            )
+        )
 
-    def get_related_ddl(self, question: str, **kwargs) -> list:
-        df = self.fetch_similar_training_data(training_data_type="ddl", question=question, n_results=self.n_results_ddl)
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
+        )
 
-        # Return a list of strings of the content
-        return df["content"].tolist()
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
 
     def get_related_documentation(self, question: str, **kwargs) -> list:
-        df = self.fetch_similar_training_data(training_data_type="documentation", question=question, n_results=self.n_results_documentation)
-
-        # Return a list of strings of the content
-        return df["content"].tolist()
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
+        )
+
+    def get_related_training_data_with_scores(
+        self, question: str, **kwargs
+    ) -> Tuple[list, list, list]:
+        dfs = self.fetch_similar_training_data_by_type(
+            question,
+            {
+                "sql": self.n_results_sql,
+                "ddl": self.n_results_ddl,
+                "documentation": self.n_results_documentation,
+            },
+        )
+        return (
+            self._question_sql_with_scores(dfs["sql"]),
+            self._content_with_scores(dfs["ddl"]),
+            self._content_with_scores(dfs["documentation"]),
+        )
 
     def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
         doc = {
@@ -232,6 +409,44 @@ class BigQuery_VectorStore(VannaBase):
 
         return self.store_training_data(training_data_type="documentation", question="", content=documentation, embedding=embedding)
 
+    def add_question_sql_batch(
+        self, question_sql_pairs: List[Tuple[str, str]], **kwargs
+    ) -> List[str]:
+        embeddings = self.generate_embeddings([
+            str({"question": question, "sql": sql}) for question, sql in question_sql_pairs
+        ])
+
+        return self.store_training_data_batch([
+            {
+                "training_data_type": "sql",
+                "question": question,
+                "content": sql,
+                "embedding": embedding,
+            }
+            for (question, sql), embedding in zip(question_sql_pairs, embeddings)
+        ])
+
+    def add_ddl_batch(self, ddls: List[str], **kwargs) -> List[str]:
+        embeddings = self.generate_embeddings(ddls)
+
+        return self.store_training_data_batch([
+            {"training_data_type": "ddl", "question": "", "content": ddl, "embedding": embedding}
+            for ddl, embedding in zip(ddls, embeddings)
+        ])
+
+    def add_documentation_batch(self, documentations: List[str], **kwargs) -> List[str]:
+        embeddings = self.generate_embeddings(documentations)
+
+        return self.store_training_data_batch([
+            {
+                "training_data_type": "documentation",
+                "question": "",
+                "content": documentation,
+                "embedding": embedding,
+            }
+            for documentation, embedding in zip(documentations, embeddings)
+        ])
+
     def get_training_data(self, **kwargs) -> pd.DataFrame:
         query = f"SELECT id, training_data_type, question, content FROM `{self.table_id}`"
 
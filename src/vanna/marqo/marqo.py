@@ -152,17 +152,36 @@ class Marqo_VectorStore(VannaBase):
             # Return an empty list if 'hits' is not found or not a list
             return []
 
-    def get_similar_question_sql(self, question: str, **kwargs) -> list:
-        return Marqo_VectorStore._extract_documents(
+    # Pairs the extracted documents with the "_score" of their hits
+    @staticmethod
+    def _extract_documents_with_scores(data) -> list:
+        documents = Marqo_VectorStore._extract_documents(data)
+        return list(zip(documents, [hit.get("_score") for hit in data.get("hits", [])]))
+
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        return Marqo_VectorStore._extract_documents_with_scores(
             self.mq.index("vanna-sql").search(question)
         )
 
-    def get_related_ddl(self, question: str, **kwargs) -> list:
-        return Marqo_VectorStore._extract_documents(
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return Marqo_VectorStore._extract_documents_with_scores(
             self.mq.index("vanna-ddl").search(question)
         )
 
-    def get_related_documentation(self, question: str, **kwargs) -> list:
-        return Marqo_VectorStore._extract_documents(
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        return Marqo_VectorStore._extract_documents_with_scores(
             self.mq.index("vanna-doc").search(question)
         )
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
+        )
+
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
+
+    def get_related_documentation(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
+        )
@@ -1,10 +1,10 @@
 import uuid
-from typing import List
+from typing import List, Tuple
 
 import pandas as pd
 from pymilvus import DataType, MilvusClient, model
 
-from ..base import VannaBase
+from ..base import VannaBase, relevance
 
 # Setting the URI as a local file, e.g.`./milvus.db`,
 # is the most convenient method, as it automatically utilizes Milvus Lite
@@ -18,7 +18,15 @@ from ..base import VannaBase
 DEFAULT_MILVUS_URI = "./milvus.db"
 # DEFAULT_MILVUS_URI = "http://localhost:19530"
 
-MAX_LIMIT_SIZE = 10_000
+INSERT_BATCH_SIZE = 1_000
+ITERATOR_BATCH_SIZE = 1_000
+
+# Milvus Lite supports FLAT, IVF_FLAT and AUTOINDEX; the other types need a Milvus server
+INDEX_TYPES = ("AUTOINDEX", "FLAT", "HNSW", "IVF_FLAT", "IVF_SQ8", "IVF_PQ")
+
+COLLECTION_NAMES = {"sql": "vannasql", "ddl": "vannaddl", "documentation": "vannadoc"}
+CONTENT_FIELDS = {"sql": "sql", "ddl": "ddl", "documentation": "doc"}
+ID_SUFFIXES = {"sql": "-sql", "ddl": "-ddl", "documentation": "-doc"}
 
 
 class Milvus_VectorStore(VannaBase):
@@ -32,6 +40,21 @@ class Milvus_VectorStore(VannaBase):
                 A `milvus_model.base.BaseEmbeddingFunction` instance. Defaults to `DefaultEmbeddingFunction()`.
                 For more models, please refer to:
                 https://milvus.io/docs/embeddings.md
+            - index_type: Vector index of new collections, one of `INDEX_TYPES`.
+              Defaults to `"AUTOINDEX"`.
+            - metric_type: `"L2"`, `"IP"` or `"COSINE"`. Defaults to `"L2"`.
+            - index_params: Build parameters of the index, e.g. `{"M": 16, "efConstruction": 200}`
+              for HNSW or `{"nlist": 1024}` for IVF indexes. Defaults to `{}`.
+            - search_params: Search parameters, e.g. `{"ef": 64}` for HNSW.
+              Defaults to `{"nprobe": 128}`, or `{"ef": max(64, n_results)}` for HNSW.
+            - insert_batch_size: Number of rows per insert of batched adds. Defaults to 1000.
+            - n_results: Number of results per search. Defaults to 10.
+              `n_results_sql`, `n_results_ddl` and `n_results_documentation` set it per training
+              data type.
+            - unified_collection: Name of a single collection holding all training data types, told
+              apart by a `doc_type` field, instead of the `vannasql`, `vannaddl` and `vannadoc`
+              collections. `get_related_training_data` then runs one search grouped by type
+              (Milvus 2.4 or later). Defaults to `None`.
     """
     def __init__(self, config=None):
         VannaBase.__init__(self, config=config)
@@ -46,10 +69,37 @@ class Milvus_VectorStore(VannaBase):
         else:
             self.embedding_function = model.DefaultEmbeddingFunction()
         self._embedding_dim = self.embedding_function.encode_documents(["foo"])[0].shape[0]
-        self._create_collections()
         self.n_results = config.get("n_results", 10)
+        self.n_results_sql = config.get("n_results_sql", self.n_results)
+        self.n_results_ddl = config.get("n_results_ddl", self.n_results)
+        self.n_results_documentation = config.get("n_results_documentation", self.n_results)
+        self.unified_collection = config.get("unified_collection")
+        if self.unified_collection:
+            self.collection_names = {
+                doc_type: self.unified_collection for doc_type in COLLECTION_NAMES
+            }
+        else:
+            self.collection_names = dict(COLLECTION_NAMES)
+        self.index_type = config.get("index_type", "AUTOINDEX").upper()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported index_type {self.index_type}, use one of {INDEX_TYPES}")
+        self.metric_type = config.get("metric_type", "L2")
+        self.index_params = config.get("index_params", {})
+        if "search_params" in config:
+            self.search_params = config["search_params"]
+        elif self.index_type == "HNSW":
+            self.search_params = {
+                "ef": max(64, self.n_results_sql, self.n_results_ddl, self.n_results_documentation)
+            }
+        else:
+            self.search_params = {"nprobe": 128}
+        self.insert_batch_size = config.get("insert_batch_size", INSERT_BATCH_SIZE)
+        self._create_collections()
 
     def _create_collections(self):
+        if self.unified_collection:
+            self._create_unified_collection(self.unified_collection)
+            return
         self._create_sql_collection("vannasql")
         self._create_ddl_collection("vannaddl")
         self._create_doc_collection("vannadoc")
@@ -58,6 +108,20 @@ class Milvus_VectorStore(VannaBase):
     def generate_embedding(self, data: str, **kwargs) -> List[float]:
         return self.embedding_function.encode_documents(data).tolist()
 
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        return [embedding.tolist() for embedding in self.embedding_function.encode_documents(data)]
+
+
+    def _prepare_index_params(self):
+        index_params = self.milvus_client.prepare_index_params()
+        index_params.add_index(
+            field_name="vector",
+            index_name="vector",
+            index_type=self.index_type,
+            metric_type=self.metric_type,
+            params=self.index_params,
+        )
+        return index_params
 
     def _create_sql_collection(self, name: str):
         if not self.milvus_client.has_collection(collection_name=name):
@@ -70,17 +134,10 @@ class Milvus_VectorStore(VannaBase):
             vannasql_schema.add_field(field_name="sql", datatype=DataType.VARCHAR, max_length=65535)
             vannasql_schema.add_field(field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=self._embedding_dim)
 
-            vannasql_index_params = self.milvus_client.prepare_index_params()
-            vannasql_index_params.add_index(
-                field_name="vector",
-                index_name="vector",
-                index_type="AUTOINDEX",
-                metric_type="L2",
-            )
             self.milvus_client.create_collection(
                 collection_name=name,
                 schema=vannasql_schema,
-                index_params=vannasql_index_params,
+                index_params=self._prepare_index_params(),
                 consistency_level="Strong"
             )
 
@@ -94,17 +151,10 @@ class Milvus_VectorStore(VannaBase):
             vannaddl_schema.add_field(field_name="ddl", datatype=DataType.VARCHAR, max_length=65535)
             vannaddl_schema.add_field(field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=self._embedding_dim)
 
-            vannaddl_index_params = self.milvus_client.prepare_index_params()
-            vannaddl_index_params.add_index(
-                field_name="vector",
-                index_name="vector",
-                index_type="AUTOINDEX",
-                metric_type="L2",
-            )
             self.milvus_client.create_collection(
                 collection_name=name,
                 schema=vannaddl_schema,
-                index_params=vannaddl_index_params,
+                index_params=self._prepare_index_params(),
                 consistency_level="Strong"
             )
 
@@ -118,33 +168,65 @@ class Milvus_VectorStore(VannaBase):
             vannadoc_schema.add_field(field_name="doc", datatype=DataType.VARCHAR, max_length=65535)
             vannadoc_schema.add_field(field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=self._embedding_dim)
 
-            vannadoc_index_params = self.milvus_client.prepare_index_params()
-            vannadoc_index_params.add_index(
-                field_name="vector",
-                index_name="vector",
-                index_type="AUTOINDEX",
-                metric_type="L2",
-            )
             self.milvus_client.create_collection(
                 collection_name=name,
                 schema=vannadoc_schema,
-                index_params=vannadoc_index_params,
+                index_params=self._prepare_index_params(),
                 consistency_level="Strong"
             )
 
+    def _create_unified_collection(self, name: str):
+        if not self.milvus_client.has_collection(collection_name=name):
+            unified_schema = MilvusClient.create_schema(
+                auto_id=False,
+                enable_dynamic_field=False,
+            )
+            unified_schema.add_field(
+                field_name="id", datatype=DataType.VARCHAR, max_length=65535, is_primary=True
+            )
+            unified_schema.add_field(
+                field_name="doc_type", datatype=DataType.VARCHAR, max_length=32
+            )
+            unified_schema.add_field(
+                field_name="text", datatype=DataType.VARCHAR, max_length=65535
+            )
+            unified_schema.add_field(
+                field_name="content", datatype=DataType.VARCHAR, max_length=65535
+            )
+            unified_schema.add_field(
+                field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=self._embedding_dim
+            )
+
+            self.milvus_client.create_collection(
+                collection_name=name,
+                schema=unified_schema,
+                index_params=self._prepare_index_params(),
+                consistency_level="Strong"
+            )
+
+    def _content_field(self, doc_type: str) -> str:
+        return "content" if self.unified_collection else CONTENT_FIELDS[doc_type]
+
+    def _row(self, doc_type: str, content: str, question: str = None) -> dict:
+        row = {self._content_field(doc_type): content}
+        if doc_type == "sql":
+            row["text"] = question
+        if self.unified_collection:
+            row["doc_type"] = doc_type
+            row.setdefault("text", "")
+        return row
+
+    def _type_filter(self, doc_type: str) -> str:
+        return f'doc_type == "{doc_type}"' if self.unified_collection else ""
+
     def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
         if len(question) == 0 or len(sql) == 0:
             raise Exception("pair of question and sql can not be null")
         _id = str(uuid.uuid4()) + "-sql"
         embedding = self.embedding_function.encode_documents([question])[0]
         self.milvus_client.insert(
-            collection_name="vannasql",
-            data={
-                "id": _id,
-                "text": question,
-                "sql": sql,
-                "vector": embedding
-            }
+            collection_name=self.collection_names["sql"],
+            data={"id": _id, **self._row("sql", sql, question), "vector": embedding},
         )
         return _id
 
@@ -154,12 +236,8 @@ class Milvus_VectorStore(VannaBase):
         _id = str(uuid.uuid4()) + "-ddl"
         embedding = self.embedding_function.encode_documents([ddl])[0]
         self.milvus_client.insert(
-            collection_name="vannaddl",
-            data={
-                "id": _id,
-                "ddl": ddl,
-                "vector": embedding
-            }
+            collection_name=self.collection_names["ddl"],
+            data={"id": _id, **self._row("ddl", ddl), "vector": embedding},
         )
         return _id
 
@@ -169,137 +247,196 @@ class Milvus_VectorStore(VannaBase):
         _id = str(uuid.uuid4()) + "-doc"
         embedding = self.embedding_function.encode_documents([documentation])[0]
         self.milvus_client.insert(
-            collection_name="vannadoc",
-            data={
-                "id": _id,
-                "doc": documentation,
-                "vector": embedding
-            }
+            collection_name=self.collection_names["documentation"],
+            data={"id": _id, **self._row("documentation", documentation), "vector": embedding},
         )
         return _id
 
-    def get_training_data(self, **kwargs) -> pd.DataFrame:
-        sql_data = self.milvus_client.query(
-            collection_name="vannasql",
-            output_fields=["*"],
-            limit=MAX_LIMIT_SIZE,
-        )
-        df = pd.DataFrame()
-        df_sql = pd.DataFrame(
-            {
-                "id": [doc["id"] for doc in sql_data],
-                "question": [doc["text"] for doc in sql_data],
-                "content": [doc["sql"] for doc in sql_data],
-            }
-        )
-        df = pd.concat([df, df_sql])
+    def _insert_batch(self, doc_type: str, texts: List[str], rows: List[dict]) -> List[str]:
+        ids = [str(uuid.uuid4()) + ID_SUFFIXES[doc_type] for _ in rows]
+        batch_size = self.insert_batch_size
+        for i in range(0, len(rows), batch_size):
+            embeddings = self.embedding_function.encode_documents(texts[i : i + batch_size])
+            self.milvus_client.insert(
+                collection_name=self.collection_names[doc_type],
+                data=[
+                    {"id": _id, **row, "vector": embedding}
+                    for _id, row, embedding in zip(
+                        ids[i : i + batch_size], rows[i : i + batch_size], embeddings
+                    )
+                ],
+            )
+        return ids
 
-        ddl_data = self.milvus_client.query(
-            collection_name="vannaddl",
-            output_fields=["*"],
-            limit=MAX_LIMIT_SIZE,
+    def add_question_sql_batch(
+        self, question_sql_pairs: List[Tuple[str, str]], **kwargs
+    ) -> List[str]:
+        if any(len(question) == 0 or len(sql) == 0 for question, sql in question_sql_pairs):
+            raise Exception("pair of question and sql can not be null")
+        return self._insert_batch(
+            "sql",
+            [question for question, _ in question_sql_pairs],
+            [self._row("sql", sql, question) for question, sql in question_sql_pairs],
         )
 
-        df_ddl = pd.DataFrame(
-            {
-                "id": [doc["id"] for doc in ddl_data],
-                "question": [None for doc in ddl_data],
-                "content": [doc["ddl"] for doc in ddl_data],
-            }
-        )
-        df = pd.concat([df, df_ddl])
+    def add_ddl_batch(self, ddls: List[str], **kwargs) -> List[str]:
+        if any(len(ddl) == 0 for ddl in ddls):
+            raise Exception("ddl can not be null")
+        return self._insert_batch("ddl", ddls, [self._row("ddl", ddl) for ddl in ddls])
 
-        doc_data = self.milvus_client.query(
-            collection_name="vannadoc",
-            output_fields=["*"],
-            limit=MAX_LIMIT_SIZE,
+    def add_documentation_batch(self, documentations: List[str], **kwargs) -> List[str]:
+        if any(len(documentation) == 0 for documentation in documentations):
+            raise Exception("documentation can not be null")
+        return self._insert_batch(
+            "documentation",
+            documentations,
+            [self._row("documentation", documentation) for documentation in documentations],
         )
 
-        df_doc = pd.DataFrame(
-            {
-                "id": [doc["id"] for doc in doc_data],
-                "question": [None for doc in doc_data],
-                "content": [doc["doc"] for doc in doc_data],
-            }
+    def _query_iterator(self, doc_type: str, batch_size: int):
+        iterator = self.milvus_client.query_iterator(
+            collection_name=self.collection_names[doc_type],
+            batch_size=batch_size,
+            filter=self._type_filter(doc_type),
+            output_fields=["id", "text", self._content_field(doc_type)] if doc_type == "sql"
+            else ["id", self._content_field(doc_type)],
         )
-        df = pd.concat([df, df_doc])
-        return df
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                yield batch
+        finally:
+            iterator.close()
+
+    def iter_training_data(self, batch_size: int = ITERATOR_BATCH_SIZE, **kwargs):
+        """
+        Yields the training data as DataFrame chunks of at most `batch_size` rows, paging through
+        each collection with a query iterator instead of loading it at once.
+        """
+        for doc_type in ID_SUFFIXES:
+            content_field = self._content_field(doc_type)
+            for batch in self._query_iterator(doc_type, batch_size):
+                yield pd.DataFrame(
+                    {
+                        "id": [doc["id"] for doc in batch],
+                        "question": [doc["text"] if doc_type == "sql" else None for doc in batch],
+                        "content": [doc[content_field] for doc in batch],
+                    }
+                )
 
-    def get_similar_question_sql(self, question: str, **kwargs) -> list:
-        search_params = {
-            "metric_type": "L2",
-            "params": {"nprobe": 128},
+    def get_training_data(self, **kwargs) -> pd.DataFrame:
+        chunks = list(self.iter_training_data(**kwargs))
+        if not chunks:
+            return pd.DataFrame(columns=["id", "question", "content"])
+        return pd.concat(chunks)
+
+    def _search_params(self) -> dict:
+        return {
+            "metric_type": self.metric_type,
+            "params": self.search_params,
         }
-        embeddings = self.embedding_function.encode_queries([question])
+
+    def _n_results(self, doc_type: str) -> int:
+        return {
+            "sql": self.n_results_sql,
+            "ddl": self.n_results_ddl,
+            "documentation": self.n_results_documentation,
+        }[doc_type]
+
+    def _output_fields(self, doc_type: str) -> List[str]:
+        if doc_type == "sql":
+            return ["text", self._content_field(doc_type)]
+        return [self._content_field(doc_type)]
+
+    def _score(self, distance: float) -> float:
+        # L2 reports squared distances, IP and COSINE similarities
+        if self.metric_type.upper() == "L2":
+            return relevance.l2_distance_to_score(distance)
+        return distance
+
+    def _with_content(self, doc_type: str, hits: list) -> list:
+        content_field = self._content_field(doc_type)
+        if doc_type == "sql":
+            return [
+                (
+                    {"question": hit["entity"]["text"], "sql": hit["entity"][content_field]},
+                    self._score(hit["distance"]),
+                )
+                for hit in hits
+            ]
+        return [(hit["entity"][content_field], self._score(hit["distance"])) for hit in hits]
+
+    def _search_with_scores(self, doc_type: str, embedding: List[float]) -> list:
         res = self.milvus_client.search(
-            collection_name="vannasql",
+            collection_name=self.collection_names[doc_type],
             anns_field="vector",
-            data=embeddings,
-            limit=self.n_results,
-            output_fields=["text", "sql"],
-            search_params=search_params
+            data=[embedding],
+            filter=self._type_filter(doc_type),
+            limit=self._n_results(doc_type),
+            output_fields=self._output_fields(doc_type),
+            search_params=self._search_params(),
         )
-        res = res[0]
+        return self._with_content(doc_type, res[0])
 
-        list_sql = []
-        for doc in res:
-            dict = {}
-            dict["question"] = doc["entity"]["text"]
-            dict["sql"] = doc["entity"]["sql"]
-            list_sql.append(dict)
-        return list_sql
+    def _embed_query(self, question: str) -> List[float]:
+        return self.embedding_function.encode_queries([question])[0]
 
-    def get_related_ddl(self, question: str, **kwargs) -> list:
-        search_params = {
-            "metric_type": "L2",
-            "params": {"nprobe": 128},
-        }
-        embeddings = self.embedding_function.encode_queries([question])
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        return self._search_with_scores("sql", self._embed_query(question))
+
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return self._search_with_scores("ddl", self._embed_query(question))
+
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        return self._search_with_scores("documentation", self._embed_query(question))
+
+    def get_related_training_data_with_scores(
+        self, question: str, **kwargs
+    ) -> Tuple[list, list, list]:
+        embedding = self._embed_query(question)
+        if not self.unified_collection:
+            # the question is embedded once for the three collections
+            return tuple(self._search_with_scores(doc_type, embedding) for doc_type in ID_SUFFIXES)
+
+        # one search, grouped by type on the server, with enough hits per group for the largest
+        # quota
         res = self.milvus_client.search(
-            collection_name="vannaddl",
+            collection_name=self.unified_collection,
             anns_field="vector",
-            data=embeddings,
-            limit=self.n_results,
-            output_fields=["ddl"],
-            search_params=search_params
+            data=[embedding],
+            limit=len(ID_SUFFIXES),
+            group_by_field="doc_type",
+            group_size=max(self._n_results(doc_type) for doc_type in ID_SUFFIXES),
+            strict_group_size=True,
+            output_fields=["doc_type", "text", "content"],
+            search_params=self._search_params(),
+        )
+        hits = {doc_type: [] for doc_type in ID_SUFFIXES}
+        for hit in res[0]:
+            hits[hit["entity"]["doc_type"]].append(hit)
+        return tuple(
+            self._with_content(doc_type, hits[doc_type][: self._n_results(doc_type)])
+            for doc_type in ID_SUFFIXES
+        )
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
         )
-        res = res[0]
 
-        list_ddl = []
-        for doc in res:
-            list_ddl.append(doc["entity"]["ddl"])
-        return list_ddl
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
 
     def get_related_documentation(self, question: str, **kwargs) -> list:
-        search_params = {
-            "metric_type": "L2",
-            "params": {"nprobe": 128},
-        }
-        embeddings = self.embedding_function.encode_queries([question])
-        res = self.milvus_client.search(
-            collection_name="vannadoc",
-            anns_field="vector",
-            data=embeddings,
-            limit=self.n_results,
-            output_fields=["doc"],
-            search_params=search_params
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
         )
-        res = res[0]
-
-        list_doc = []
-        for doc in res:
-            list_doc.append(doc["entity"]["doc"])
-        return list_doc
 
     def remove_training_data(self, id: str, **kwargs) -> bool:
-        if id.endswith("-sql"):
-            self.milvus_client.delete(collection_name="vannasql", ids=[id])
-            return True
-        elif id.endswith("-ddl"):
-            self.milvus_client.delete(collection_name="vannaddl", ids=[id])
-            return True
-        elif id.endswith("-doc"):
-            self.milvus_client.delete(collection_name="vannadoc", ids=[id])
-            return True
-        else:
-            return False
+        for doc_type, id_suffix in ID_SUFFIXES.items():
+            if id.endswith(id_suffix):
+                self.milvus_client.delete(collection_name=self.collection_names[doc_type], ids=[id])
+                return True
+        return False
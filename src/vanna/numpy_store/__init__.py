@@ -0,0 +1 @@
+from .numpy_vector import NumpyVectorStore
@@ -0,0 +1,592 @@
+import json
+import os
+import threading
+import uuid
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..base import VannaBase
+
+# collection name -> suffix of its training data ids
+COLLECTIONS = {"sql": "sql", "ddl": "ddl", "documentation": "doc"}
+QUANTIZATIONS = ("float32", "int8")
+INITIAL_CAPACITY = 1024
+SCORE_CHUNK_ROWS = 65_536
+
+
+def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 quantization, returns the int8 rows and the float32 scale of each row.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def _replace_json(filepath: str, data: dict):
+    with open(filepath + ".tmp", "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(filepath + ".tmp", filepath)
+
+
+class _Collection:
+    """
+    The vectors and metadata of one collection. Rows are appended to a preallocated matrix and only
+    count once the state file says so, deletes are tombstones until the next rewrite. Rewrites
+    (compaction and growth) write a new generation of files and switch to it by replacing the state
+    file, so every change is atomic.
+
+    Persistent collections keep `{name}.{generation}.npy` (memory-mapped),
+    `{name}.{generation}.scales.npy` for int8 vectors, `{name}.{generation}.jsonl` with one
+    metadata line per row, and `{name}.state.json`.
+    """
+
+    def __init__(self, name: str, path: Optional[str], quantization: str, dim: Optional[int]):
+        self.name = name
+        self.path = path
+        self.quantization = quantization
+        self.dim = dim
+        self.generation = 0
+        self.next_generation = 0
+        self.count = 0
+        self.deleted = set()
+        self.vectors = None
+        self.scales = None
+        self.metadata = []
+        self.row_of_id = {}
+        self._datasets = None
+
+        if path is not None and os.path.exists(self._state_path()):
+            self._load()
+
+    def _state_path(self) -> str:
+        return os.path.join(self.path, f"{self.name}.state.json")
+
+    def _file(self, suffix: str, generation: int = None) -> str:
+        generation = self.generation if generation is None else generation
+        return os.path.join(self.path, f"{self.name}.{generation}.{suffix}")
+
+    def _load(self):
+        with open(self._state_path()) as f:
+            state = json.load(f)
+        self.generation, self.count, self.dim = state["generation"], state["count"], state["dim"]
+        self.next_generation = self.generation
+        self.quantization = state.get("quantization", self.quantization)
+        self.deleted = set(state["deleted"])
+        self.vectors = np.load(self._file("npy"), mmap_mode="r+")
+        if self.quantization == "int8":
+            self.scales = np.load(self._file("scales.npy"), mmap_mode="r+")
+
+        # lines past the committed count are from an append that did not finish
+        with open(self._file("jsonl"), "rb+") as f:
+            for _ in range(self.count):
+                self.metadata.append(json.loads(f.readline()))
+            f.truncate(f.tell())
+        self.row_of_id = {
+            entry["id"]: row for row, entry in enumerate(self.metadata) if row not in self.deleted
+        }
+
+    def _save_state(self):
+        if self.path is not None:
+            _replace_json(self._state_path(), {
+                "generation": self.generation,
+                "count": self.count,
+                "dim": self.dim,
+                "quantization": self.quantization,
+                "deleted": sorted(self.deleted),
+            })
+
+    def _allocate(self, capacity: int, generation: int):
+        dtype = np.int8 if self.quantization == "int8" else np.float32
+        if self.path is None:
+            vectors = np.zeros((capacity, self.dim), dtype=dtype)
+            scales = np.ones(capacity, dtype=np.float32) if self.quantization == "int8" else None
+        else:
+            vectors = np.lib.format.open_memmap(
+                self._file("npy", generation), mode="w+", dtype=dtype, shape=(capacity, self.dim)
+            )
+            scales = None
+            if self.quantization == "int8":
+                scales = np.lib.format.open_memmap(
+                    self._file("scales.npy", generation),
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(capacity,),
+                )
+        return vectors, scales
+
+    def rewrite(self, capacity: int = None):
+        """
+        Copies the live rows into a new generation with room for `capacity` rows and switches to it.
+        """
+        self.switch(self.build(self.snapshot(), capacity))
+
+    def snapshot(self) -> dict:
+        """
+        The rows a rewrite copies, and the generation it writes. Taken under the store's lock; the
+        copy itself (`build`) may run without it, since appends only write past the snapshot's rows.
+        """
+        self.next_generation = max(self.next_generation, self.generation) + 1
+        return {
+            "generation": self.generation,
+            "new_generation": self.next_generation,
+            "count": self.count,
+            "deleted": set(self.deleted),
+            "vectors": self.vectors,
+            "scales": self.scales,
+            "metadata": self.metadata,
+        }
+
+    def build(self, snapshot: dict, capacity: int = None) -> dict:
+        """Writes the live rows of a snapshot into the files of its new generation."""
+        live = [row for row in range(snapshot["count"]) if row not in snapshot["deleted"]]
+        capacity = max(capacity or 0, INITIAL_CAPACITY, len(live))
+        vectors, scales = self._allocate(capacity, snapshot["new_generation"])
+        if live:
+            vectors[: len(live)] = snapshot["vectors"][live]
+            if scales is not None:
+                scales[: len(live)] = snapshot["scales"][live]
+        metadata = [snapshot["metadata"][row] for row in live]
+        self._write_rows(snapshot["new_generation"], vectors, scales, metadata, mode="w")
+        return {
+            **snapshot, "live": live, "vectors": vectors, "scales": scales, "metadata": metadata,
+        }
+
+    def _write_rows(self, generation: int, vectors, scales, entries: List[dict], mode: str = "a"):
+        if self.path is not None:
+            vectors.flush()
+            if scales is not None:
+                scales.flush()
+            with open(self._file("jsonl", generation), mode) as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _remove_generation(self, generation: int):
+        if self.path is not None:
+            for suffix in ("npy", "scales.npy", "jsonl"):
+                if os.path.exists(self._file(suffix, generation)):
+                    os.remove(self._file(suffix, generation))
+
+    def switch(self, built: dict) -> bool:
+        """
+        Switches to a built generation, under the store's lock. Rows appended and deleted since the
+        snapshot are carried over; if another rewrite switched generations in between, the built one
+        is dropped.
+        """
+        if built["generation"] != self.generation:
+            self._remove_generation(built["new_generation"])
+            return False
+
+        vectors, scales, metadata = built["vectors"], built["scales"], built["metadata"]
+        appended = [row for row in range(built["count"], self.count) if row not in self.deleted]
+        if len(metadata) + len(appended) > len(vectors):
+            self._remove_generation(built["new_generation"])
+            self.rewrite(capacity=2 * (self.count - len(self.deleted)))
+            return True
+        if appended:
+            start, end = len(metadata), len(metadata) + len(appended)
+            vectors[start:end] = self.vectors[appended]
+            if scales is not None:
+                scales[start:end] = self.scales[appended]
+            entries = [self.metadata[row] for row in appended]
+            self._write_rows(built["new_generation"], vectors, scales, entries)
+            metadata = metadata + entries
+
+        new_row = {row: i for i, row in enumerate(built["live"] + appended)}
+        old_generation = self.generation
+        self.generation, self.count = built["new_generation"], len(metadata)
+        self.deleted = {new_row[row] for row in self.deleted if row in new_row}
+        self.vectors, self.scales, self.metadata = vectors, scales, metadata
+        self.row_of_id = {
+            entry["id"]: row for row, entry in enumerate(metadata) if row not in self.deleted
+        }
+        self._datasets = None
+        self._save_state()
+        self._remove_generation(old_generation)
+        return True
+
+    def append(self, vectors: np.ndarray, entries: List[dict]):
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension mismatch: expected {self.dim}, got {vectors.shape[1]}"
+            )
+
+        n = len(entries)
+        if self.vectors is None or self.count + n > len(self.vectors):
+            self.rewrite(capacity=2 * (self.count - len(self.deleted) + n))
+
+        start, end = self.count, self.count + n
+        if self.quantization == "int8":
+            self.vectors[start:end], self.scales[start:end] = _quantize(vectors)
+        else:
+            self.vectors[start:end] = vectors
+
+        if self.path is not None:
+            self.vectors.flush()
+            if self.scales is not None:
+                self.scales.flush()
+            with open(self._file("jsonl"), "a") as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+                f.flush()
+                os.fsync(f.fileno())
+
+        # the rows count once the state is replaced
+        self.count = end
+        self._save_state()
+        self.metadata.extend(entries)
+        for row, entry in enumerate(entries, start):
+            self.row_of_id[entry["id"]] = row
+        self._datasets = None
+
+    def delete(self, ids: List[str]) -> int:
+        rows = [self.row_of_id.pop(id) for id in ids if id in self.row_of_id]
+        if rows:
+            self.deleted.update(rows)
+            self._save_state()
+        return len(rows)
+
+    def datasets(self) -> np.ndarray:
+        if self._datasets is None:
+            self._datasets = np.array(
+                [entry.get("dataset", "default") for entry in self.metadata], dtype=object
+            )
+        return self._datasets
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of every query to every row, as one matrix product per chunk of rows.
+        """
+        scores = np.empty((len(queries), self.count), dtype=np.float32)
+        for start in range(0, self.count, SCORE_CHUNK_ROWS):
+            end = min(start + SCORE_CHUNK_ROWS, self.count)
+            chunk = np.asarray(self.vectors[start:end], dtype=np.float32)
+            scores[:, start:end] = queries @ chunk.T
+            if self.scales is not None:
+                scores[:, start:end] *= self.scales[start:end]
+        return scores
+
+
+class NumpyVectorStore(VannaBase):
+    """
+    In-process vector store without external services or libraries beyond NumPy. Each collection is
+    an embedding matrix, searched exactly with one matrix product and `argpartition`, which is fast
+    for small and medium stores (up to a few hundred thousand rows). Embeddings come from the
+    embedding class it is combined with, e.g.
+    `class MyVanna(NumpyVectorStore, OpenAI_Embeddings, OpenAI_Chat)`.
+
+    Args:
+        config (dict, optional): Configuration dictionary. Defaults to {}.
+            - client (str, optional): "persistent" to keep memory-mapped files in `path`, or
+              "in-memory". Defaults to "persistent".
+            - path (str, optional): Directory of the files. Defaults to ".".
+            - quantization (str, optional): "float32", or "int8" to store a quarter of the bytes per
+              vector. Defaults to "float32".
+            - embedding_dim (int, optional): Dimension of the embeddings. Defaults to the dimension
+              of the first added embedding.
+            - n_results, n_results_sql, n_results_ddl, n_results_documentation (int, optional):
+              Top-k of the searches. Defaults to 10.
+            - compact_threshold (float, optional): Fraction of deleted rows that triggers a
+              compaction. Defaults to 0.2.
+            - compact_min_rows (int, optional): Collections smaller than this are not compacted.
+              Defaults to 1000.
+            - background_compaction (bool, optional): Compact in a background thread.
+              Defaults to True.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        VannaBase.__init__(self, config=config)
+
+        self.curr_client = config.get("client", "persistent")
+        if self.curr_client not in ("persistent", "in-memory"):
+            raise ValueError(f"Unsupported storage type was set in config: {self.curr_client}")
+        self.path = config.get("path", ".") if self.curr_client == "persistent" else None
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+
+        self.quantization = config.get("quantization", "float32")
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(
+                f"Unsupported quantization was set in config: {self.quantization}, "
+                f"expected one of {QUANTIZATIONS}"
+            )
+        self.n_results_sql = config.get("n_results_sql", config.get("n_results", 10))
+        self.n_results_ddl = config.get("n_results_ddl", config.get("n_results", 10))
+        self.n_results_documentation = config.get(
+            "n_results_documentation", config.get("n_results", 10)
+        )
+        self.compact_threshold = config.get("compact_threshold", 0.2)
+        self.compact_min_rows = config.get("compact_min_rows", 1000)
+        self.background_compaction = config.get("background_compaction", True)
+
+        self._lock = threading.RLock()
+        self._compaction_thread = None
+        self.collections = {
+            name: _Collection(name, self.path, self.quantization, config.get("embedding_dim"))
+            for name in COLLECTIONS
+        }
+
+    def _embed(
+        self, texts: List[str], embeddings: Optional[List[List[float]]] = None
+    ) -> np.ndarray:
+        if embeddings is None:
+            embeddings = self.generate_embeddings(texts)
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _add(self, name: str, texts: List[str], entries: List[dict], **kwargs) -> List[str]:
+        if not texts:
+            return []
+        vectors = self._embed(texts, kwargs.get("embeddings"))
+        dataset = kwargs.get("dataset", "default")
+        entries = [
+            {"id": f"{uuid.uuid4()}-{COLLECTIONS[name]}", "dataset": dataset, **entry}
+            for entry in entries
+        ]
+        with self._lock:
+            self.collections[name].append(vectors, entries)
+        return [entry["id"] for entry in entries]
+
+    def add_question_sql_batch(
+        self, question_sql_pairs: List[Tuple[str, str]], **kwargs
+    ) -> List[str]:
+        return self._add(
+            "sql",
+            [question + " " + sql for question, sql in question_sql_pairs],
+            [{"question": question, "content": sql} for question, sql in question_sql_pairs],
+            **kwargs,
+        )
+
+    def add_ddl_batch(self, ddls: List[str], **kwargs) -> List[str]:
+        return self._add("ddl", ddls, [{"content": ddl} for ddl in ddls], **kwargs)
+
+    def add_documentation_batch(self, documentations: List[str], **kwargs) -> List[str]:
+        return self._add(
+            "documentation", documentations, [{"content": doc} for doc in documentations], **kwargs
+        )
+
+    def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
+        return self.add_question_sql_batch([(question, sql)], **kwargs)[0]
+
+    def add_ddl(self, ddl: str, **kwargs) -> str:
+        return self.add_ddl_batch([ddl], **kwargs)[0]
+
+    def add_documentation(self, documentation: str, **kwargs) -> str:
+        return self.add_documentation_batch([documentation], **kwargs)[0]
+
+    def search(
+        self,
+        name: str,
+        queries: np.ndarray,
+        k: int,
+        dataset: str = None,
+        with_scores: bool = False,
+    ) -> List[list]:
+        """
+        Returns the metadata of the top-k rows of a collection for each of the normalized query
+        vectors, or (metadata, cosine similarity) pairs with `with_scores`.
+        Deleted rows and, if `dataset` is given, rows of other datasets are masked out.
+        """
+        with self._lock:
+            collection = self.collections[name]
+            if collection.count == 0 or k <= 0:
+                return [[] for _ in queries]
+            scores = collection.scores(queries)
+            mask = np.zeros(collection.count, dtype=bool)
+            if collection.deleted:
+                mask[list(collection.deleted)] = True
+            if dataset is not None:
+                mask |= collection.datasets() != dataset
+            scores[:, mask] = -np.inf
+
+            k = min(k, collection.count - int(mask.sum()))
+            if k <= 0:
+                return [[] for _ in queries]
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            results = []
+            for query_scores, rows in zip(scores, top):
+                rows = rows[np.argsort(-query_scores[rows])]
+                if with_scores:
+                    results.append([
+                        (collection.metadata[row], float(query_scores[row])) for row in rows
+                    ])
+                else:
+                    results.append([collection.metadata[row] for row in rows])
+            return results
+
+    def _get_similar(self, name: str, question: str, k: int, **kwargs) -> List[tuple]:
+        query = self._embed([question])
+        return self.search(name, query, k, dataset=kwargs.get("dataset"), with_scores=True)[0]
+
+    @staticmethod
+    def _question_sql(scored: List[tuple]) -> list:
+        return [
+            ({"question": entry["question"], "sql": entry["content"]}, score)
+            for entry, score in scored
+        ]
+
+    @staticmethod
+    def _content(scored: List[tuple]) -> list:
+        return [(entry["content"], score) for entry, score in scored]
+
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        return self._question_sql(self._get_similar("sql", question, self.n_results_sql, **kwargs))
+
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return self._content(self._get_similar("ddl", question, self.n_results_ddl, **kwargs))
+
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        return self._content(
+            self._get_similar("documentation", question, self.n_results_documentation, **kwargs)
+        )
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
+        )
+
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
+
+    def get_related_documentation(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
+        )
+
+    def get_related_training_data_with_scores(
+        self, question: str, **kwargs
+    ) -> Tuple[list, list, list]:
+        # the question is embedded once for all three collections
+        query = self._embed([question])
+        dataset = kwargs.get("dataset")
+        sql, ddl, documentation = (
+            self.search(name, query, k, dataset, with_scores=True)[0]
+            for name, k in (
+                ("sql", self.n_results_sql),
+                ("ddl", self.n_results_ddl),
+                ("documentation", self.n_results_documentation),
+            )
+        )
+        return self._question_sql(sql), self._content(ddl), self._content(documentation)
+
+    def get_training_data(self, **kwargs) -> pd.DataFrame:
+        rows = []
+        with self._lock:
+            for name, collection in self.collections.items():
+                for row, entry in enumerate(collection.metadata):
+                    if row not in collection.deleted:
+                        rows.append({
+                            "id": entry["id"],
+                            "question": entry.get("question"),
+                            "content": entry["content"],
+                            "training_data_type": name,
+                            "dataset": entry.get("dataset", "default"),
+                        })
+        return pd.DataFrame(
+            rows, columns=["id", "question", "content", "training_data_type", "dataset"]
+        )
+
+    def iter_training_data_with_embeddings(self, batch_size: int = 1000, **kwargs):
+        for name in COLLECTIONS:
+            collection = self.collections[name]
+            with self._lock:
+                ids = list(collection.row_of_id)
+            for start in range(0, len(ids), batch_size):
+                with self._lock:
+                    # rows are looked up per chunk, a compaction in between renumbers them
+                    chunk = [
+                        collection.row_of_id[id]
+                        for id in ids[start:start + batch_size]
+                        if id in collection.row_of_id
+                    ]
+                    vectors = np.asarray(collection.vectors[chunk], dtype=np.float32)
+                    if collection.scales is not None:
+                        vectors *= collection.scales[chunk][:, None]
+                    entries = [collection.metadata[row] for row in chunk]
+                yield pd.DataFrame({
+                    "id": [entry["id"] for entry in entries],
+                    "training_data_type": name,
+                    "dataset": [entry.get("dataset", "default") for entry in entries],
+                    "question": [entry.get("question") for entry in entries],
+                    "content": [entry["content"] for entry in entries],
+                    "embedding": [vector.tolist() for vector in vectors],
+                })
+
+    def _collection_of_id(self, id: str) -> Optional[str]:
+        for name, suffix in COLLECTIONS.items():
+            if id.endswith(f"-{suffix}"):
+                return name
+        return None
+
+    def remove_training_data_batch(self, ids: List[str], **kwargs) -> int:
+        removed = 0
+        with self._lock:
+            for name in COLLECTIONS:
+                removed += self.collections[name].delete(
+                    [id for id in ids if self._collection_of_id(id) == name]
+                )
+        self._maybe_compact()
+        return removed
+
+    def remove_training_data(self, id: str, **kwargs) -> bool:
+        return self.remove_training_data_batch([id]) == 1
+
+    def remove_collection(self, collection_name: str) -> bool:
+        if collection_name not in COLLECTIONS:
+            return False
+        with self._lock:
+            collection = self.collections[collection_name]
+            if collection.dim is not None:
+                collection.delete(list(collection.row_of_id))
+                collection.rewrite()
+        return True
+
+    def _maybe_compact(self):
+        with self._lock:
+            names = [
+                name for name, collection in self.collections.items()
+                if collection.count >= max(self.compact_min_rows, 1)
+                and len(collection.deleted) / collection.count > self.compact_threshold
+            ]
+            running = self._compaction_thread is not None and self._compaction_thread.is_alive()
+            if not names or running:
+                return
+            if self.background_compaction:
+                # not a daemon, so the interpreter waits for a running rewrite before it exits
+                self._compaction_thread = threading.Thread(target=self.compact, args=(names,))
+                self._compaction_thread.start()
+                return
+        self.compact(names)
+
+    def compact(self, names: List[str] = None):
+        """
+        Drops the deleted rows of the given collections (default all) from their files. The new
+        files are written without holding the store's lock, which is only taken to snapshot the rows
+        and to switch.
+        """
+        for name in names or list(COLLECTIONS):
+            collection = self.collections[name]
+            with self._lock:
+                if not collection.deleted:
+                    continue
+                snapshot = collection.snapshot()
+            capacity = 2 * (snapshot["count"] - len(snapshot["deleted"]))
+            built = collection.build(snapshot, capacity=capacity)
+            with self._lock:
+                collection.switch(built)
+
+    def wait_for_compaction(self):
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join()
@@ -44,3 +44,18 @@ class OpenAI_Embeddings(VannaBase):
             )
 
         return embedding.get("data")[0]["embedding"]
+
+    def generate_embeddings(self, data: list[str], **kwargs) -> list[list[float]]:
+        if self.config is not None and "engine" in self.config:
+            embedding = self.client.embeddings.create(
+                engine=self.config["engine"],
+                input=data,
+            )
+        else:
+            embedding = self.client.embeddings.create(
+                model="text-embedding-ada-002",
+                input=data,
+            )
+
+        data = sorted(embedding.get("data"), key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
@@ -1,14 +1,51 @@
 import base64
+import importlib.util
 import uuid
 from typing import List
 
 import pandas as pd
-from opensearchpy import OpenSearch
+from opensearchpy import OpenSearch, helpers
 from ..types import TableMetadata
 
 from ..base import VannaBase
+from ..exceptions import DependencyError
 from ..utils import deterministic_uuid
 
+BULK_CHUNK_SIZE = 500
+SCAN_PAGE_SIZE = 1000
+SCAN_KEEP_ALIVE = "1m"
+SEARCH_MODES = ("hybrid", "knn", "bm25")
+# keyword arguments of the add methods that are not client.index parameters
+VANNA_KWARGS = ("dataset",)
+
+
+def _normalize_scores(hits: list) -> dict:
+  # min-max normalization, so that BM25 and kNN scores are comparable
+  if not hits:
+    return {}
+  scores = [hit["_score"] for hit in hits]
+  low, high = min(scores), max(scores)
+  if high == low:
+    return {hit["_id"]: 1.0 for hit in hits}
+  return {hit["_id"]: (hit["_score"] - low) / (high - low) for hit in hits}
+
+
+def _hybrid_merge(bm25_hits: list, knn_hits: list, knn_weight: float,
+                  size: int) -> list:
+  """
+  Combines the normalized scores of both result lists into (hit, score) pairs, a hit missing from
+  one list scores 0 there.
+  """
+  bm25_scores = _normalize_scores(bm25_hits)
+  knn_scores = _normalize_scores(knn_hits)
+  hits = {hit["_id"]: hit for hit in bm25_hits + knn_hits}
+  scores = {
+    id: (1 - knn_weight) * bm25_scores.get(id, 0.0) + knn_weight * knn_scores.get(id, 0.0)
+    for id in hits
+  }
+  ranked = sorted(hits, key=lambda id: scores[id], reverse=True)[:size]
+  return [(hits[id], scores[id]) for id in ranked]
+
 
 class OpenSearch_VectorStore(VannaBase):
   def __init__(self, config=None):
@@ -107,6 +144,36 @@ class OpenSearch_VectorStore(VannaBase):
       question_sql_index_settings = config["es_question_sql_index_settings"]
 
     self.n_results = config.get("n_results", 10)
+    self.search_mode = config.get("search_mode")
+    if self.search_mode is None:
+      # without sentence-transformers (not part of the opensearch extra) the store keeps its
+      # plain BM25 search
+      self.search_mode = "hybrid" if importlib.util.find_spec("sentence_transformers") else "bm25"
+    if self.search_mode not in SEARCH_MODES:
+      raise ValueError(f"Unsupported search_mode {self.search_mode}, use one of {SEARCH_MODES}")
+    self.hybrid_knn_weight = config.get("hybrid_knn_weight", 0.5)
+    self.embedding_model_name = config.get("embedding_model", "all-MiniLM-L6-v2")
+    self._embedding_model = None
+    self.embedding_dim = config.get("embedding_dim")
+
+    if self.search_mode != "bm25":
+      # custom index settings are used as given
+      for index_settings, custom_key in [
+        (document_index_settings, "es_document_index_settings"),
+        (ddl_index_settings, "es_ddl_index_settings"),
+        (question_sql_index_settings, "es_question_sql_index_settings"),
+      ]:
+        if custom_key not in config:
+          index_settings["settings"]["index"]["knn"] = True
+          index_settings["mappings"]["properties"]["embedding"] = {
+            "type": "knn_vector",
+            "dimension": self.get_embedding_dim(),
+            "method": {
+              "name": "hnsw",
+              "space_type": "cosinesimil",
+              "engine": "lucene",
+            },
+          }
 
     self.document_index_settings = document_index_settings
     self.ddl_index_settings = ddl_index_settings
@@ -223,6 +290,136 @@ class OpenSearch_VectorStore(VannaBase):
     self.create_index_if_not_exists(self.question_sql_index,
                                     self.question_sql_index_settings)
 
+    # indices created before vector search keep working with BM25 only
+    self.knn_indices = set()
+    if self.search_mode != "bm25":
+      for index in [self.document_index, self.ddl_index,
+                    self.question_sql_index]:
+        if self._has_embedding_field(index):
+          self.knn_indices.add(index)
+        else:
+          print(f"Index {index} has no embedding field, using BM25 search")
+
+  def _has_embedding_field(self, index: str) -> bool:
+    try:
+      mappings = self.client.indices.get_mapping(index=index)
+      properties = mappings[index]["mappings"].get("properties", {})
+      return properties.get("embedding", {}).get("type") == "knn_vector"
+    except Exception as e:
+      print(f"Error reading mapping of index {index}: ", e)
+      return False
+
+  @property
+  def embedding_model(self):
+    if self._embedding_model is None:
+      try:
+        from sentence_transformers import SentenceTransformer
+      except ImportError:
+        raise DependencyError(
+          "SentenceTransformer is not installed. "
+          "Please install it with 'pip install sentence-transformers'."
+        )
+      self._embedding_model = SentenceTransformer(self.embedding_model_name)
+    return self._embedding_model
+
+  def get_embedding_dim(self) -> int:
+    if self.embedding_dim is None:
+      self.embedding_dim = len(self.generate_embedding("dimension"))
+    return self.embedding_dim
+
+  def _with_embeddings(self, index: str, docs: List[tuple],
+                       field: str) -> List[tuple]:
+    if index not in getattr(self, "knn_indices", ()):
+      return docs
+    embeddings = self.generate_embeddings([body[field] for _, body in docs])
+    return [(id, {**body, "embedding": embedding})
+            for (id, body), embedding in zip(docs, embeddings)]
+
+  def _search(self, index: str, field: str, question: str,
+              size: int) -> list:
+    return self._multi_search(question, [(index, field, size)])[0]
+
+  def _multi_search(self, question: str, searches: List[tuple]) -> List[list]:
+    """
+    Searches several (index, field, size) targets with BM25, kNN or both, depending on
+    `search_mode`, all in one msearch request, and returns (hit, score) pairs per target. The
+    question is embedded at most once. Hybrid search merges the min-max normalized scores,
+    weighted by `hybrid_knn_weight`.
+    kNN scores are cosine similarities, BM25 scores are unbounded.
+    """
+    source = {"excludes": ["embedding"]}
+    embedding = None
+    body, plans = [], []
+    for index, field, size in searches:
+      modes = ["bm25"] if self.search_mode == "bm25" or index not in self.knn_indices \
+        else ["knn"] if self.search_mode == "knn" else ["bm25", "knn"]
+      for mode in modes:
+        if mode == "bm25":
+          query = {"match": {field: question}}
+        else:
+          if embedding is None:
+            embedding = self.generate_embedding(question)
+          query = {"knn": {"embedding": {"vector": embedding, "k": size}}}
+        body += [{"index": index}, {"size": size, "_source": source, "query": query}]
+      plans.append((index, size, modes))
+
+    responses = iter(self.client.msearch(body=body)["responses"])
+    results = []
+    for index, size, modes in plans:
+      hits = {}
+      for mode in modes:
+        response = next(responses)
+        if "error" in response:
+          raise Exception(f"Error searching index {index}: {response['error']}")
+        hits[mode] = response["hits"]["hits"]
+      if modes == ["bm25"]:
+        results.append([(hit, hit["_score"]) for hit in hits["bm25"]])
+      elif modes == ["knn"]:
+        # cosinesimil scores are (1 + cosine similarity) / 2
+        results.append([(hit, 2 * hit["_score"] - 1) for hit in hits["knn"]])
+      else:
+        results.append(_hybrid_merge(hits["bm25"], hits["knn"], self.hybrid_knn_weight, size))
+    return results
+
+  def _scan(self, index: str):
+    """
+    Yields all hits of an index, paging with a point in time and search_after. Clusters without
+    point in time support (before 2.4) fall back to a scroll.
+    """
+    source = {"excludes": ["embedding"]}
+    try:
+      pit_id = self.client.create_point_in_time(
+        index=index, keep_alive=SCAN_KEEP_ALIVE)["pit_id"]
+    except Exception as e:
+      print(f"Point in time is not available for index {index}, using scroll: ", e)
+      yield from helpers.scan(self.client, index=index,
+                              query={"query": {"match_all": {}}, "_source": source},
+                              size=SCAN_PAGE_SIZE)
+      return
+
+    try:
+      search_after = None
+      while True:
+        body = {
+          "size": SCAN_PAGE_SIZE,
+          "query": {"match_all": {}},
+          "_source": source,
+          "pit": {"id": pit_id, "keep_alive": SCAN_KEEP_ALIVE},
+          "sort": [{"_shard_doc": "asc"}],
+        }
+        if search_after is not None:
+          body["search_after"] = search_after
+        hits = self.client.search(body=body)["hits"]["hits"]
+        if not hits:
+          break
+        yield from hits
+        search_after = hits[-1]["sort"]
+    finally:
+      try:
+        self.client.delete_point_in_time(body={"pit_id": [pit_id]})
+      except Exception as e:
+        print(f"Error deleting point in time of index {index}: ", e)
+
   def create_index(self):
     for index in [self.document_index, self.ddl_index,
                   self.question_sql_index]:
@@ -272,8 +469,9 @@ class OpenSearch_VectorStore(VannaBase):
       "table_name": table_metadata.table_name,
       "ddl": ddl
     }
+    [(id, ddl_dict)] = self._with_embeddings(self.ddl_index, [(id, ddl_dict)], "ddl")
     response = self.client.index(index=self.ddl_index, body=ddl_dict, id=id,
-                                 **kwargs)
+                                 **self._index_kwargs(kwargs))
     return response['_id']
 
   def add_documentation(self, doc: str, **kwargs) -> str:
@@ -282,8 +480,9 @@ class OpenSearch_VectorStore(VannaBase):
     doc_dict = {
       "doc": doc
     }
+    [(id, doc_dict)] = self._with_embeddings(self.document_index, [(id, doc_dict)], "doc")
     response = self.client.index(index=self.document_index, id=id,
-                                 body=doc_dict, **kwargs)
+                                 body=doc_dict, **self._index_kwargs(kwargs))
     return response['_id']
 
   def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
@@ -293,56 +492,95 @@ class OpenSearch_VectorStore(VannaBase):
       "question": question,
       "sql": sql
     }
+    [(id, question_sql_dict)] = self._with_embeddings(
+      self.question_sql_index, [(id, question_sql_dict)], "question")
     response = self.client.index(index=self.question_sql_index,
                                  body=question_sql_dict, id=id,
-                                 **kwargs)
+                                 **self._index_kwargs(kwargs))
     return response['_id']
 
+  @staticmethod
+  def _index_kwargs(kwargs: dict) -> dict:
+    # e.g. refresh=True is passed on to client.index
+    return {key: value for key, value in kwargs.items() if key not in VANNA_KWARGS}
+
+  def _bulk_index(self, index: str, docs: List[tuple], field: str) -> List[str]:
+    docs = self._with_embeddings(index, docs, field)
+    actions = [{"_index": index, "_id": id, "_source": body} for id, body in docs]
+    helpers.bulk(self.client, actions, chunk_size=BULK_CHUNK_SIZE)
+    return [id for id, _ in docs]
+
+  def add_ddl_batch(self, ddls: List[str], engine: str = None,
+                    **kwargs) -> List[str]:
+    docs = []
+    for ddl in ddls:
+      table_metadata = VannaBase.extract_table_metadata(ddl)
+      full_table_name = table_metadata.get_full_table_name()
+      if full_table_name is not None and engine is not None:
+        id = deterministic_uuid(engine + "-" + full_table_name) + "-ddl"
+      else:
+        id = str(uuid.uuid4()) + "-ddl"
+      docs.append((id, {
+        "engine": engine,
+        "catalog": table_metadata.catalog,
+        "schema": table_metadata.schema,
+        "table_name": table_metadata.table_name,
+        "ddl": ddl
+      }))
+    return self._bulk_index(self.ddl_index, docs, "ddl")
+
+  def add_documentation_batch(self, documentations: List[str],
+                              **kwargs) -> List[str]:
+    return self._bulk_index(self.document_index, [
+      (str(uuid.uuid4()) + "-doc", {"doc": doc}) for doc in documentations
+    ], "doc")
+
+  def add_question_sql_batch(self, question_sql_pairs: List[tuple],
+                             **kwargs) -> List[str]:
+    return self._bulk_index(self.question_sql_index, [
+      (str(uuid.uuid4()) + "-sql", {"question": question, "sql": sql})
+      for question, sql in question_sql_pairs
+    ], "question")
+
+  def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+    scored = self._search(self.ddl_index, "ddl", question, self.n_results)
+    return [(hit['_source']['ddl'], score) for hit, score in scored]
+
+  def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+    scored = self._search(self.document_index, "doc", question, self.n_results)
+    return [(hit['_source']['doc'], score) for hit, score in scored]
+
+  def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+    scored = self._search(self.question_sql_index, "question", question,
+                          self.n_results)
+    return [({"question": hit['_source']['question'], "sql": hit['_source']['sql']}, score)
+            for hit, score in scored]
+
+  def get_related_training_data_with_scores(self, question: str, **kwargs) -> tuple:
+    # one msearch request for the three indices
+    sql, ddl, docs = self._multi_search(question, [
+      (self.question_sql_index, "question", self.n_results),
+      (self.ddl_index, "ddl", self.n_results),
+      (self.document_index, "doc", self.n_results),
+    ])
+    return (
+      [({"question": hit['_source']['question'], "sql": hit['_source']['sql']}, score)
+       for hit, score in sql],
+      [(hit['_source']['ddl'], score) for hit, score in ddl],
+      [(hit['_source']['doc'], score) for hit, score in docs],
+    )
+
   def get_related_ddl(self, question: str, **kwargs) -> List[str]:
-    # Assume you have some vector search mechanism associated with your data
-    query = {
-      "query": {
-        "match": {
-          "ddl": question
-        }
-      },
-      "size": self.n_results
-    }
-    print(query)
-    response = self.client.search(index=self.ddl_index, body=query,
-                                  **kwargs)
-    return [hit['_source']['ddl'] for hit in response['hits']['hits']]
+    return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
 
   def get_related_documentation(self, question: str, **kwargs) -> List[str]:
-    query = {
-      "query": {
-        "match": {
-          "doc": question
-        }
-      },
-      "size": self.n_results
-    }
-    print(query)
-    response = self.client.search(index=self.document_index,
-                                  body=query,
-                                  **kwargs)
-    return [hit['_source']['doc'] for hit in response['hits']['hits']]
-
-  def get_similar_question_sql(self, question: str, **kwargs) -> List[str]:
-    query = {
-      "query": {
-        "match": {
-          "question": question
-        }
-      },
-      "size": self.n_results
-    }
-    print(query)
-    response = self.client.search(index=self.question_sql_index,
-                                  body=query,
-                                  **kwargs)
-    return [(hit['_source']['question'], hit['_source']['sql']) for hit in
-            response['hits']['hits']]
+    return self.select_relevant(
+      self.get_related_documentation_with_scores(question, **kwargs), "documentation")
+
+  def get_similar_question_sql(self, question: str, **kwargs) -> List[dict]:
+    return self.select_relevant(
+        self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
+    )
 
   def search_tables_metadata(self,
                             engine: str = None,
@@ -383,22 +621,15 @@ class OpenSearch_VectorStore(VannaBase):
 
     if size > 0:
       query["size"] = size
+    query["_source"] = {"excludes": ["embedding"]}
 
     print(query)
     response = self.client.search(index=self.ddl_index, body=query, **kwargs)
     return [hit['_source'] for hit in response['hits']['hits']]
 
   def get_training_data(self, **kwargs) -> pd.DataFrame:
-    # This will be a simple example pulling all data from an index
-    # WARNING: Do not use this approach in production for large indices!
     data = []
-    response = self.client.search(
-      index=self.document_index,
-      body={"query": {"match_all": {}}},
-      size=1000
-    )
-    # records = [hit['_source'] for hit in response['hits']['hits']]
-    for hit in response['hits']['hits']:
+    for hit in self._scan(self.document_index):
       data.append(
         {
           "id": hit["_id"],
@@ -408,13 +639,7 @@ class OpenSearch_VectorStore(VannaBase):
         }
       )
 
-    response = self.client.search(
-      index=self.question_sql_index,
-      body={"query": {"match_all": {}}},
-      size=1000
-    )
-    # records = [hit['_source'] for hit in response['hits']['hits']]
-    for hit in response['hits']['hits']:
+    for hit in self._scan(self.question_sql_index):
       data.append(
         {
           "id": hit["_id"],
@@ -424,13 +649,7 @@ class OpenSearch_VectorStore(VannaBase):
         }
       )
 
-    response = self.client.search(
-      index=self.ddl_index,
-      body={"query": {"match_all": {}}},
-      size=1000
-    )
-    # records = [hit['_source'] for hit in response['hits']['hits']]
-    for hit in response['hits']['hits']:
+    for hit in self._scan(self.ddl_index):
       data.append(
         {
           "id": hit["_id"],
@@ -460,8 +679,10 @@ class OpenSearch_VectorStore(VannaBase):
       return False
 
   def generate_embedding(self, data: str, **kwargs) -> list[float]:
-    # opensearch doesn't need to generate embeddings
-    pass
+    return self.embedding_model.encode(data).tolist()
+
+  def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+    return self.embedding_model.encode(data, batch_size=64).tolist()
 
 # OpenSearch_VectorStore.__init__(self, config={'es_urls':
 # "https://opensearch-node.test.com:9200", 'es_encoded_base64': True, 'es_user':
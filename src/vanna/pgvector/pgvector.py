@@ -12,6 +12,8 @@ from .. import ValidationError
 from ..base import VannaBase
 from ..types import TrainingPlan, TrainingPlanItem
 
+INSERT_BATCH_SIZE = 500
+
 
 class PG_VectorStore(VannaBase):
     def __init__(self, config=None):
@@ -47,6 +49,118 @@ class PG_VectorStore(VannaBase):
             connection=self.connection_string,
         )
 
+        self._engine = None
+        self._collection_ids = None
+        self.embedding_dim = config.get("embedding_dim")
+        self.hnsw_m = config.get("hnsw_m", 16)
+        self.hnsw_ef_construction = config.get("hnsw_ef_construction", 64)
+        self.hnsw_ef_search = config.get("hnsw_ef_search", 40)
+        # created on the first write rather than here, so read-only instances skip the embedding
+        # call and the DDL
+        self._hnsw_indexes_pending = config.get("create_hnsw_index", True)
+
+    @property
+    def engine(self):
+        # one engine (and connection pool) per store instead of one per call
+        if self._engine is None:
+            self._engine = create_engine(self.connection_string)
+        return self._engine
+
+    def _get_embedding_dim(self) -> int:
+        if self.embedding_dim is None:
+            self.embedding_dim = len(self.embedding_function.embed_query("dimension"))
+        return self.embedding_dim
+
+    def _get_collection_ids(self) -> dict:
+        if self._collection_ids is None:
+            with self.engine.connect() as connection:
+                rows = connection.execute(
+                    text(
+                        "SELECT name, uuid FROM langchain_pg_collection "
+                        "WHERE name IN ('sql', 'ddl', 'documentation')"
+                    )
+                ).fetchall()
+            self._collection_ids = {name: str(uuid) for name, uuid in rows}
+        return self._collection_ids
+
+    def _ensure_hnsw_indexes(self):
+        if self._hnsw_indexes_pending:
+            self._hnsw_indexes_pending = False
+            self.create_hnsw_indexes()
+
+    def create_hnsw_indexes(self) -> bool:
+        """
+        Creates a pgvector HNSW index (cosine distance, `hnsw_m` and `hnsw_ef_construction` from
+        the config) per collection if it does not exist yet. langchain_postgres stores all
+        collections in one table with an untyped `embedding` column, so each index is a partial
+        index over the embedding cast to its dimension. Runs once on the first write unless
+        config "create_hnsw_index" is False.
+
+        Returns:
+            bool: True if the indexes exist, False if they could not be created (e.g. pgvector <
+            0.5.0).
+        """
+        dim = self._get_embedding_dim()
+        try:
+            with self.engine.connect() as connection:
+                with connection.begin():
+                    for name, collection_id in self._get_collection_ids().items():
+                        connection.execute(
+                            text(
+                                f"CREATE INDEX IF NOT EXISTS vanna_{name}_embedding_hnsw "
+                                f"ON langchain_pg_embedding "
+                                f"USING hnsw ((embedding::vector({dim})) vector_cosine_ops) "
+                                f"WITH (m = {int(self.hnsw_m)}, "
+                                f"ef_construction = {int(self.hnsw_ef_construction)}) "
+                                f"WHERE collection_id = '{collection_id}'"
+                            )
+                        )
+            return True
+        except Exception as e:
+            logging.warning(f"Could not create HNSW indexes: {e}")
+            return False
+
+    def _search(self, question: str, n_results: dict) -> dict:
+        """
+        Returns the top-k (document, cosine similarity) pairs of several collections with one query,
+        e.g. `n_results={"sql": 10, "ddl": 10}`. The question is embedded once, and the ORDER BY
+        matches the HNSW index expressions.
+        """
+        dim = self._get_embedding_dim()
+        collection_ids = self._get_collection_ids()
+        subqueries = [
+            f"(SELECT '{name}' AS collection, document, "
+            f"1 - ((embedding::vector({dim})) <=> CAST(:embedding AS vector({dim}))) AS score "
+            f"FROM langchain_pg_embedding "
+            f"WHERE collection_id = '{collection_ids[name]}' "
+            f"ORDER BY (embedding::vector({dim})) <=> CAST(:embedding AS vector({dim})) "
+            f"LIMIT {int(k)})"
+            for name, k in n_results.items()
+            if name in collection_ids
+        ]
+        results = {name: [] for name in n_results}
+        if not subqueries:
+            return results
+
+        embedding = self.embedding_function.embed_query(question)
+        with self.engine.connect() as connection:
+            with connection.begin():
+                connection.execute(text(f"SET LOCAL hnsw.ef_search = {int(self.hnsw_ef_search)}"))
+                rows = connection.execute(
+                    text(" UNION ALL ".join(subqueries)), {"embedding": str(list(embedding))}
+                ).fetchall()
+        for collection, document, score in rows:
+            results[collection].append((document, float(score)))
+        return results
+
+    @staticmethod
+    def _parse_question_sql(page_content: str) -> dict:
+        try:
+            return json.loads(page_content)
+        except ValueError:
+            # rows written before page_content was JSON
+            return ast.literal_eval(page_content)
+
     def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
         question_sql_json = json.dumps(
             {
@@ -62,6 +176,7 @@ class PG_VectorStore(VannaBase):
             metadata={"id": id, "createdat": createdat},
         )
         self.sql_collection.add_documents([doc], ids=[doc.metadata["id"]])
+        self._ensure_hnsw_indexes()
 
         return id
 
@@ -72,6 +187,7 @@ class PG_VectorStore(VannaBase):
             metadata={"id": _id},
         )
         self.ddl_collection.add_documents([doc], ids=[doc.metadata["id"]])
+        self._ensure_hnsw_indexes()
         return _id
 
     def add_documentation(self, documentation: str, **kwargs) -> str:
@@ -81,8 +197,45 @@ class PG_VectorStore(VannaBase):
             metadata={"id": _id},
         )
         self.documentation_collection.add_documents([doc], ids=[doc.metadata["id"]])
+        self._ensure_hnsw_indexes()
         return _id
 
+    def _add_documents_batch(
+        self, collection, id_suffix: str, contents: list, metadata: dict = None
+    ) -> list:
+        # PGVector embeds the documents with one embed_documents call and writes them in one
+        # statement
+        docs = [
+            Document(
+                page_content=content,
+                metadata={"id": str(uuid.uuid4()) + id_suffix, **(metadata or {})},
+            )
+            for content in contents
+        ]
+        for i in range(0, len(docs), INSERT_BATCH_SIZE):
+            batch = docs[i : i + INSERT_BATCH_SIZE]
+            collection.add_documents(batch, ids=[doc.metadata["id"] for doc in batch])
+        if docs:
+            self._ensure_hnsw_indexes()
+        return [doc.metadata["id"] for doc in docs]
+
+    def add_question_sql_batch(self, question_sql_pairs: list, **kwargs) -> list:
+        return self._add_documents_batch(
+            self.sql_collection,
+            "-sql",
+            [
+                json.dumps({"question": question, "sql": sql}, ensure_ascii=False)
+                for question, sql in question_sql_pairs
+            ],
+            metadata={"createdat": kwargs.get("createdat")},
+        )
+
+    def add_ddl_batch(self, ddls: list, **kwargs) -> list:
+        return self._add_documents_batch(self.ddl_collection, "-ddl", ddls)
+
+    def add_documentation_batch(self, documentations: list, **kwargs) -> list:
+        return self._add_documents_batch(self.documentation_collection, "-doc", documentations)
+
     def get_collection(self, collection_name):
         match collection_name:
             case "sql":
@@ -94,17 +247,39 @@ class PG_VectorStore(VannaBase):
             case _:
                 raise ValueError("Specified collection does not exist.")
 
-    def get_similar_question_sql(self, question: str) -> list:
-        documents = self.sql_collection.similarity_search(query=question, k=self.n_results)
-        return [ast.literal_eval(document.page_content) for document in documents]
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        scored = self._search(question, {"sql": self.n_results})["sql"]
+        return [(self._parse_question_sql(document), score) for document, score in scored]
+
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return self._search(question, {"ddl": self.n_results})["ddl"]
+
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        return self._search(question, {"documentation": self.n_results})["documentation"]
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
+        )
 
     def get_related_ddl(self, question: str, **kwargs) -> list:
-        documents = self.ddl_collection.similarity_search(query=question, k=self.n_results)
-        return [document.page_content for document in documents]
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
 
     def get_related_documentation(self, question: str, **kwargs) -> list:
-        documents = self.documentation_collection.similarity_search(query=question, k=self.n_results)
-        return [document.page_content for document in documents]
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
+        )
+
+    def get_related_training_data_with_scores(self, question: str, **kwargs) -> tuple:
+        results = self._search(
+            question,
+            {"sql": self.n_results, "ddl": self.n_results, "documentation": self.n_results},
+        )
+        return (
+            [(self._parse_question_sql(document), score) for document, score in results["sql"]],
+            results["ddl"],
+            results["documentation"],
+        )
 
     def train(
         self,
@@ -130,21 +305,26 @@ class PG_VectorStore(VannaBase):
             return self.add_ddl(ddl)
 
         if plan:
-            for item in plan._plan:
-                if item.item_type == TrainingPlanItem.ITEM_TYPE_DDL:
-                    self.add_ddl(item.item_value)
-                elif item.item_type == TrainingPlanItem.ITEM_TYPE_IS:
-                    self.add_documentation(item.item_value)
-                elif item.item_type == TrainingPlanItem.ITEM_TYPE_SQL and item.item_name:
-                    self.add_question_sql(question=item.item_name, sql=item.item_value)
+            self.add_ddl_batch([
+                item.item_value for item in plan._plan
+                if item.item_type == TrainingPlanItem.ITEM_TYPE_DDL
+            ])
+            self.add_documentation_batch([
+                item.item_value for item in plan._plan
+                if item.item_type == TrainingPlanItem.ITEM_TYPE_IS
+            ])
+            self.add_question_sql_batch(
+                [
+                    (item.item_name, item.item_value)
+                    for item in plan._plan
+                    if item.item_type == TrainingPlanItem.ITEM_TYPE_SQL and item.item_name
+                ]
+            )
 
     def get_training_data(self, **kwargs) -> pd.DataFrame:
-        # Establishing the connection
-        engine = create_engine(self.connection_string)
-
         # Querying the 'langchain_pg_embedding' table
         query_embedding = "SELECT cmetadata, document FROM langchain_pg_embedding"
-        df_embedding = pd.read_sql(query_embedding, engine)
+        df_embedding = pd.read_sql(query_embedding, self.engine)
 
         # List to accumulate the processed rows
         processed_rows = []
@@ -158,7 +338,7 @@ class PG_VectorStore(VannaBase):
             if training_data_type == "sql":
                 # Convert the document string to a dictionary
                 try:
-                    doc_dict = ast.literal_eval(document)
+                    doc_dict = self._parse_question_sql(document)
                     question = doc_dict.get("question")
                     content = doc_dict.get("sql")
                 except (ValueError, SyntaxError):
@@ -183,9 +363,6 @@ class PG_VectorStore(VannaBase):
         return df_processed
 
     def remove_training_data(self, id: str, **kwargs) -> bool:
-        # Create the database engine
-        engine = create_engine(self.connection_string)
-
         # SQL DELETE statement
         delete_statement = text(
             """
@@ -195,7 +372,7 @@ class PG_VectorStore(VannaBase):
         )
 
         # Connect to the database and execute the delete statement
-        with engine.connect() as connection:
+        with self.engine.connect() as connection:
             # Start a transaction
             with connection.begin() as transaction:
                 try:
@@ -211,8 +388,6 @@ class PG_VectorStore(VannaBase):
                     return False
 
     def remove_collection(self, collection_name: str) -> bool:
-        engine = create_engine(self.connection_string)
-
         # Determine the suffix to look for based on the collection name
         suffix_map = {"ddl": "ddl", "sql": "sql", "documentation": "doc"}
         suffix = suffix_map.get(collection_name)
@@ -230,7 +405,7 @@ class PG_VectorStore(VannaBase):
         )
 
         # Execute the deletion within a transaction block
-        with engine.connect() as connection:
+        with self.engine.connect() as connection:
             with connection.begin() as transaction:
                 try:
                     result = connection.execute(query)
@@ -1,13 +1,17 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 from pinecone import Pinecone, PodSpec, ServerlessSpec
 import pandas as pd
-from ..base import VannaBase
+from ..base import VannaBase, relevance
 from ..utils import deterministic_uuid
 
 from fastembed import TextEmbedding
 
+UPSERT_BATCH_SIZE = 100
+FETCH_BATCH_SIZE = 100
+
 
 class PineconeDB_VectorStore(VannaBase):
     """
@@ -29,6 +33,12 @@ class PineconeDB_VectorStore(VannaBase):
             - server_type (str, optional): Type of Pinecone server to use. Defaults to "serverless". Options are "serverless" or "pod".
             - podspec (PodSpec, optional): PodSpec configuration if using a pinecone pod. Defaults to PodSpec(environment="us-west-2", pod_type="p1.x1", metadata_config=self.metadata_config).
             - serverless_spec (ServerlessSpec, optional): ServerlessSpec configuration if using a pinecone serverless index. Defaults to ServerlessSpec(cloud="aws", region="us-west-2").
+            - upsert_batch_size (int, optional): Number of vectors per upsert request of batched
+              adds. Defaults to 100.
+            - fetch_batch_size (int, optional): Number of ids per existence check of batched adds.
+              Defaults to 100.
+            - max_concurrent_requests (int, optional): Number of fetch and upsert requests of
+              batched adds in flight at once. Defaults to 4.
     Raises:
         ValueError: If config is None, api_key is not provided OR client is not provided, client is not an instance of Pinecone, or server_type is not "serverless" or "pod".
     """
@@ -77,6 +87,10 @@ class PineconeDB_VectorStore(VannaBase):
         self.serverless_spec = config.get(
             "serverless_spec", ServerlessSpec(cloud="aws", region="us-west-2")
         )
+        self.upsert_batch_size = config.get("upsert_batch_size", UPSERT_BATCH_SIZE)
+        self.fetch_batch_size = config.get("fetch_batch_size", FETCH_BATCH_SIZE)
+        self.max_concurrent_requests = config.get("max_concurrent_requests", 4)
+        self._embedding_model = None
         self._setup_index()
 
     def _set_index_host(self, host: str) -> None:
@@ -168,48 +182,123 @@ class PineconeDB_VectorStore(VannaBase):
         )
         return id
 
-    def get_related_ddl(self, question: str, **kwargs) -> list:
-        res = self.Index.query(
-            namespace=self.ddl_namespace,
-            vector=self.generate_embedding(question),
-            top_k=self.n_results,
-            include_values=True,
-            include_metadata=True,
-        )
-        return [match["metadata"]["ddl"] for match in res["matches"]] if res else []
+    def _upsert_batch(self, namespace: str, items: List[tuple]) -> List[str]:
+        """
+        Upserts (id, text, metadata) items, skipping ids that are already in the namespace.
+        Existence checks are multi-id fetches, and only the missing items are embedded and upserted.
+        """
+        items = list({id: (id, text, metadata) for id, text, metadata in items}.values())
+        id_batches = [
+            [id for id, _, _ in items[i : i + self.fetch_batch_size]]
+            for i in range(0, len(items), self.fetch_batch_size)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            existing = set()
+            for response in executor.map(
+                lambda ids: self.Index.fetch(ids=ids, namespace=namespace), id_batches
+            ):
+                existing.update(response["vectors"].keys())
 
-    def get_related_documentation(self, question: str, **kwargs) -> list:
-        res = self.Index.query(
-            namespace=self.documentation_namespace,
-            vector=self.generate_embedding(question),
-            top_k=self.n_results,
-            include_values=True,
-            include_metadata=True,
+            new_items = [item for item in items if item[0] not in existing]
+            futures = []
+            for i in range(0, len(new_items), self.upsert_batch_size):
+                batch = new_items[i : i + self.upsert_batch_size]
+                # embedding the next batch overlaps with the upserts in flight
+                embeddings = self.generate_embeddings([text for _, text, _ in batch])
+                futures.append(
+                    executor.submit(
+                        self.Index.upsert,
+                        vectors=[
+                            (id, embedding, metadata)
+                            for (id, _, metadata), embedding in zip(batch, embeddings)
+                        ],
+                        namespace=namespace,
+                    )
+                )
+            for future in futures:
+                future.result()
+        return [id for id, _, _ in items]
+
+    def add_ddl_batch(self, ddls: List[str], **kwargs) -> List[str]:
+        return self._upsert_batch(
+            self.ddl_namespace,
+            [(deterministic_uuid(ddl) + "-ddl", ddl, {"ddl": ddl}) for ddl in ddls],
         )
-        return (
-            [match["metadata"]["documentation"] for match in res["matches"]]
-            if res
-            else []
+
+    def add_documentation_batch(self, documentations: List[str], **kwargs) -> List[str]:
+        return self._upsert_batch(
+            self.documentation_namespace,
+            [
+                (deterministic_uuid(doc) + "-doc", doc, {"documentation": doc})
+                for doc in documentations
+            ],
         )
 
-    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+    def add_question_sql_batch(self, question_sql_pairs: List[tuple], **kwargs) -> List[str]:
+        items = []
+        for question, sql in question_sql_pairs:
+            question_sql_json = json.dumps(
+                {
+                    "question": question,
+                    "sql": sql,
+                },
+                ensure_ascii=False,
+            )
+            items.append(
+                (
+                    deterministic_uuid(question_sql_json) + "-sql",
+                    question_sql_json,
+                    {"sql": question_sql_json},
+                )
+            )
+        return self._upsert_batch(self.sql_namespace, items)
+
+    def _query_with_scores(self, namespace: str, question: str) -> list:
         res = self.Index.query(
-            namespace=self.sql_namespace,
+            namespace=namespace,
             vector=self.generate_embedding(question),
             top_k=self.n_results,
-            include_values=True,
             include_metadata=True,
         )
-        return (
-            [
-                {
-                    key: value
-                    for key, value in json.loads(match["metadata"]["sql"]).items()
-                }
+        if not res:
+            return []
+        # euclidean scores are squared distances, cosine and dotproduct scores similarities
+        if self.distance_metric == "euclidean":
+            return [
+                (match["metadata"], relevance.l2_distance_to_score(match["score"]))
                 for match in res["matches"]
             ]
-            if res
-            else []
+        return [(match["metadata"], match["score"]) for match in res["matches"]]
+
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return [
+            (metadata["ddl"], score)
+            for metadata, score in self._query_with_scores(self.ddl_namespace, question)
+        ]
+
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        return [
+            (metadata["documentation"], score)
+            for metadata, score in self._query_with_scores(self.documentation_namespace, question)
+        ]
+
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        return [
+            (json.loads(metadata["sql"]), score)
+            for metadata, score in self._query_with_scores(self.sql_namespace, question)
+        ]
+
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
+
+    def get_related_documentation(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
+        )
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
         )
 
     def get_training_data(self, **kwargs) -> pd.DataFrame:
@@ -269,7 +358,16 @@ class PineconeDB_VectorStore(VannaBase):
         else:
             return False
 
+    @property
+    def embedding_model(self) -> TextEmbedding:
+        # loading the model per call dominated the time of adding training data
+        if self._embedding_model is None:
+            self._embedding_model = TextEmbedding(model_name=self.fastembed_model)
+        return self._embedding_model
+
     def generate_embedding(self, data: str, **kwargs) -> List[float]:
-        embedding_model = TextEmbedding(model_name=self.fastembed_model)
-        embedding = next(embedding_model.embed(data))
+        embedding = next(self.embedding_model.embed(data))
         return embedding.tolist()
+
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        return [embedding.tolist() for embedding in self.embedding_model.embed(data)]
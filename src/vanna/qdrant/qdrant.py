@@ -1,13 +1,17 @@
 from functools import cached_property
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import pandas as pd
 from qdrant_client import QdrantClient, grpc, models
+from qdrant_client.local.qdrant_local import QdrantLocal
 
-from ..base import VannaBase
+from ..base import VannaBase, relevance
 from ..utils import deterministic_uuid
 
 SCROLL_SIZE = 1000
+UPLOAD_BATCH_SIZE = 256
+# training data type -> suffix of its point ids
+ID_SUFFIXES = {"sql": "sql", "ddl": "ddl", "documentation": "doc"}
 
 
 class Qdrant_VectorStore(VannaBase):
@@ -26,6 +30,8 @@ class Qdrant_VectorStore(VannaBase):
             - path: Persistence path for QdrantLocal. Default: `None`.
             - prefix: Prefix to the REST URL paths. Example: `service/v1` will result in `http://localhost:6333/service/v1/{qdrant-endpoint}`.
             - n_results: Number of results to return from similarity search. Defaults to 10.
+              `n_results_sql`, `n_results_ddl` and `n_results_documentation` set it per training
+              data type.
             - fastembed_model: [Model](https://qdrant.github.io/fastembed/examples/Supported_Models/#supported-text-embedding-models) to use for `fastembed.TextEmbedding`.
               Defaults to `"BAAI/bge-small-en-v1.5"`.
             - collection_params: Additional parameters to pass to `qdrant_client.QdrantClient#create_collection()` method.
@@ -33,6 +39,21 @@ class Qdrant_VectorStore(VannaBase):
             - documentation_collection_name: Name of the collection to store documentation. Defaults to `"documentation"`.
             - ddl_collection_name: Name of the collection to store DDL. Defaults to `"ddl"`.
             - sql_collection_name: Name of the collection to store SQL. Defaults to `"sql"`.
+            - unified_collection: Name of one collection for all training data, told apart by the
+              `doc_type` payload field. Related training data is then fetched with one grouped
+              query instead of three. Defaults to `None`.
+            - upload_batch_size: Number of points per request of batched uploads. Defaults to 256.
+            - upload_parallel: Number of parallel processes of batched uploads. Defaults to 1.
+            - payload_indexes: If `true` - index the `dataset` and `doc_type` payload fields, so
+              filtered search stays fast. Defaults to `True`.
+            - quantization: `"scalar"` (int8) or `"binary"` quantization of the vectors of new
+              collections. Defaults to `None`.
+            - quantization_rescore: If `true` - rescore quantized search results with the original
+              vectors. Defaults to `True`.
+            - quantization_oversampling: Factor of candidates fetched by quantized search before
+              rescoring. Defaults to 2.0.
+            - on_disk: If `true` - keep the original vectors and payloads of new collections on
+              disk. Defaults to `False`.
 
     Raises:
         TypeError: If config["client"] is not a `qdrant_client.QdrantClient` instance
@@ -65,6 +86,9 @@ class Qdrant_VectorStore(VannaBase):
             self._client = client
 
         self.n_results = config.get("n_results", 10)
+        self.n_results_sql = config.get("n_results_sql", self.n_results)
+        self.n_results_ddl = config.get("n_results_ddl", self.n_results)
+        self.n_results_documentation = config.get("n_results_documentation", self.n_results)
         self.fastembed_model = config.get("fastembed_model", "BAAI/bge-small-en-v1.5")
         self.collection_params = config.get("collection_params", {})
         self.distance_metric = config.get("distance_metric", models.Distance.COSINE)
@@ -77,18 +101,34 @@ class Qdrant_VectorStore(VannaBase):
         self.sql_collection_name = config.get(
             "sql_collection_name", "sql"
         )
-
-        self.id_suffixes = {
-            self.ddl_collection_name: "ddl",
-            self.documentation_collection_name: "doc",
-            self.sql_collection_name: "sql",
+        self.unified_collection = config.get("unified_collection", None)
+        if self.unified_collection:
+            self.documentation_collection_name = self.unified_collection
+            self.ddl_collection_name = self.unified_collection
+            self.sql_collection_name = self.unified_collection
+        self.upload_batch_size = config.get("upload_batch_size", UPLOAD_BATCH_SIZE)
+        self.upload_parallel = config.get("upload_parallel", 1)
+        self.payload_indexes = config.get("payload_indexes", True)
+        self.quantization = config.get("quantization", None)
+        if self.quantization not in (None, "scalar", "binary"):
+            raise ValueError(
+                f"Unsupported quantization {self.quantization}, use 'scalar' or 'binary'"
+            )
+        self.quantization_rescore = config.get("quantization_rescore", True)
+        self.quantization_oversampling = config.get("quantization_oversampling", 2.0)
+        self.on_disk = config.get("on_disk", False)
+
+        self.collection_names = {
+            "sql": self.sql_collection_name,
+            "ddl": self.ddl_collection_name,
+            "documentation": self.documentation_collection_name,
         }
 
         self._setup_collections()
 
     def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
         question_answer = "Question: {0}\n\nSQL: {1}".format(question, sql)
-        id = deterministic_uuid(question_answer)
+        id = self._point_id(question_answer, "sql")
 
         self._client.upsert(
             self.sql_collection_name,
@@ -99,15 +139,17 @@ class Qdrant_VectorStore(VannaBase):
                     payload={
                         "question": question,
                         "sql": sql,
+                        "dataset": kwargs.get("dataset", "default"),
+                        "doc_type": "sql",
                     },
                 )
             ],
         )
 
-        return self._format_point_id(id, self.sql_collection_name)
+        return self._format_point_id(id, "sql")
 
     def add_ddl(self, ddl: str, **kwargs) -> str:
-        id = deterministic_uuid(ddl)
+        id = self._point_id(ddl, "ddl")
         self._client.upsert(
             self.ddl_collection_name,
             points=[
@@ -116,14 +158,16 @@ class Qdrant_VectorStore(VannaBase):
                     vector=self.generate_embedding(ddl),
                     payload={
                         "ddl": ddl,
+                        "dataset": kwargs.get("dataset", "default"),
+                        "doc_type": "ddl",
                     },
                 )
             ],
         )
-        return self._format_point_id(id, self.ddl_collection_name)
+        return self._format_point_id(id, "ddl")
 
     def add_documentation(self, documentation: str, **kwargs) -> str:
-        id = deterministic_uuid(documentation)
+        id = self._point_id(documentation, "documentation")
 
         self._client.upsert(
             self.documentation_collection_name,
@@ -133,21 +177,82 @@ class Qdrant_VectorStore(VannaBase):
                     vector=self.generate_embedding(documentation),
                     payload={
                         "documentation": documentation,
+                        "dataset": kwargs.get("dataset", "default"),
+                        "doc_type": "documentation",
                     },
                 )
             ],
         )
 
-        return self._format_point_id(id, self.documentation_collection_name)
+        return self._format_point_id(id, "documentation")
+
+    def _upload_batch(
+        self,
+        doc_type: str,
+        texts: List[str],
+        payloads: List[dict],
+        embeddings: List[List[float]] = None,
+    ) -> List[str]:
+        ids = [self._point_id(text, doc_type) for text in texts]
+        vectors = embeddings or self.generate_embeddings(texts)
+        self._client.upload_points(
+            self.collection_names[doc_type],
+            points=[
+                models.PointStruct(id=id, vector=vector, payload=payload)
+                for id, vector, payload in zip(ids, vectors, payloads)
+            ],
+            batch_size=self.upload_batch_size,
+            parallel=self.upload_parallel,
+            wait=True,
+        )
+        return [self._format_point_id(id, doc_type) for id in ids]
+
+    def add_question_sql_batch(
+        self, question_sql_pairs: List[Tuple[str, str]], **kwargs
+    ) -> List[str]:
+        dataset = kwargs.get("dataset", "default")
+        return self._upload_batch(
+            "sql",
+            [
+                "Question: {0}\n\nSQL: {1}".format(question, sql)
+                for question, sql in question_sql_pairs
+            ],
+            [
+                {"question": question, "sql": sql, "dataset": dataset, "doc_type": "sql"}
+                for question, sql in question_sql_pairs
+            ],
+            kwargs.get("embeddings"),
+        )
+
+    def add_ddl_batch(self, ddls: List[str], **kwargs) -> List[str]:
+        dataset = kwargs.get("dataset", "default")
+        return self._upload_batch(
+            "ddl",
+            ddls,
+            [{"ddl": ddl, "dataset": dataset, "doc_type": "ddl"} for ddl in ddls],
+            kwargs.get("embeddings"),
+        )
+
+    def add_documentation_batch(self, documentations: List[str], **kwargs) -> List[str]:
+        dataset = kwargs.get("dataset", "default")
+        return self._upload_batch(
+            "documentation",
+            documentations,
+            [
+                {"documentation": documentation, "dataset": dataset, "doc_type": "documentation"}
+                for documentation in documentations
+            ],
+            kwargs.get("embeddings"),
+        )
 
     def get_training_data(self, **kwargs) -> pd.DataFrame:
         df = pd.DataFrame()
 
-        if sql_data := self._get_all_points(self.sql_collection_name):
+        if sql_data := self._get_all_points("sql"):
             question_list = [data.payload["question"] for data in sql_data]
             sql_list = [data.payload["sql"] for data in sql_data]
             id_list = [
-                self._format_point_id(data.id, self.sql_collection_name)
+                self._format_point_id(data.id, "sql")
                 for data in sql_data
             ]
 
@@ -163,10 +268,10 @@ class Qdrant_VectorStore(VannaBase):
 
             df = pd.concat([df, df_sql])
 
-        if ddl_data := self._get_all_points(self.ddl_collection_name):
+        if ddl_data := self._get_all_points("ddl"):
             ddl_list = [data.payload["ddl"] for data in ddl_data]
             id_list = [
-                self._format_point_id(data.id, self.ddl_collection_name)
+                self._format_point_id(data.id, "ddl")
                 for data in ddl_data
             ]
 
@@ -182,10 +287,10 @@ class Qdrant_VectorStore(VannaBase):
 
             df = pd.concat([df, df_ddl])
 
-        if doc_data := self._get_all_points(self.documentation_collection_name):
+        if doc_data := self._get_all_points("documentation"):
             document_list = [data.payload["documentation"] for data in doc_data]
             id_list = [
-                self._format_point_id(data.id, self.documentation_collection_name)
+                self._format_point_id(data.id, "documentation")
                 for data in doc_data
             ]
 
@@ -203,10 +308,52 @@ class Qdrant_VectorStore(VannaBase):
 
         return df
 
+    def get_embedding_model_name(self) -> Optional[str]:
+        return (self.config or {}).get("embedding_model", self.fastembed_model)
+
+    def iter_training_data_with_embeddings(self, batch_size: int = 1000, **kwargs):
+        for training_data_type, content_key in [
+            ("sql", "sql"),
+            ("ddl", "ddl"),
+            ("documentation", "documentation"),
+        ]:
+            next_offset = None
+            while True:
+                records, next_offset = self._client.scroll(
+                    self.collection_names[training_data_type],
+                    scroll_filter=self._type_filter(training_data_type),
+                    limit=batch_size,
+                    offset=next_offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                if records:
+                    yield pd.DataFrame(
+                        {
+                            "id": [
+                                self._format_point_id(record.id, training_data_type)
+                                for record in records
+                            ],
+                            "training_data_type": training_data_type,
+                            "dataset": [
+                                record.payload.get("dataset", "default") for record in records
+                            ],
+                            "question": [record.payload.get("question") for record in records],
+                            "content": [record.payload[content_key] for record in records],
+                            "embedding": [record.vector for record in records],
+                        }
+                    )
+                if next_offset is None or (
+                    isinstance(next_offset, grpc.PointId)
+                    and next_offset.num == 0
+                    and next_offset.uuid == ""
+                ):
+                    break
+
     def remove_training_data(self, id: str, **kwargs) -> bool:
         try:
-            id, collection_name = self._parse_point_id(id)
-            res = self._client.delete(collection_name, points_selector=[id])
+            id, doc_type = self._parse_point_id(id)
+            res = self._client.delete(self.collection_names[doc_type], points_selector=[id])
             return True
         except ValueError:
             return False
@@ -221,7 +368,14 @@ class Qdrant_VectorStore(VannaBase):
         Returns:
             bool: True if collection is deleted, False otherwise
         """
-        if collection_name in self.id_suffixes.keys():
+        doc_types = {name: doc_type for doc_type, name in self.collection_names.items()}
+        if self.unified_collection and collection_name in self.collection_names:
+            self._client.delete(
+                self.unified_collection,
+                points_selector=models.FilterSelector(filter=self._type_filter(collection_name)),
+            )
+            return True
+        elif collection_name in doc_types:
             self._client.delete_collection(collection_name)
             self._setup_collections()
             return True
@@ -232,35 +386,145 @@ class Qdrant_VectorStore(VannaBase):
     def embeddings_dimension(self):
         return len(self.generate_embedding("ABCDEF"))
 
-    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+    def _query_with_scores(self, doc_type: str, embedding: List[float], **kwargs) -> list:
         results = self._client.query_points(
-            self.sql_collection_name,
-            query=self.generate_embedding(question),
-            limit=self.n_results,
+            self.collection_names[doc_type],
+            query=embedding,
+            query_filter=self._dataset_filter(doc_type, **kwargs),
+            search_params=self._search_params(),
+            limit=self._n_results(doc_type),
             with_payload=True,
         ).points
+        return [(result.payload, self._score(result.score)) for result in results]
+
+    def _n_results(self, doc_type: str) -> int:
+        return {
+            "sql": self.n_results_sql,
+            "ddl": self.n_results_ddl,
+            "documentation": self.n_results_documentation,
+        }[doc_type]
+
+    @staticmethod
+    def _with_content(doc_type: str, scored: list) -> list:
+        if doc_type == "sql":
+            return [
+                ({"question": payload["question"], "sql": payload["sql"]}, score)
+                for payload, score in scored
+            ]
+        return [(payload[doc_type], score) for payload, score in scored]
+
+    def _score(self, score: float) -> float:
+        # cosine and dot product scores are similarities, euclidean and manhattan ones distances
+        if self.distance_metric == models.Distance.EUCLID:
+            return relevance.l2_distance_to_score(score, squared=False)
+        if self.distance_metric == models.Distance.MANHATTAN:
+            return -score
+        return score
+
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
+        return self._with_content(
+            "sql", self._query_with_scores("sql", self.generate_embedding(question), **kwargs)
+        )
 
-        return [dict(result.payload) for result in results]
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
+        return self._with_content(
+            "ddl", self._query_with_scores("ddl", self.generate_embedding(question), **kwargs)
+        )
 
-    def get_related_ddl(self, question: str, **kwargs) -> list:
-        results = self._client.query_points(
-            self.ddl_collection_name,
-            query=self.generate_embedding(question),
-            limit=self.n_results,
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
+        embedding = self.generate_embedding(question)
+        return self._with_content(
+            "documentation", self._query_with_scores("documentation", embedding, **kwargs)
+        )
+
+    def get_related_training_data_with_scores(
+        self, question: str, **kwargs
+    ) -> Tuple[list, list, list]:
+        embedding = self.generate_embedding(question)
+        if not self.unified_collection:
+            # the question is embedded once for the three collections
+            return tuple(
+                self._with_content(doc_type, self._query_with_scores(doc_type, embedding, **kwargs))
+                for doc_type in ID_SUFFIXES
+            )
+
+        # one query, grouped by type on the server, with enough hits per group for the largest
+        # quota
+        groups = self._client.query_points_groups(
+            self.unified_collection,
+            query=embedding,
+            group_by="doc_type",
+            limit=len(ID_SUFFIXES),
+            group_size=max(self._n_results(doc_type) for doc_type in ID_SUFFIXES),
+            query_filter=self._dataset_filter(**kwargs),
+            search_params=self._search_params(),
             with_payload=True,
-        ).points
+        ).groups
+        hits = {group.id: group.hits for group in groups}
+        return tuple(
+            self._with_content(
+                doc_type,
+                [
+                    (hit.payload, self._score(hit.score))
+                    for hit in hits.get(doc_type, [])[: self._n_results(doc_type)]
+                ],
+            )
+            for doc_type in ID_SUFFIXES
+        )
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
+        )
 
-        return [result.payload["ddl"] for result in results]
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
 
     def get_related_documentation(self, question: str, **kwargs) -> list:
-        results = self._client.query_points(
-            self.documentation_collection_name,
-            query=self.generate_embedding(question),
-            limit=self.n_results,
-            with_payload=True,
-        ).points
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
+        )
 
-        return [result.payload["documentation"] for result in results]
+    def _dataset_filter(self, doc_type: str = None, **kwargs) -> Optional[models.Filter]:
+        # searches are scoped to a dataset only when one is given, like the other stores,
+        # and to a training data type when all of them share the unified collection
+        conditions = []
+        dataset = kwargs.get("dataset")
+        if dataset is not None:
+            conditions.append(
+                models.FieldCondition(key="dataset", match=models.MatchValue(value=dataset))
+            )
+        if doc_type is not None and self.unified_collection:
+            conditions.append(
+                models.FieldCondition(key="doc_type", match=models.MatchValue(value=doc_type))
+            )
+        return models.Filter(must=conditions) if conditions else None
+
+    def _type_filter(self, doc_type: str) -> Optional[models.Filter]:
+        return self._dataset_filter(doc_type)
+
+    def _search_params(self) -> Optional[models.SearchParams]:
+        if self.quantization is None:
+            return None
+        return models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                rescore=self.quantization_rescore,
+                oversampling=self.quantization_oversampling,
+            )
+        )
+
+    def _quantization_config(self):
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=True)
+            )
+        return None
 
     def generate_embedding(self, data: str, **kwargs) -> List[float]:
         embedding_model = self._client._get_or_init_model(
@@ -270,13 +534,20 @@ class Qdrant_VectorStore(VannaBase):
 
         return embedding.tolist()
 
-    def _get_all_points(self, collection_name: str):
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        embedding_model = self._client._get_or_init_model(
+            model_name=self.fastembed_model
+        )
+        return [embedding.tolist() for embedding in embedding_model.embed(data)]
+
+    def _get_all_points(self, doc_type: str):
         results: List[models.Record] = []
         next_offset = None
         stop_scrolling = False
         while not stop_scrolling:
             records, next_offset = self._client.scroll(
-                collection_name,
+                self.collection_names[doc_type],
+                scroll_filter=self._type_filter(doc_type),
                 limit=SCROLL_SIZE,
                 offset=next_offset,
                 with_payload=True,
@@ -293,41 +564,49 @@ class Qdrant_VectorStore(VannaBase):
         return results
 
     def _setup_collections(self):
-        if not self._client.collection_exists(self.sql_collection_name):
-            self._client.create_collection(
-                collection_name=self.sql_collection_name,
-                vectors_config=models.VectorParams(
-                    size=self.embeddings_dimension,
-                    distance=self.distance_metric,
-                ),
-                **self.collection_params,
-            )
-
-        if not self._client.collection_exists(self.ddl_collection_name):
-            self._client.create_collection(
-                collection_name=self.ddl_collection_name,
-                vectors_config=models.VectorParams(
-                    size=self.embeddings_dimension,
-                    distance=self.distance_metric,
-                ),
-                **self.collection_params,
-            )
-        if not self._client.collection_exists(self.documentation_collection_name):
-            self._client.create_collection(
-                collection_name=self.documentation_collection_name,
-                vectors_config=models.VectorParams(
-                    size=self.embeddings_dimension,
-                    distance=self.distance_metric,
-                ),
-                **self.collection_params,
-            )
-
-    def _format_point_id(self, id: str, collection_name: str) -> str:
-        return "{0}-{1}".format(id, self.id_suffixes[collection_name])
+        for collection_name in set(self.collection_names.values()):
+            existing_indexes = {}
+            if not self._client.collection_exists(collection_name):
+                collection_params = {
+                    "quantization_config": self._quantization_config(),
+                    "on_disk_payload": self.on_disk or None,
+                    **self.collection_params,
+                }
+                self._client.create_collection(
+                    collection_name=collection_name,
+                    vectors_config=models.VectorParams(
+                        size=self.embeddings_dimension,
+                        distance=self.distance_metric,
+                        on_disk=self.on_disk or None,
+                    ),
+                    **collection_params,
+                )
+            elif self.payload_indexes and not isinstance(self._client._client, QdrantLocal):
+                # collections of older versions get their missing indexes on the next start
+                info = self._client.get_collection(collection_name)
+                existing_indexes = info.payload_schema or {}
+
+            if self.payload_indexes and not isinstance(self._client._client, QdrantLocal):
+                for field_name in ("dataset", "doc_type"):
+                    if field_name in existing_indexes:
+                        continue
+                    self._client.create_payload_index(
+                        collection_name,
+                        field_name=field_name,
+                        field_schema=models.PayloadSchemaType.KEYWORD,
+                        wait=True,
+                    )
+
+    def _point_id(self, text: str, doc_type: str) -> str:
+        # in the unified collection the same text may be stored as several types
+        return deterministic_uuid(f"{doc_type}:{text}" if self.unified_collection else text)
+
+    def _format_point_id(self, id: str, doc_type: str) -> str:
+        return "{0}-{1}".format(id, ID_SUFFIXES[doc_type])
 
     def _parse_point_id(self, id: str) -> Tuple[str, str]:
         id, curr_suffix = id.rsplit("-", 1)
-        for collection_name, suffix in self.id_suffixes.items():
+        for doc_type, suffix in ID_SUFFIXES.items():
             if curr_suffix == suffix:
-                return id, collection_name
+                return id, doc_type
         raise ValueError(f"Invalid id {id}")
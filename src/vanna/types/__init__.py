@@ -217,6 +217,7 @@ class TrainingPlanItem:
     item_group: str
     item_name: str
     item_value: str
+    item_fingerprint: Union[str, None] = None
 
     def __str__(self):
         if self.item_type == self.ITEM_TYPE_SQL:
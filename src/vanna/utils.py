@@ -171,4 +171,31 @@ def snake_case(s):
     """Convert string to snake_case."""
     s = re.sub(r'[^a-zA-Z0-9]', '_', s)
     s = re.sub('([a-z0-9])([A-Z])', r'\1_\2', s)
-    return re.sub('_+', '_', s.lower()).strip('_')
\ No newline at end of file
+    return re.sub('_+', '_', s.lower()).strip('_')
+
+
+def fingerprint_table(df_columns, columns=None, last_altered=None) -> str:
+    """
+    Fingerprints the column set of a table, so schema changes can be detected without comparing
+    documents.
+
+    Args:
+        df_columns (pd.DataFrame): One row per column of the table.
+        columns (list): The dataframe columns to include, e.g. column name, data type and comment.
+            Defaults to all.
+        last_altered: The LAST_ALTERED timestamp of the table, where the warehouse exposes it.
+
+    Returns:
+        str: A hex digest that changes whenever a column is added, removed or altered.
+    """
+    if columns is None:
+        columns = df_columns.columns.tolist()
+
+    rows = sorted(
+        "|".join("" if value is None else str(value) for value in row)
+        for row in df_columns[columns].itertuples(index=False, name=None)
+    )
+    if last_altered is not None:
+        rows.append(f"last_altered={last_altered}")
+
+    return hashlib.sha256("\n".join(rows).encode("utf-8")).hexdigest()
@@ -1,9 +1,16 @@
 import dataclasses
+import gzip
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
+from typing import List, Tuple
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..advanced import VannaAdvanced
 from ..base import VannaBase
@@ -20,6 +27,58 @@ from ..types import (
 )
 from ..utils import sanitize_model_name
 
+RELATED_CACHE_SIZE = 256
+RELATED_CACHE_TTL = 300
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache whose entries expire `ttl` seconds after they were set.
+    Holds at most `maxsize` entries, evicting the least recently used one first.
+    """
+
+    def __init__(self, maxsize: int = RELATED_CACHE_SIZE, ttl: float = RELATED_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, self) is not self
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
 
 class VannaDB_VectorStore(VannaBase, VannaAdvanced):
     def __init__(self, vanna_model: str, vanna_api_key: str, config=None):
@@ -33,7 +92,25 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
             if config is None or "endpoint" not in config
             else config["endpoint"]
         )
-        self.related_training_data = {}
+        config = config or {}
+        self.related_training_data = TTLCache(
+            maxsize=config.get("related_cache_size", RELATED_CACHE_SIZE),
+            ttl=config.get("related_cache_ttl", RELATED_CACHE_TTL),
+        )
+        self._related_training_data_lock = threading.Lock()
+        self._related_training_data_futures = {}
+        self._related_training_data_generation = 0
+        self._prefetch_workers = config.get("prefetch_workers", 4)
+        self._executor = None
+        self._compress_requests = config.get("compress_requests", False)
+
+        # one keep-alive connection pool for all RPC and GraphQL calls
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config.get("pool_maxsize", 10))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
         self._graphql_endpoint = "https://functionrag.com/query"
         self._graphql_headers = {
             "Content-Type": "application/json",
@@ -60,7 +137,12 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
             "params": [self._dataclass_to_dict(obj) for obj in params],
         }
 
-        response = requests.post(self._endpoint, headers=headers, data=json.dumps(data))
+        body = json.dumps(data).encode("utf-8")
+        if self._compress_requests:
+            headers["Content-Encoding"] = "gzip"
+            body = gzip.compress(body)
+
+        response = self._session.post(self._endpoint, headers=headers, data=body)
         return response.json()
 
     def _dataclass_to_dict(self, obj):
@@ -85,7 +167,10 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
             }
         """
 
-        response = requests.post(self._graphql_endpoint, headers=self._graphql_headers, json={'query': query})
+        response = self._session.post(
+            self._graphql_endpoint, headers=self._graphql_headers,
+            json={'query': query},
+        )
         response_json = response.json()
         if response.status_code == 200 and 'data' in response_json and 'get_all_sql_functions' in response_json['data']:
             self.log(response_json['data']['get_all_sql_functions'])
@@ -123,7 +208,10 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
         """
         static_function_arguments = [{"name": key, "value": str(value)} for key, value in additional_data.items()]
         variables = {"question": question, "staticFunctionArguments": static_function_arguments}
-        response = requests.post(self._graphql_endpoint, headers=self._graphql_headers, json={'query': query, 'variables': variables})
+        response = self._session.post(
+            self._graphql_endpoint, headers=self._graphql_headers,
+            json={'query': query, 'variables': variables},
+        )
         response_json = response.json()
         if response.status_code == 200 and 'data' in response_json and 'get_and_instantiate_function' in response_json['data']:
             self.log(response_json['data']['get_and_instantiate_function'])
@@ -153,7 +241,10 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
         }
         """
         variables = {"question": question, "sql": sql, "plotly_code": plotly_code}
-        response = requests.post(self._graphql_endpoint, headers=self._graphql_headers, json={'query': query, 'variables': variables})
+        response = self._session.post(
+            self._graphql_endpoint, headers=self._graphql_headers,
+            json={'query': query, 'variables': variables},
+        )
         response_json = response.json()
         if response.status_code == 200 and 'data' in response_json and response_json['data'] is not None and 'generate_and_create_sql_function' in response_json['data']:
             resp = response_json['data']['generate_and_create_sql_function']
@@ -216,7 +307,10 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
 
         print("variables", variables)
 
-        response = requests.post(self._graphql_endpoint, headers=self._graphql_headers, json={'query': mutation, 'variables': variables})
+        response = self._session.post(
+            self._graphql_endpoint, headers=self._graphql_headers,
+            json={'query': mutation, 'variables': variables},
+        )
         response_json = response.json()
         if response.status_code == 200 and 'data' in response_json and response_json['data'] is not None and 'update_sql_function' in response_json['data']:
             return response_json['data']['update_sql_function']
@@ -230,7 +324,10 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
         }
         """
         variables = {"function_name": function_name}
-        response = requests.post(self._graphql_endpoint, headers=self._graphql_headers, json={'query': mutation, 'variables': variables})
+        response = self._session.post(
+            self._graphql_endpoint, headers=self._graphql_headers,
+            json={'query': mutation, 'variables': variables},
+        )
         response_json = response.json()
         if response.status_code == 200 and 'data' in response_json and response_json['data'] is not None and 'delete_sql_function' in response_json['data']:
             return response_json['data']['delete_sql_function']
@@ -297,6 +394,7 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
         params = [QuestionSQLPair(question=question, sql=sql, tag=tag)]
 
         d = self._rpc_call(method="add_sql", params=params)
+        self._invalidate_related_training_data()
 
         if "result" not in d:
             raise Exception("Error adding question and SQL pair", d)
@@ -309,6 +407,7 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
         params = [StringData(data=ddl)]
 
         d = self._rpc_call(method="add_ddl", params=params)
+        self._invalidate_related_training_data()
 
         if "result" not in d:
             raise Exception("Error adding DDL", d)
@@ -321,6 +420,7 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
         params = [StringData(data=documentation)]
 
         d = self._rpc_call(method="add_documentation", params=params)
+        self._invalidate_related_training_data()
 
         if "result" not in d:
             raise Exception("Error adding documentation", d)
@@ -348,6 +448,7 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
         params = [StringData(data=id)]
 
         d = self._rpc_call(method="remove_training_data", params=params)
+        self._invalidate_related_training_data()
 
         if "result" not in d:
             raise Exception("Error removing training data")
@@ -359,7 +460,14 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
 
         return status.success
 
+    def _invalidate_related_training_data(self):
+        # results of RPCs that are in flight during a change are not cached either
+        with self._related_training_data_lock:
+            self._related_training_data_generation += 1
+            self.related_training_data.clear()
+
     def get_related_training_data_cached(self, question: str) -> TrainingData:
+        generation = self._related_training_data_generation
         params = [Question(question=question)]
 
         d = self._rpc_call(method="get_related_training_data", params=params)
@@ -370,30 +478,56 @@ class VannaDB_VectorStore(VannaBase, VannaAdvanced):
         # Load the result into a dataclass
         training_data = TrainingData(**d["result"])
 
-        self.related_training_data[question] = training_data
+        if generation == self._related_training_data_generation:
+            self.related_training_data[question] = training_data
 
         return training_data
 
-    def get_similar_question_sql(self, question: str, **kwargs) -> list:
-        if question in self.related_training_data:
-            training_data = self.related_training_data[question]
-        else:
-            training_data = self.get_related_training_data_cached(question)
+    def _get_related_training_data(self, question: str) -> TrainingData:
+        training_data = self.related_training_data.get(question)
+        if training_data is not None:
+            return training_data
+
+        with self._related_training_data_lock:
+            future = self._submit_related_training_data(question)
+        return future.result()
+
+    def _submit_related_training_data(self, question: str):
+        # concurrent callers of the same question share one RPC; call with the lock held
+        future = self._related_training_data_futures.get(question)
+        if future is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._prefetch_workers)
+            future = self._executor.submit(self.get_related_training_data_cached, question)
+            self._related_training_data_futures[question] = future
+            future.add_done_callback(
+                lambda _: self._related_training_data_futures.pop(question, None)
+            )
+        return future
+
+    def prefetch_related_training_data(self, questions: List[str]) -> None:
+        """
+        Fetches the related training data of several questions concurrently into the cache, e.g.
+        before generating SQL for a list of questions. Returns once all of them are cached.
+        """
+        with self._related_training_data_lock:
+            futures = []
+            for question in dict.fromkeys(questions):
+                if question not in self.related_training_data:
+                    futures.append(self._submit_related_training_data(question))
+        for future in futures:
+            future.result()
 
-        return training_data.questions
+    def get_related_training_data(self, question: str, **kwargs) -> Tuple[list, list, list]:
+        training_data = self._get_related_training_data(question)
 
-    def get_related_ddl(self, question: str, **kwargs) -> list:
-        if question in self.related_training_data:
-            training_data = self.related_training_data[question]
-        else:
-            training_data = self.get_related_training_data_cached(question)
+        return training_data.questions, training_data.ddl, training_data.documentation
 
-        return training_data.ddl
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self._get_related_training_data(question).questions
 
-    def get_related_documentation(self, question: str, **kwargs) -> list:
-        if question in self.related_training_data:
-            training_data = self.related_training_data[question]
-        else:
-            training_data = self.get_related_training_data_cached(question)
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        return self._get_related_training_data(question).ddl
 
-        return training_data.documentation
+    def get_related_documentation(self, question: str, **kwargs) -> list:
+        return self._get_related_training_data(question).documentation
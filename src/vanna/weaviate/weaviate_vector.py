@@ -99,6 +99,43 @@ class WeaviateDatabase(VannaBase):
         self.weaviate_client.close()
         return response
 
+    def generate_embeddings(self, data: list, **kwargs) -> list:
+        return [embedding.tolist() for embedding in self.embeddings.embed(data)]
+
+    def _insert_batch(self, cluster_key: str, data_objects: list, texts: list) -> list:
+        objects = [
+            wvc.data.DataObject(properties=data_object, vector=vector)
+            for data_object, vector in zip(data_objects, self.generate_embeddings(texts))
+        ]
+        self.weaviate_client.connect()
+        collection = self.weaviate_client.collections.get(self.training_data_cluster[cluster_key])
+        response = collection.data.insert_many(objects)
+        self.weaviate_client.close()
+        if response.has_errors:
+            print(
+                f"Failed to insert {len(response.errors)} of {len(objects)} objects "
+                f"into {cluster_key}: {response.errors}"
+            )
+        return [f'{response.uuids[i]}-{cluster_key}' for i in sorted(response.uuids)]
+
+    def add_ddl_batch(self, ddls: list, **kwargs) -> list:
+        return self._insert_batch('ddl', [{"description": ddl} for ddl in ddls], ddls)
+
+    def add_documentation_batch(self, documentations: list, **kwargs) -> list:
+        return self._insert_batch(
+            'doc', [{"description": doc} for doc in documentations], documentations
+        )
+
+    def add_question_sql_batch(self, question_sql_pairs: list, **kwargs) -> list:
+        return self._insert_batch(
+            'sql',
+            [
+                {"sql": sql, "natural_language_question": question}
+                for question, sql in question_sql_pairs
+            ],
+            [question for question, _ in question_sql_pairs],
+        )
+
     def add_ddl(self, ddl: str, **kwargs) -> str:
         data_object = {
             "description": ddl,
@@ -127,26 +164,44 @@ class WeaviateDatabase(VannaBase):
         response = collection.query.near_vector(
             near_vector=vector_input,
             limit=self.n_results,
-            return_properties=return_properties
+            return_properties=return_properties,
+            return_metadata=wvc.query.MetadataQuery(distance=True),
         )
-        response_list = [item.properties for item in response.objects]
+        # the collections use Weaviate's default cosine distance
+        response_list = [(item.properties, 1 - item.metadata.distance) for item in response.objects]
         self.weaviate_client.close()
         return response_list
 
-    def get_related_ddl(self, question: str, **kwargs) -> list:
+    def get_related_ddl_with_scores(self, question: str, **kwargs) -> list:
         vector_input = self.generate_embedding(question)
         response_list = self._query_collection('ddl', vector_input, ["description"])
-        return [item["description"] for item in response_list]
+        return [(item["description"], score) for item, score in response_list]
 
-    def get_related_documentation(self, question: str, **kwargs) -> list:
+    def get_related_documentation_with_scores(self, question: str, **kwargs) -> list:
         vector_input = self.generate_embedding(question)
         response_list = self._query_collection('doc', vector_input, ["description"])
-        return [item["description"] for item in response_list]
+        return [(item["description"], score) for item, score in response_list]
 
-    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+    def get_similar_question_sql_with_scores(self, question: str, **kwargs) -> list:
         vector_input = self.generate_embedding(question)
         response_list = self._query_collection('sql', vector_input, ["sql", "natural_language_question"])
-        return [{"question": item["natural_language_question"], "sql": item["sql"]} for item in response_list]
+        return [
+            ({"question": item["natural_language_question"], "sql": item["sql"]}, score)
+            for item, score in response_list
+        ]
+
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        return self.select_relevant(self.get_related_ddl_with_scores(question, **kwargs), "ddl")
+
+    def get_related_documentation(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_related_documentation_with_scores(question, **kwargs), "documentation"
+        )
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.select_relevant(
+            self.get_similar_question_sql_with_scores(question, **kwargs), "sql"
+        )
 
     def get_training_data(self, **kwargs) -> list:
         self.weaviate_client.connect()
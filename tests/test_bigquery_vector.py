@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+pytest.importorskip("vertexai")
+
+from vanna.google.bigquery_vector import BigQuery_VectorStore
+from vanna.mock import MockLLM
+
+
+class RecordingClient:
+    """Stands in for `bigquery.Client` and records the SQL and load jobs it is given."""
+
+    def __init__(self, results=None):
+        self.queries = []
+        self.loads = []
+        self.results = results if results is not None else pd.DataFrame(
+            columns=["id", "question", "training_data_type", "content", "distance"]
+        )
+
+    def get_dataset(self, dataset_id):
+        return dataset_id
+
+    def get_table(self, table_id):
+        return table_id
+
+    def query(self, query, job_config=None):
+        self.queries.append((query, job_config))
+        results = self.results
+
+        class Job:
+            def result(self):
+                return self
+
+            def to_dataframe(self):
+                return results
+
+        return Job()
+
+    def load_table_from_json(self, rows, table_id, job_config=None):
+        self.loads.append(rows)
+
+        class Job:
+            def result(self):
+                return None
+
+        return Job()
+
+
+class VannaBigQuery(BigQuery_VectorStore, MockLLM):
+    def __init__(self, config=None):
+        BigQuery_VectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def get_embeddings(self, data, task):
+        return [float(len(data)), 1.0]
+
+    def get_embeddings_batch(self, data, task):
+        return [[float(len(text)), 1.0] for text in data]
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def test_bigquery_single_search_job():
+    client = RecordingClient(pd.DataFrame({
+        "id": ["1", "2", "3"],
+        "question": ["How many?", "", ""],
+        "training_data_type": ["sql", "ddl", "documentation"],
+        "content": ["SELECT 1", "CREATE TABLE t (id INT)", "t holds orders"],
+        "distance": [0.1, 0.2, 0.3],
+    }))
+    vn = VannaBigQuery(config={"project_id": "p", "client": client, "n_results_ddl": 3})
+    assert "CREATE VECTOR INDEX IF NOT EXISTS" in client.queries[0][0]
+
+    client.queries.clear()
+    sql, ddl, docs = vn.get_related_training_data("How many?")
+    assert sql == [{"question": "How many?", "sql": "SELECT 1"}]
+    assert ddl == ["CREATE TABLE t (id INT)"]
+    assert docs == ["t holds orders"]
+
+    assert len(client.queries) == 1
+    query, job_config = client.queries[0]
+    assert query.count("VECTOR_SEARCH(") == 3
+    assert "top_k => 3" in query and "top_k => 10" in query
+    assert "use_brute_force" not in query
+    assert job_config.query_parameters[0].name == "question_embedding"
+
+
+def test_bigquery_batch_load():
+    client = RecordingClient()
+    vn = VannaBigQuery(config={"project_id": "p", "client": client, "vector_index": False})
+    assert client.queries == []
+
+    ids = vn.add_ddl_batch([f"CREATE TABLE t{i} (id INT)" for i in range(3)])
+    assert len(ids) == 3
+    assert len(client.loads) == 1
+    assert [row["content"] for row in client.loads[0]] == [f"CREATE TABLE t{i} (id INT)" for i in range(3)]
+
+    vn.get_related_ddl("t1")
+    assert '"use_brute_force": true' in client.queries[-1][0]
@@ -0,0 +1,59 @@
+import hashlib
+
+import chromadb
+import numpy as np
+
+from vanna.chromadb import ChromaDB_VectorStore
+from vanna.mock import MockLLM
+
+
+def text_seeded(text, dim=16):
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) % 2**32
+    return np.random.default_rng(seed).standard_normal(dim).tolist()
+
+
+class HashEmbedding(chromadb.EmbeddingFunction):
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [np.array(text_seeded(text), dtype=np.float32) for text in input]
+
+
+class VannaChroma(ChromaDB_VectorStore, MockLLM):
+    def __init__(self, config=None):
+        ChromaDB_VectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def test_chromadb_unified_collection():
+    vn = VannaChroma(config={
+        "client": "in-memory",
+        "embedding_function": HashEmbedding(),
+        "unified_collection": "training_data",
+        "n_results_sql": 2,
+        "n_results_ddl": 3,
+        "n_results_documentation": 1,
+    })
+    assert [collection.name for collection in vn.chroma_client.list_collections()] == ["training_data"]
+
+    vn.add_ddl_batch([f"CREATE TABLE t{i} (id INT)" for i in range(20)])
+    vn.add_question_sql_batch([(f"How many rows in t{i}?", f"SELECT COUNT(*) FROM t{i}") for i in range(3)])
+    vn.add_documentation("t0 holds the orders", dataset="sales")
+
+    df = vn.get_training_data()
+    assert df["training_data_type"].value_counts().to_dict() == {"ddl": 20, "sql": 3}
+
+    # a type crowded out of the combined top 6 is fetched on its own
+    sql, ddl, docs = vn.get_related_training_data("CREATE TABLE t4 (id INT)")
+    assert len(sql) == 2 and all("sql" in item for item in sql)
+    assert len(ddl) == 3 and all("ddl" in item for item in ddl)
+    assert [doc["documentation"] for doc in docs] == ["t0 holds the orders"]
+    assert vn.get_related_documentation("orders", dataset="default") == []
+
+    assert vn.remove_collection("ddl", "default")
+    assert vn.get_related_ddl("CREATE TABLE t4 (id INT)") == []
+    assert len(vn.get_similar_question_sql("How many rows in t1?")) == 2
@@ -0,0 +1,73 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from vanna.base.compaction import find_duplicates, sql_fingerprint
+from vanna.mock import MockLLM
+from vanna.numpy_store import NumpyVectorStore
+
+
+def bag_of_words(text, dim=64):
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().replace("?", "").split():
+        vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % dim] += 1.0
+    return vector.tolist()
+
+
+class VannaNumpy(NumpyVectorStore, MockLLM):
+    def __init__(self, config=None):
+        NumpyVectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def generate_embedding(self, data, **kwargs):
+        return bag_of_words(data)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def test_sql_fingerprint():
+    assert sql_fingerprint("SELECT name FROM t WHERE x = 'a' -- note\n LIMIT 5;") == sql_fingerprint(
+        "select  NAME\nfrom T where x='b' limit 10"
+    )
+    assert sql_fingerprint('SELECT "Name" FROM t') != sql_fingerprint('SELECT "name" FROM t')
+    assert sql_fingerprint("SELECT a FROM t") != sql_fingerprint("SELECT b FROM t")
+
+
+def test_compact_question_sql():
+    vn = VannaNumpy(config={"client": "in-memory"})
+    vn.add_question_sql("How many orders?", "SELECT COUNT(*) FROM orders")
+    vn.add_question_sql("how many orders", "select count(*) from orders")
+    vn.add_question_sql("How many orders", "SELECT COUNT(*)  FROM orders;")
+    vn.add_question_sql("Which region sells most?", "SELECT COUNT(*) FROM orders")
+    vn.add_question_sql("Top customers", "SELECT name FROM customers LIMIT 10")
+    vn.add_question_sql("Top customers", "SELECT name FROM customers LIMIT 10", dataset="hr")
+
+    assert vn.compact_question_sql() == 2
+    df = vn.get_training_data()
+    assert sorted(df["question"]) == ["How many orders", "Top customers", "Top customers", "Which region sells most?"]
+
+    # nothing new since the last run
+    assert vn.compact_question_sql(incremental=True) == 0
+
+
+def test_keep_most_used():
+    vn = VannaNumpy(config={"client": "in-memory", "compaction_keep": "most_used"})
+    vn.add_question_sql("How many orders?", "SELECT COUNT(*) FROM orders")
+    vn.add_question_sql("how many orders", "select count(*) from orders")
+    vn.question_sql_usage[("How many orders?", "SELECT COUNT(*) FROM orders")] += 3
+
+    assert vn.compact_question_sql() == 1
+    assert vn.get_training_data()["question"].tolist() == ["How many orders?"]
+
+
+def test_find_duplicates_incremental():
+    df = pd.DataFrame({
+        "id": ["1", "2", "3", "4"],
+        "question": ["a b", "a b", "c d", "c d"],
+        "content": ["SELECT 1", "SELECT 2", "SELECT x FROM t", "SELECT x FROM t"],
+    })
+    embed = lambda questions: [bag_of_words(q) for q in questions]
+    assert sorted(find_duplicates(df, embed)) == ["1", "3"]
+    assert find_duplicates(df, embed, new_ids={"4"}) == ["3"]
@@ -0,0 +1,130 @@
+import duckdb
+
+from vanna.base import VannaBase
+from vanna.base.base import AskResult, LogTag, _postgres_plan_rows
+from vanna.mock import MockEmbedding, MockLLM, MockVectorDB
+
+
+class VannaMock(MockVectorDB, MockEmbedding, MockLLM):
+    def __init__(self, config=None):
+        VannaBase.__init__(self, config=config)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def duckdb_store(config):
+    vn = VannaMock(config=config)
+    conn = duckdb.connect(":memory:")
+    conn.execute("CREATE TABLE events AS SELECT range AS id, range % 7 AS kind FROM range(100000)")
+    vn.run_sql = lambda sql: conn.execute(sql).df()
+    vn.run_sql_is_set = True
+    vn.dialect = "DuckDB"
+    return vn
+
+
+def test_estimate_sql_cost_duckdb():
+    vn = duckdb_store({})
+    assert vn.estimate_sql_cost("SELECT * FROM events")["rows"] == 100000
+
+
+def test_estimate_sql_cost_duckdb_limit():
+    vn = duckdb_store({})
+    # a streaming LIMIT stops the scan early, a sort or aggregate below it does not
+    assert not vn.estimate_sql_cost("SELECT * FROM events limit 20")["rows"]
+    assert not vn.estimate_sql_cost("SELECT * FROM events WHERE kind = 3 LIMIT 20")["rows"]
+    assert vn.estimate_sql_cost("SELECT * FROM events ORDER BY id LIMIT 20")["rows"] == 100000
+    assert vn.estimate_sql_cost("SELECT kind, COUNT(*) FROM events GROUP BY kind LIMIT 20")["rows"] == 100000
+
+
+def test_postgres_plan_rows():
+    scan = {"Node Type": "Seq Scan", "Plan Rows": 100000}
+    assert _postgres_plan_rows({"Node Type": "Limit", "Plan Rows": 20, "Plans": [scan]}) == 20
+    sort = {"Node Type": "Sort", "Plan Rows": 100000, "Plans": [scan]}
+    assert _postgres_plan_rows({"Node Type": "Limit", "Plan Rows": 20, "Plans": [sort]}) == 100000
+    join = {"Node Type": "Hash Join", "Plan Rows": 500, "Plans": [
+        {"Node Type": "Seq Scan", "Plan Rows": 3000},
+        {"Node Type": "Hash", "Plan Rows": 40, "Plans": [{"Node Type": "Index Scan", "Plan Rows": 40}]},
+    ]}
+    assert _postgres_plan_rows(join) == 3000
+
+
+def test_check_sql_cost_pass():
+    sql = "SELECT * FROM events WHERE id = 42"
+    assert duckdb_store({"max_scan_rows": 50000}).check_sql_cost(sql) == (sql, "")
+    # without a budget the guard is off
+    assert duckdb_store({}).check_sql_cost("SELECT * FROM events") == ("SELECT * FROM events", "")
+
+
+def test_check_sql_cost_reject():
+    sql, err_msg = duckdb_store({"max_scan_rows": 50000}).check_sql_cost("SELECT * FROM events")
+    assert sql == "SELECT * FROM events"
+    assert err_msg.startswith(LogTag.ERROR_COST) and "estimated rows 100,000 > budget 50,000" in err_msg
+
+
+def test_check_sql_cost_warn_and_limit(capsys):
+    vn = duckdb_store({"max_scan_rows": 50000, "cost_guard_action": "limit"})
+    sql, err_msg = vn.check_sql_cost("SELECT * FROM events;", sql_row_limit=10)
+    assert err_msg == ""
+    assert sql == "SELECT * FROM (SELECT * FROM events) AS cost_guarded LIMIT 10"
+    assert LogTag.ERROR_COST in capsys.readouterr().out
+    assert len(vn.run_sql(sql)) == 10
+
+
+def test_check_sql_cost_feedback():
+    vn = duckdb_store({"max_scan_rows": 50000, "cost_guard_action": "feedback"})
+    _, err_msg = vn.check_sql_cost("SELECT * FROM events")
+    assert "Rewrite the query" in err_msg
+
+
+def test_ask_trains_on_the_generated_sql(monkeypatch):
+    vn = duckdb_store({"max_scan_rows": 50000, "cost_guard_action": "limit"})
+    trained, run = [], []
+    run_sql = vn.run_sql
+    monkeypatch.setattr(vn, "generate_sql", lambda **kwargs: "SELECT * FROM events ORDER BY id")
+    monkeypatch.setattr(vn, "add_question_sql", lambda question, sql, **kwargs: trained.append(sql))
+    monkeypatch.setattr(vn, "run_sql", lambda sql: run.append(sql) or run_sql(sql))
+
+    answer = vn.ask("List the events", print_results=False, visualize=False, sql_row_limit=5)
+    assert not answer.has_error and len(answer.df[0]) == 5
+    assert run[-1] == "SELECT * FROM (SELECT * FROM events ORDER BY id limit 5) AS cost_guarded LIMIT 5"
+    assert trained == ["SELECT * FROM events ORDER BY id limit 5"]
+
+
+def fake_ask(answers):
+    calls = []
+
+    def ask(question=None, **kwargs):
+        calls.append(question)
+        return answers[min(len(calls), len(answers)) - 1]
+
+    return ask, calls
+
+
+def failed_answer(err_msg):
+    return AskResult(("SELECT 1", 0.0, None), (None, 0.0, err_msg), None, None, True)
+
+
+def test_ask_adaptive_stops_retrying_on_reject():
+    vn = duckdb_store({"max_scan_rows": 50000})
+    _, cost_err_msg = vn.check_sql_cost("SELECT * FROM events")
+    vn.ask, calls = fake_ask([
+        failed_answer(f"{LogTag.ERROR_DB} Failed to execute SQL: no such column"),
+        failed_answer(cost_err_msg),
+    ])
+
+    answer = vn.ask_adaptive("How many events?", retry_num=3, sleep_sec=0, print_results=False)
+    assert len(calls) == 2
+    assert cost_err_msg in answer.df[2]
+
+
+def test_ask_adaptive_retries_on_feedback():
+    vn = duckdb_store({"max_scan_rows": 50000, "cost_guard_action": "feedback"})
+    _, cost_err_msg = vn.check_sql_cost("SELECT * FROM events")
+    ok = AskResult(("SELECT COUNT(*) FROM events", 0.0, None), (None, 0.0, None), None, None, False)
+    vn.ask, calls = fake_ask([failed_answer(cost_err_msg), failed_answer(cost_err_msg), ok])
+
+    answer = vn.ask_adaptive("How many events?", retry_num=3, sleep_sec=0, print_results=False)
+    assert len(calls) == 3
+    assert "Rewrite the query" in calls[1]
+    assert answer is ok
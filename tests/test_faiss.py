@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from vanna.mock import MockLLM
+
+DIM = 16
+
+
+def text_seeded(text):
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) % 2**32
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+class SentenceTransformer:
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def encode(self, data, **kwargs):
+        if isinstance(data, str):
+            return text_seeded(data)
+        return np.array([text_seeded(text) for text in data])
+
+
+@pytest.fixture
+def VannaFAISS(monkeypatch):
+    # the store only needs sentence-transformers to embed, vectors are derived from the text instead
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=SentenceTransformer))
+    from vanna.faiss import FAISS
+
+    class VannaFAISS(FAISS, MockLLM):
+        def __init__(self, config=None):
+            FAISS.__init__(self, config=config)
+            MockLLM.__init__(self, config=config)
+
+        def search_tables_metadata(self, **kwargs):
+            return []
+
+    return VannaFAISS
+
+
+def ddl(i):
+    return f"CREATE TABLE table_{i} (id INT)"
+
+
+def test_faiss_remove_is_id_mapped(VannaFAISS, tmp_path):
+    config = {"path": str(tmp_path), "embedding_dim": DIM, "n_results": 10}
+    vn = VannaFAISS(config=config)
+    ids = vn.add_ddl_batch([ddl(i) for i in range(5)])
+    assert vn.remove_training_data(ids[1])
+    assert vn.remove_training_data(ids[3])
+
+    assert sorted(vn.get_related_ddl(ddl(1))) == sorted([ddl(0), ddl(2), ddl(4)])
+    assert sorted(vn.get_training_data()["id"]) == sorted([ids[0], ids[2], ids[4]])
+
+    vn = VannaFAISS(config=config)
+    assert vn.ddl_index.ntotal == 3
+    assert sorted(vn.get_related_ddl(ddl(1))) == sorted([ddl(0), ddl(2), ddl(4)])
+
+
+def test_faiss_wal_replay_drops_torn_record(VannaFAISS, tmp_path):
+    config = {"path": str(tmp_path), "embedding_dim": DIM, "checkpoint_interval": 0}
+    vn = VannaFAISS(config=config)
+    ids = vn.add_ddl_batch([ddl(i) for i in range(3)])
+    vn.remove_training_data(ids[0])
+    # nothing was checkpointed, the changes only exist in the log
+    assert not os.path.exists(tmp_path / "ddl_index.faiss")
+    with open(tmp_path / "ddl.wal", "a") as f:
+        f.write('{"op": "add", "faiss_id": 12')
+
+    vn = VannaFAISS(config=config)
+    assert vn.ddl_index.ntotal == 2
+    assert sorted(vn.get_related_ddl(ddl(0))) == sorted([ddl(1), ddl(2)])
+    assert os.path.getsize(tmp_path / "ddl.wal") == 0
+    assert faiss.read_index(str(tmp_path / "ddl_index.faiss")).ntotal == 2
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat"])
+def test_faiss_switches_to_index_type_at_train_threshold(VannaFAISS, index_type):
+    vn = VannaFAISS(config={"client": "in-memory", "embedding_dim": DIM, "index_type": index_type, "train_threshold": 20})
+    vn.add_ddl_batch([ddl(i) for i in range(19)])
+    assert isinstance(faiss.downcast_index(vn.ddl_index.index), faiss.IndexFlat)
+
+    vn.add_ddl(ddl(19))
+    assert vn.ddl_index.ntotal == 20
+    index = vn.ddl_index if index_type != "hnsw" else faiss.downcast_index(vn.ddl_index.index)
+    assert isinstance(index, faiss.IndexHNSW if index_type == "hnsw" else faiss.IndexIVF)
+    assert ddl(7) in vn.get_related_ddl(ddl(7))
+
+
+def test_faiss_hnsw_remove_uses_tombstones(VannaFAISS, tmp_path):
+    config = {
+        "path": str(tmp_path), "embedding_dim": DIM, "n_results": 3,
+        "index_type": "hnsw", "train_threshold": 10, "max_tombstone_ratio": 0.5,
+    }
+    vn = VannaFAISS(config=config)
+    ids = vn.add_ddl_batch([ddl(i) for i in range(20)])
+    index = vn.ddl_index
+
+    vn.remove_training_data(ids[5])
+    vn.remove_training_data(ids[6])
+    # the graph is not rebuilt on every remove, the ids are filtered out of searches instead
+    assert vn.ddl_index is index and index.ntotal == 20
+    related = vn.get_related_ddl(ddl(5))
+    assert len(related) == 3 and ddl(5) not in related and ddl(6) not in related
+
+    vn.checkpoint()
+    assert vn.ddl_index.ntotal == 18 and not vn._tombstones["ddl"]
+    assert isinstance(faiss.downcast_index(vn.ddl_index.index), faiss.IndexHNSW)
+    assert VannaFAISS(config=config).ddl_index.ntotal == 18
+
+    # past max_tombstone_ratio the index is rebuilt right away
+    for id in ids[7:17]:
+        vn.remove_training_data(id)
+    assert vn.ddl_index.ntotal < 18 and len(vn._tombstones["ddl"]) <= 0.5 * vn.ddl_index.ntotal
+
+
+def write_legacy_store(path, n):
+    # older versions kept positional flat indexes next to JSON metadata lists
+    for name, key in [("sql", "sql"), ("ddl", "ddl"), ("doc", "documentation")]:
+        items = [{"id": f"{i}-{name}", key: ddl(i)} for i in range(n if name == "ddl" else 0)]
+        index = faiss.IndexFlatL2(DIM)
+        if items:
+            index.add(np.array([text_seeded(item[key]) for item in items]))
+        faiss.write_index(index, str(path / f"{name}_index.faiss"))
+        with open(path / f"{name}_metadata.json", "w") as f:
+            json.dump(items, f)
+
+
+def test_faiss_legacy_upgrade_survives_remove_and_reopen(VannaFAISS, tmp_path):
+    write_legacy_store(tmp_path, 4)
+    config = {"path": str(tmp_path), "embedding_dim": DIM}
+
+    vn = VannaFAISS(config=config)
+    assert not os.path.exists(tmp_path / "ddl_metadata.json") and os.path.exists(tmp_path / "ddl_metadata.json.bak")
+    # the id-mapped index is on disk before the first change
+    assert isinstance(faiss.read_index(str(tmp_path / "ddl_index.faiss")), faiss.IndexIDMap2)
+    assert vn.remove_training_data("1-ddl")
+
+    vn = VannaFAISS(config=config)
+    assert vn.ddl_index.ntotal == 3
+    assert sorted(vn.get_training_data()["id"]) == ["0-ddl", "2-ddl", "3-ddl"]
+    assert vn.get_related_ddl(ddl(2))[0] == ddl(2)
+
+
+def test_faiss_compact_question_sql(VannaFAISS):
+    vn = VannaFAISS(config={"client": "in-memory", "embedding_dim": DIM})
+    vn.add_question_sql("How many orders?", "SELECT COUNT(*) FROM orders")
+    vn.add_question_sql("How many orders?", "select count(*) from orders;")
+    vn.add_question_sql("Top customers", "SELECT name FROM customers LIMIT 10")
+    vn.add_ddl(ddl(0))
+
+    assert vn.compact_question_sql() == 1
+    df = vn.get_training_data()
+    assert sorted(df["sql"].dropna()) == ["SELECT name FROM customers LIMIT 10", "select count(*) from orders;"]
+
+
+def test_faiss_hybrid_search(VannaFAISS, tmp_path):
+    ddls = [f"CREATE TABLE customer_{i} (id INT)" for i in range(8)] + ["CREATE TABLE orders_fact (mrr_usd FLOAT)"]
+    config = {"path": str(tmp_path), "embedding_dim": DIM, "n_results": 2, "hybrid_search": True}
+    vn = VannaFAISS(config=config)
+    vn.add_ddl_batch(ddls)
+    vn.add_question_sql("Total mrr_usd?", "SELECT SUM(mrr_usd) FROM orders_fact")
+
+    # a new instance builds the BM25 index from get_training_data
+    vn = VannaFAISS(config=config)
+    sql, ddl, _ = vn.get_related_training_data("What is the total mrr_usd?")
+    assert ddls[8] in ddl
+    assert {"question": "Total mrr_usd?", "sql": "SELECT SUM(mrr_usd) FROM orders_fact"} in [
+        {"question": item["question"], "sql": item["sql"]} for item in sql
+    ]
+
+
+def test_faiss_build_schema_graph(VannaFAISS):
+    vn = VannaFAISS(config={"client": "in-memory", "embedding_dim": DIM})
+    vn.add_ddl_batch([
+        "CREATE TABLE customers (id INT PRIMARY KEY, name TEXT)",
+        "CREATE TABLE orders (id INT PRIMARY KEY, customer_id INT REFERENCES customers(id))",
+        "CREATE TABLE order_items (order_id INT REFERENCES orders(id), quantity INT)",
+    ])
+    vn.add_documentation("customers are billed monthly")
+
+    assert vn.build_schema_graph() == 3
+    assert vn._schema_graph.connect(["customers", "order_items"]) == (
+        ["orders"], ["orders.customer_id = customers.id", "order_items.order_id = orders.id"]
+    )
@@ -14,6 +14,7 @@ def test_regular_imports():
     from vanna.marqo.marqo import Marqo_VectorStore
     from vanna.milvus.milvus_vector import Milvus_VectorStore
     from vanna.mistral.mistral import Mistral
+    from vanna.numpy_store.numpy_vector import NumpyVectorStore
     from vanna.ollama.ollama import Ollama
     from vanna.openai.openai_chat import OpenAI_Chat
     from vanna.openai.openai_embeddings import OpenAI_Embeddings
@@ -42,6 +43,7 @@ def test_shortcut_imports():
     from vanna.marqo import Marqo_VectorStore
     from vanna.milvus import Milvus_VectorStore
     from vanna.mistral import Mistral
+    from vanna.numpy_store import NumpyVectorStore
     from vanna.ollama import Ollama
     from vanna.openai import OpenAI_Chat, OpenAI_Embeddings
     from vanna.opensearch import OpenSearch_VectorStore
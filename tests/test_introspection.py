@@ -0,0 +1,56 @@
+import sqlite3
+
+import duckdb
+import pandas as pd
+import pytest
+
+from vanna.base.introspection import introspect_ddl
+from vanna.exceptions import ValidationError
+
+SCHEMA = """
+CREATE TABLE customers (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL);
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER REFERENCES customers(id),
+    total DOUBLE
+);
+"""
+
+
+def test_introspect_sqlite():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+
+    ddl = introspect_ddl(lambda sql: pd.read_sql_query(sql, conn), "SQLite")
+    assert [(schema, table) for schema, table, _ in ddl] == [("main", "customers"), ("main", "orders")]
+    customers, orders = ddl[0][2], ddl[1][2]
+    assert customers.startswith("CREATE TABLE customers (")
+    assert "name VARCHAR NOT NULL" in customers and "PRIMARY KEY (id)" in customers
+    assert "FOREIGN KEY (customer_id) REFERENCES customers(id)" in orders
+
+
+def test_introspect_duckdb():
+    conn = duckdb.connect(":memory:")
+    conn.execute(SCHEMA)
+    conn.execute("COMMENT ON TABLE orders IS 'One row per order'")
+    conn.execute("COMMENT ON COLUMN orders.total IS 'Order total in USD'")
+    conn.execute("CREATE SCHEMA sales")
+    conn.execute("CREATE TABLE sales.targets (month DATE, amount DOUBLE)")
+
+    ddl = introspect_ddl(lambda sql: conn.execute(sql).df(), "DuckDB")
+    by_table = {(schema, table): value for schema, table, value in ddl}
+    assert set(by_table) == {("main", "customers"), ("main", "orders"), ("sales", "targets")}
+    orders = by_table[("main", "orders")]
+    assert orders.startswith("CREATE TABLE orders ( -- One row per order")
+    assert "total DOUBLE, -- Order total in USD" in orders
+    assert "PRIMARY KEY (id)" in orders
+    assert "FOREIGN KEY (customer_id) REFERENCES customers(id)" in orders
+    assert by_table[("sales", "targets")].startswith("CREATE TABLE sales.targets (")
+
+    filtered = introspect_ddl(lambda sql: conn.execute(sql).df(), "DuckDB", filter_schemas=["sales"])
+    assert [(schema, table) for schema, table, _ in filtered] == [("sales", "targets")]
+
+
+def test_introspect_unsupported_dialect():
+    with pytest.raises(ValidationError):
+        introspect_ddl(lambda sql: pd.DataFrame(), "Snowflake")
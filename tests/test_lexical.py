@@ -0,0 +1,78 @@
+from vanna.base.lexical import BM25Index, tokenize
+from vanna.base.relevance import reciprocal_rank_fusion
+from vanna.mock import MockLLM
+from vanna.numpy_store import NumpyVectorStore
+
+
+def test_tokenize():
+    assert tokenize("SELECT mrr_usd FROM ordersFact") == [
+        "select", "mrr_usd", "mrr", "usd", "from", "ordersfact", "orders", "fact"
+    ]
+
+
+def test_bm25_index():
+    index = BM25Index()
+    index.add("1-ddl", "CREATE TABLE orders_fact (order_id INT, mrr_usd FLOAT)", "orders_fact", "ddl")
+    index.add("2-ddl", "CREATE TABLE customers (id INT, name TEXT)", "customers", "ddl")
+    index.add("3-doc", "mrr_usd is the monthly recurring revenue", "mrr doc", "documentation", dataset="finance")
+
+    assert [item for item, _ in index.search("mrr_usd per order")] == ["orders_fact", "mrr doc"]
+    assert [item for item, _ in index.search("mrr_usd", training_data_type="ddl")] == ["orders_fact"]
+    assert index.search("mrr_usd", dataset="default", training_data_type="documentation") == []
+    assert index.search("weather") == []
+
+    assert index.remove("1-ddl") and not index.remove("1-ddl")
+    assert [item for item, _ in index.search("orders mrr_usd")] == ["mrr doc"]
+
+
+def test_reciprocal_rank_fusion():
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]]) == ["c", "a", "b", "d"]
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], limit=2) == ["c", "a"]
+
+
+class VannaNumpy(NumpyVectorStore, MockLLM):
+    def __init__(self, config=None):
+        NumpyVectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def generate_embedding(self, data, **kwargs):
+        # an embedding that only sees the length of a text, not the names in it
+        return [1.0, len(data) / 10]
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def test_hybrid_search():
+    ddls = [f"CREATE TABLE customer_{i} (id INT)" for i in range(5)] + ["CREATE TABLE orders_fact (mrr_usd FLOAT)"]
+    config = {"client": "in-memory", "n_results_ddl": 3}
+
+    vn = VannaNumpy(config=config)
+    vn.add_ddl_batch(ddls)
+    _, ddl, _ = vn.get_related_training_data("What is the total mrr_usd?")
+    assert ddls[5] not in ddl
+
+    vn = VannaNumpy(config={**config, "hybrid_search": True})
+    ids = vn.add_ddl_batch(ddls)
+    _, ddl, _ = vn.get_related_training_data("What is the total mrr_usd?")
+    assert len(ddl) == 3 and ddls[5] in ddl
+
+    # the index follows adds and removes made after it was built
+    vn.remove_training_data(ids[5])
+    vn.add_question_sql("Total mrr_usd?", "SELECT SUM(mrr_usd) FROM revenue")
+    sql, ddl, _ = vn.get_related_training_data("What is the total mrr_usd?")
+    assert ddls[5] not in ddl
+    assert sql == [{"question": "Total mrr_usd?", "sql": "SELECT SUM(mrr_usd) FROM revenue"}]
+
+
+def test_hybrid_search_keeps_selection_size():
+    ddls = [f"CREATE TABLE customer_{i} (id INT)" for i in range(5)] + ["CREATE TABLE orders_fact (mrr_usd FLOAT)"]
+    vn = VannaNumpy(config={"client": "in-memory", "n_results_ddl": 5, "hybrid_search": True})
+    vn.add_ddl_batch(ddls)
+    _, ddl, _ = vn.get_related_training_data("What is the total mrr_usd?")
+    assert len(ddl) == 5 and ddls[5] in ddl
+
+    # fusion does not fill up a list that the score threshold pruned
+    vn.config["score_threshold_ddl"] = 0.999
+    _, ddl, _ = vn.get_related_training_data("What is the total mrr_usd?")
+    assert ddl == []
@@ -0,0 +1,136 @@
+import hashlib
+import threading
+
+import numpy as np
+import pytest
+
+from vanna.mock import MockLLM
+from vanna.numpy_store import NumpyVectorStore
+
+
+def bag_of_words(text, dim=64):
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % dim] += 1.0
+    return vector.tolist()
+
+
+def text_seeded(text, dim=32):
+    # unrelated texts get unrelated vectors, the same text the same one
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) % 2**32
+    return np.random.default_rng(seed).standard_normal(dim).tolist()
+
+
+class VannaNumpy(NumpyVectorStore, MockLLM):
+    def __init__(self, config=None):
+        NumpyVectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def generate_embedding(self, data, **kwargs):
+        return bag_of_words(data) if self.config.get("embedding") == "bag_of_words" else text_seeded(data)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+@pytest.mark.parametrize("quantization", ["float32", "int8"])
+def test_numpy_store_search(quantization):
+    vn = VannaNumpy(config={"client": "in-memory", "quantization": quantization, "n_results": 2, "embedding": "bag_of_words"})
+    vn.add_ddl_batch(["CREATE TABLE orders (id INT)", "CREATE TABLE customers (id INT)", "CREATE TABLE items (id INT)"])
+    vn.add_question_sql("how many orders", "SELECT COUNT(*) FROM orders", dataset="sales")
+    vn.add_documentation("orders are placed by customers")
+
+    assert vn.get_related_ddl("orders table")[0] == "CREATE TABLE orders (id INT)"
+    assert len(vn.get_related_ddl("orders table")) == 2
+    assert vn.get_similar_question_sql("orders", dataset="sales") == [
+        {"question": "how many orders", "sql": "SELECT COUNT(*) FROM orders"}
+    ]
+    assert vn.get_similar_question_sql("orders", dataset="hr") == []
+    sql, ddl, docs = vn.get_related_training_data("orders")
+    assert len(sql) == 1 and len(ddl) == 2 and docs == ["orders are placed by customers"]
+    assert len(vn.get_training_data()) == 5
+
+
+def test_numpy_store_persistence_and_compaction(tmp_path):
+    config = {"path": str(tmp_path), "compact_min_rows": 0, "compact_threshold": 0.3, "background_compaction": False}
+    vn = VannaNumpy(config=config)
+    ids = vn.add_ddl_batch([f"CREATE TABLE t{i} (id INT)" for i in range(2000)])
+    assert vn.remove_training_data(ids[0])
+    assert not vn.remove_training_data(ids[0])
+
+    # reopening reads the memory-mapped files and keeps the tombstone
+    vn = VannaNumpy(config=config)
+    assert len(vn.get_training_data()) == 1999
+    assert "CREATE TABLE t0 (id INT)" not in vn.get_related_ddl("CREATE TABLE t0 (id INT)")
+    assert vn.get_related_ddl("CREATE TABLE t1 (id INT)")[0] == "CREATE TABLE t1 (id INT)"
+
+    generation = vn.collections["ddl"].generation
+    assert vn.remove_training_data_batch(ids[1:1000]) == 999
+    assert vn.collections["ddl"].generation == generation + 1
+    assert vn.collections["ddl"].deleted == set()
+
+    vn = VannaNumpy(config=config)
+    assert len(vn.get_training_data()) == 1000
+    assert vn.get_related_ddl("CREATE TABLE t1500 (id INT)")[0] == "CREATE TABLE t1500 (id INT)"
+    assert sorted(p.name for p in tmp_path.glob("ddl.*")) == [
+        f"ddl.{generation + 1}.jsonl", f"ddl.{generation + 1}.npy", "ddl.state.json"
+    ]
+
+
+def test_numpy_store_ignores_uncommitted_append(tmp_path):
+    vn = VannaNumpy(config={"path": str(tmp_path)})
+    vn.add_documentation("committed")
+    collection = vn.collections["documentation"]
+    with open(tmp_path / f"documentation.{collection.generation}.jsonl", "a") as f:
+        f.write('{"id": "torn"')
+
+    vn = VannaNumpy(config={"path": str(tmp_path)})
+    assert vn.get_training_data()["content"].tolist() == ["committed"]
+    vn.add_documentation("after restart")
+    vn = VannaNumpy(config={"path": str(tmp_path)})
+    assert vn.get_training_data()["content"].tolist() == ["committed", "after restart"]
+
+
+def test_numpy_store_compaction_runs_outside_the_lock(tmp_path, monkeypatch):
+    config = {"path": str(tmp_path), "compact_min_rows": 0, "compact_threshold": 0.3, "background_compaction": False}
+    vn = VannaNumpy(config=config)
+    ids = vn.add_ddl_batch([f"CREATE TABLE t{i} (id INT)" for i in range(100)])
+    vn.remove_training_data_batch(ids[:20])
+    collection = vn.collections["ddl"]
+    build = collection.build
+
+    def build_while_writing(snapshot, capacity=None):
+        # another thread searches and writes while the new generation is written
+        def write():
+            vn.get_related_ddl("CREATE TABLE t50 (id INT)")
+            ids.extend(vn.add_ddl_batch(["CREATE TABLE late (id INT)"]))
+            with vn._lock:
+                collection.delete([ids[40]])
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        return build(snapshot, capacity)
+
+    monkeypatch.setattr(collection, "build", build_while_writing)
+    vn.remove_training_data_batch(ids[20:40])
+
+    # the append and the delete made during the rewrite are carried over
+    assert collection.deleted == {0}
+    contents = set(vn.get_training_data()["content"])
+    assert len(contents) == 60 and "CREATE TABLE late (id INT)" in contents
+    assert "CREATE TABLE t40 (id INT)" not in contents
+
+    vn = VannaNumpy(config=config)
+    assert set(vn.get_training_data()["content"]) == contents
+    assert vn.get_related_ddl("CREATE TABLE late (id INT)")[0] == "CREATE TABLE late (id INT)"
+
+
+def test_numpy_store_background_compaction_thread_is_not_a_daemon(tmp_path):
+    vn = VannaNumpy(config={"path": str(tmp_path), "compact_min_rows": 0, "compact_threshold": 0.3})
+    ids = vn.add_ddl_batch([f"CREATE TABLE t{i} (id INT)" for i in range(10)])
+    vn.remove_training_data_batch(ids[:5])
+    assert not vn._compaction_thread.daemon
+    vn.wait_for_compaction()
+    assert vn.collections["ddl"].deleted == set() and len(vn.get_training_data()) == 5
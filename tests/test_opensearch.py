@@ -0,0 +1,150 @@
+import importlib.util
+
+import pytest
+
+pytest.importorskip("opensearchpy")
+
+from vanna.mock import MockLLM
+from vanna.opensearch import opensearch_vector
+from vanna.opensearch.opensearch_vector import OpenSearch_VectorStore, _hybrid_merge, _normalize_scores
+
+
+class FakeIndices:
+    def __init__(self, embedding_field=True):
+        self.embedding_field = embedding_field
+        self.created = {}
+
+    def exists(self, index):
+        return index in self.created
+
+    def create(self, index, body):
+        self.created[index] = body
+
+    def get_mapping(self, index):
+        properties = {"embedding": {"type": "knn_vector"}} if self.embedding_field else {}
+        return {index: {"mappings": {"properties": properties}}}
+
+
+class FakeClient:
+    """Stands in for `OpenSearch` and records the requests it is given."""
+
+    def __init__(self, **kwargs):
+        self.indices = FakeIndices()
+        self.msearch_bodies = []
+        self.msearch_responses = []
+        self.indexed = []
+
+    def info(self):
+        return {}
+
+    def msearch(self, body):
+        self.msearch_bodies.append(body)
+        return {"responses": self.msearch_responses}
+
+    def index(self, **kwargs):
+        self.indexed.append(kwargs)
+        return {"_id": kwargs["id"]}
+
+
+class VannaOpenSearch(OpenSearch_VectorStore, MockLLM):
+    def __init__(self, config=None):
+        self.embedded = []
+        OpenSearch_VectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def generate_embedding(self, data, **kwargs):
+        self.embedded.append(data)
+        return [1.0, 0.0, 0.0]
+
+    def generate_embeddings(self, data, **kwargs):
+        return [self.generate_embedding(text) for text in data]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(opensearch_vector, "OpenSearch", lambda **kwargs: client)
+    return client
+
+
+def hit(id, score, **source):
+    return {"_id": id, "_score": score, "_source": source}
+
+
+def response(*hits):
+    return {"hits": {"hits": list(hits)}}
+
+
+def test_normalize_scores():
+    assert _normalize_scores([]) == {}
+    assert _normalize_scores([hit("a", 3.0), hit("b", 3.0)]) == {"a": 1.0, "b": 1.0}
+    assert _normalize_scores([hit("a", 12.0), hit("b", 7.0), hit("c", 2.0)]) == {"a": 1.0, "b": 0.5, "c": 0.0}
+
+
+def test_hybrid_merge():
+    bm25 = [hit("a", 10.0), hit("b", 5.0), hit("c", 0.0)]
+    knn = [hit("c", 0.9), hit("d", 0.7)]
+    merged = _hybrid_merge(bm25, knn, knn_weight=0.5, size=3)
+    # a hit missing from one list scores 0 there
+    assert [(h["_id"], score) for h, score in merged] == [("a", 0.5), ("c", 0.5), ("b", 0.25)]
+    assert [h["_id"] for h, _ in _hybrid_merge(bm25, knn, knn_weight=0.75, size=2)] == ["c", "a"]
+
+
+def test_default_search_mode(client, monkeypatch):
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    assert VannaOpenSearch(config={}).search_mode == "bm25"
+    assert "embedding" not in client.indices.created["vanna_ddl_index"]["mappings"]["properties"]
+
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: object())
+    assert VannaOpenSearch(config={"embedding_dim": 3}).search_mode == "hybrid"
+
+
+def test_multi_search(client):
+    vn = VannaOpenSearch(config={"search_mode": "hybrid", "embedding_dim": 3, "hybrid_knn_weight": 0.25})
+    client.msearch_responses = [
+        response(hit("q1", 4.0, question="How many orders?", sql="SELECT COUNT(*) FROM orders"),
+                 hit("q2", 2.0, question="Top customers", sql="SELECT name FROM customers")),
+        response(hit("q2", 1.0, question="Top customers", sql="SELECT name FROM customers")),
+        response(hit("t1", 2.0, ddl="CREATE TABLE orders (id INT)")),
+        response(hit("t1", 0.75, ddl="CREATE TABLE orders (id INT)")),
+        response(),
+        response(hit("d1", 0.5, doc="orders are placed by customers")),
+    ]
+
+    sql, ddl, docs = vn.get_related_training_data_with_scores("How many orders?")
+    # one request for the three indices, and one embedding of the question
+    assert len(client.msearch_bodies) == 1 and vn.embedded == ["How many orders?"]
+    body = client.msearch_bodies[0]
+    assert [header["index"] for header in body[::2]] == [
+        "vanna_questions_sql_index", "vanna_questions_sql_index", "vanna_ddl_index", "vanna_ddl_index",
+        "vanna_document_index", "vanna_document_index",
+    ]
+    assert body[1]["query"] == {"match": {"question": "How many orders?"}}
+    assert body[3]["query"] == {"knn": {"embedding": {"vector": [1.0, 0.0, 0.0], "k": 10}}}
+
+    assert sql == [
+        ({"question": "How many orders?", "sql": "SELECT COUNT(*) FROM orders"}, 0.75),
+        ({"question": "Top customers", "sql": "SELECT name FROM customers"}, 0.25),
+    ]
+    assert ddl == [("CREATE TABLE orders (id INT)", 1.0)]
+    assert docs == [("orders are placed by customers", 0.25)]
+
+
+def test_multi_search_knn_and_errors(client):
+    vn = VannaOpenSearch(config={"search_mode": "knn", "embedding_dim": 3})
+    client.msearch_responses = [response(hit("t1", 0.75, ddl="CREATE TABLE orders (id INT)"))]
+    # cosinesimil scores are mapped back to cosine similarities
+    assert vn.get_related_ddl_with_scores("orders") == [("CREATE TABLE orders (id INT)", 0.5)]
+
+    client.msearch_responses = [{"error": {"type": "index_not_found_exception"}}]
+    with pytest.raises(Exception, match="index_not_found_exception"):
+        vn.get_related_ddl_with_scores("orders")
+
+
+def test_add_passes_client_kwargs(client):
+    vn = VannaOpenSearch(config={"search_mode": "bm25"})
+    vn.add_ddl("CREATE TABLE orders (id INT)", refresh=True, dataset="default")
+    vn.add_documentation("orders are placed by customers", refresh=True)
+    vn.add_question_sql("How many orders?", "SELECT COUNT(*) FROM orders", refresh="wait_for")
+    assert [request["refresh"] for request in client.indexed] == [True, True, "wait_for"]
+    assert all("dataset" not in request for request in client.indexed)
@@ -0,0 +1,119 @@
+import hashlib
+
+import pytest
+from qdrant_client import QdrantClient, models
+
+from vanna.mock import MockLLM
+from vanna.qdrant import Qdrant_VectorStore
+
+
+def hash_embedding(text, dim=32):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [b / 255.0 for b in digest[:dim]]
+
+
+class VannaQdrantLocal(Qdrant_VectorStore, MockLLM):
+    def __init__(self, config=None):
+        Qdrant_VectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    # fastembed is not needed to exercise the store itself
+    def generate_embedding(self, data, **kwargs):
+        return hash_embedding(data)
+
+    def generate_embeddings(self, data, **kwargs):
+        return [hash_embedding(text) for text in data]
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+@pytest.mark.parametrize("quantization", [None, "scalar", "binary"])
+def test_qdrant_memory(quantization):
+    vn = VannaQdrantLocal(config={"client": QdrantClient(":memory:"), "quantization": quantization})
+
+    vn.add_ddl_batch([f"CREATE TABLE t{i} (id INT)" for i in range(10)], dataset="sales")
+    vn.add_question_sql_batch([("How many rows?", "SELECT COUNT(*) FROM t0")], dataset="sales")
+    vn.add_documentation("t0 holds the orders")
+
+    assert len(vn.get_training_data()) == 12
+    assert len(vn.get_related_ddl("CREATE TABLE t3 (id INT)")) == 10
+    assert vn.get_related_ddl("orders", dataset="hr") == []
+    assert vn.get_similar_question_sql("How many rows?", dataset="sales") == [
+        {"question": "How many rows?", "sql": "SELECT COUNT(*) FROM t0"}
+    ]
+    assert vn.get_related_documentation("orders", dataset="default") == ["t0 holds the orders"]
+
+    # local mode searches exactly, so only check what would be sent to a server
+    if quantization is None:
+        assert vn._quantization_config() is None and vn._search_params() is None
+    else:
+        assert vn._search_params().quantization.rescore
+        assert isinstance(
+            vn._quantization_config(),
+            models.ScalarQuantization if quantization == "scalar" else models.BinaryQuantization,
+        )
+
+
+def test_qdrant_path(tmp_path):
+    vn = VannaQdrantLocal(config={"path": str(tmp_path), "on_disk": True})
+    ids = vn.add_ddl_batch(["CREATE TABLE a (id INT)", "CREATE TABLE b (id INT)"])
+    vn._client.close()
+
+    vn = VannaQdrantLocal(config={"path": str(tmp_path)})
+    assert set(vn.get_training_data()["id"]) == set(ids)
+    assert vn.remove_training_data(ids[0])
+    assert vn.get_related_ddl("CREATE TABLE b (id INT)") == ["CREATE TABLE b (id INT)"]
+
+
+def test_qdrant_unified_collection():
+    vn = VannaQdrantLocal(config={
+        "client": QdrantClient(":memory:"), "unified_collection": "training_data", "n_results_ddl": 3
+    })
+    assert vn._client.get_collections().collections[0].name == "training_data"
+
+    ddl_ids = vn.add_ddl_batch([f"CREATE TABLE t{i} (id INT)" for i in range(5)], dataset="sales")
+    vn.add_question_sql("How many rows?", "SELECT COUNT(*) FROM t0")
+    vn.add_documentation("CREATE TABLE t0 (id INT)")
+
+    df = vn.get_training_data()
+    assert df["training_data_type"].value_counts().to_dict() == {"ddl": 5, "sql": 1, "documentation": 1}
+
+    sql, ddl, docs = vn.get_related_training_data("CREATE TABLE t1 (id INT)")
+    assert sql == [{"question": "How many rows?", "sql": "SELECT COUNT(*) FROM t0"}]
+    assert len(ddl) == 3 and ddl[0] == "CREATE TABLE t1 (id INT)"
+    assert docs == ["CREATE TABLE t0 (id INT)"]
+    assert vn.get_related_ddl("CREATE TABLE t1 (id INT)")[0] == "CREATE TABLE t1 (id INT)"
+
+    assert vn.remove_training_data(ddl_ids[1])
+    assert vn.remove_collection("documentation")
+    assert vn.get_related_documentation("orders") == []
+    assert len(vn.get_training_data()) == 5
+
+
+def test_qdrant_creates_only_missing_payload_indexes(monkeypatch):
+    from vanna.qdrant import qdrant
+
+    # pretend the local client is a server, which is the only case that creates indexes
+    monkeypatch.setattr(qdrant, "QdrantLocal", type("NotLocal", (), {}))
+    client = QdrantClient(":memory:")
+    created = []
+    monkeypatch.setattr(
+        client, "create_payload_index", lambda name, field_name, **kwargs: created.append(field_name)
+    )
+    config = {"client": client, "unified_collection": "training_data"}
+
+    VannaQdrantLocal(config=config)
+    assert created == ["dataset", "doc_type"]
+
+    created.clear()
+    info = client.get_collection("training_data")
+    info.payload_schema = {"dataset": models.PayloadIndexInfo(data_type="keyword", points=0)}
+    monkeypatch.setattr(client, "get_collection", lambda name: info)
+    VannaQdrantLocal(config=config)
+    assert created == ["doc_type"]
+
+    created.clear()
+    info.payload_schema["doc_type"] = models.PayloadIndexInfo(data_type="keyword", points=0)
+    VannaQdrantLocal(config=config)
+    assert created == []
@@ -0,0 +1,51 @@
+import numpy as np
+
+from vanna.base.relevance import select_relevant
+from vanna.mock import MockLLM
+from vanna.numpy_store import NumpyVectorStore
+
+
+def test_select_relevant():
+    scored = [("a", 0.91), ("b", 0.88), ("c", 0.52), ("d", 0.50), ("e", 0.47)]
+    assert select_relevant(scored) == ["a", "b", "c", "d", "e"]
+    assert select_relevant(scored, threshold=0.5) == ["a", "b", "c", "d"]
+    assert select_relevant(scored, adaptive_k=True) == ["a", "b"]
+    assert select_relevant(scored, adaptive_k=True, gap=0.5) == ["a", "b", "c", "d", "e"]
+    assert select_relevant(scored, adaptive_k=True, min_k=3) == ["a", "b", "c", "d", "e"]
+    assert select_relevant(scored, adaptive_k=True, min_k=3, gap=0.02) == ["a", "b", "c", "d"]
+    assert select_relevant([("x", None), ("y", None)], threshold=0.9, adaptive_k=True) == ["x", "y"]
+
+
+class VannaNumpy(NumpyVectorStore, MockLLM):
+    def __init__(self, config=None):
+        NumpyVectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def generate_embedding(self, data, **kwargs):
+        # the first axis is about orders, the second about customers
+        vector = np.array([data.count("order"), data.count("customer"), 0.1], dtype=np.float32)
+        return vector.tolist()
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def test_scores_and_adaptive_k():
+    ddls = ["CREATE TABLE orders (order_id INT)", "CREATE TABLE order_items (order_id INT)", "CREATE TABLE customers (id INT)"]
+
+    vn = VannaNumpy(config={"client": "in-memory"})
+    vn.add_ddl_batch(ddls)
+    scored = vn.get_related_ddl_with_scores("order")
+    assert [ddl for ddl, _ in scored[:2]] == ddls[:2]
+    assert scored[0][1] > 0.99 and scored[2][1] < 0.2
+    assert len(vn.get_related_ddl("order")) == 3
+
+    vn = VannaNumpy(config={"client": "in-memory", "adaptive_k": True})
+    vn.add_ddl_batch(ddls)
+    assert sorted(vn.get_related_ddl("order")) == sorted(ddls[:2])
+    sql, ddl, docs = vn.get_related_training_data("order")
+    assert sorted(ddl) == sorted(ddls[:2]) and sql == [] and docs == []
+
+    vn = VannaNumpy(config={"client": "in-memory", "score_threshold_ddl": 0.5})
+    vn.add_ddl_batch(ddls)
+    assert vn.get_related_ddl("customer") == [ddls[2]]
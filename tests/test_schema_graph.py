@@ -0,0 +1,85 @@
+from vanna.base.schema_graph import SchemaGraph, parse_ddl
+from vanna.mock import MockLLM
+from vanna.numpy_store import NumpyVectorStore
+
+DDLS = [
+    "CREATE TABLE customers (id INT PRIMARY KEY, name TEXT)",
+    "CREATE TABLE orders (id INT PRIMARY KEY, customer_id INT, created_at DATE)",
+    """CREATE TABLE order_items ( -- one row per product of an order
+  order_id INT NOT NULL REFERENCES orders(id),
+  product_id INT,
+  quantity DECIMAL(10, 2),
+  PRIMARY KEY (order_id, product_id),
+  CONSTRAINT fk_product FOREIGN KEY (product_id) REFERENCES products (sku)
+);""",
+    "CREATE TABLE products (sku INT PRIMARY KEY, category_id INT)",
+    "CREATE TABLE categories (id INT PRIMARY KEY, name TEXT)",
+]
+
+
+def test_parse_ddl():
+    table = parse_ddl(DDLS[2])
+    assert table.name == "order_items"
+    assert table.columns == ["order_id", "product_id", "quantity"]
+    assert table.primary_key == ["order_id", "product_id"]
+    assert table.foreign_keys == [("order_id", "orders", "id"), ("product_id", "products", "sku")]
+    assert parse_ddl('CREATE TABLE IF NOT EXISTS "Sales"."Orders" (id INT)').name == "sales.orders"
+    assert parse_ddl("CREATE VIEW v AS SELECT 1") is None
+
+
+def test_schema_graph():
+    graph = SchemaGraph()
+    # the referenced tables may be trained after the tables referencing them
+    for i, ddl in reversed(list(enumerate(DDLS))):
+        graph.add_ddl(ddl, id=f"{i}-ddl")
+
+    bridges, conditions = graph.connect(["customers", "categories"])
+    assert bridges == ["orders", "order_items", "products"]
+    assert conditions == [
+        "orders.customer_id = customers.id",
+        "order_items.order_id = orders.id",
+        "order_items.product_id = products.sku",
+        "products.category_id = categories.id",
+    ]
+    assert graph.connect(["customers", "categories"], max_hops=2) == ([], [])
+    assert graph.connect(["orders", "customers", "weather"]) == ([], ["orders.customer_id = customers.id"])
+
+    assert graph.remove_id("2-ddl")
+    assert graph.connect(["customers", "categories"]) == ([], [])
+    graph.add_ddl(DDLS[2])
+    assert len(graph.connect(["customers", "categories"])[0]) == 3
+
+
+class VannaNumpy(NumpyVectorStore, MockLLM):
+    def __init__(self, config=None):
+        NumpyVectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def generate_embedding(self, data, **kwargs):
+        # the question is close to the customers and categories tables only, not to the tables joining them
+        question = data.startswith("Revenue")
+        return [float(question or "customers" in data), float(question or "categories" in data), 0.1]
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def test_expand_join_paths():
+    vn = VannaNumpy(config={"client": "in-memory", "n_results_ddl": 2, "expand_join_paths": True})
+    ids = vn.add_ddl_batch(DDLS)
+
+    _, ddl, docs = vn.get_related_training_data("Revenue per customer and category")
+    assert ddl == [DDLS[0], DDLS[4], DDLS[1], DDLS[2], DDLS[3]]
+    assert docs[-1].startswith("The tables join on: orders.customer_id = customers.id")
+
+    # removing a bridge table updates the graph
+    vn.remove_training_data(ids[2])
+    _, ddl, docs = vn.get_related_training_data("Revenue per customer and category")
+    assert ddl == [DDLS[0], DDLS[4]] and docs == []
+
+    vn = VannaNumpy(config={
+        "client": "in-memory", "n_results_ddl": 2, "expand_join_paths": True, "join_expansion_max_tokens": 20
+    })
+    vn.add_ddl_batch(DDLS)
+    _, ddl, _ = vn.get_related_training_data("Revenue per customer and category")
+    assert ddl == [DDLS[0], DDLS[4], DDLS[1]]
@@ -0,0 +1,150 @@
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+
+from vanna.base import VannaBase
+from vanna.mock import MockEmbedding, MockLLM, MockVectorDB
+from vanna.numpy_store import NumpyVectorStore
+from vanna.types import TrainingPlan, TrainingPlanItem
+
+
+class VannaMock(MockVectorDB, MockEmbedding, MockLLM):
+    def __init__(self, config=None):
+        VannaBase.__init__(self, config=config)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+class VannaNumpy(NumpyVectorStore, MockEmbedding, MockLLM):
+    def __init__(self, config=None):
+        NumpyVectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def snowflake_run_sql(delays):
+    def run_sql(sql):
+        if "INFORMATION_SCHEMA.DATABASES" in sql:
+            return pd.DataFrame({"DATABASE_NAME": list(delays)})
+        database = sql.split(" FROM ")[1].split(".")[0]
+        # the first databases finish last
+        time.sleep(delays[database])
+        if sql.endswith("INFORMATION_SCHEMA.TABLES"):
+            return pd.DataFrame({"TABLE_SCHEMA": ["PUBLIC", "PUBLIC"], "TABLE_NAME": ["A", "B"]})
+        return pd.DataFrame({
+            "TABLE_CATALOG": database,
+            "TABLE_SCHEMA": "PUBLIC",
+            "TABLE_NAME": ["A", "B"],
+            "COLUMN_NAME": ["ID", "ID"],
+            "DATA_TYPE": "NUMBER",
+            "COMMENT": None,
+        })
+
+    return run_sql
+
+
+def test_training_plan_snowflake_is_in_database_order():
+    vn = VannaMock(config={})
+    vn.run_sql = snowflake_run_sql({"DB1": 0.3, "DB2": 0.2, "DB3": 0.1, "DB4": 0.0})
+    vn.run_sql_is_set = True
+
+    plan = vn.get_training_plan_snowflake(use_historical_queries=False, max_workers=4)
+    assert [(item.item_group, item.item_name) for item in plan._plan] == [
+        (f"DB{i}.PUBLIC", table) for i in range(1, 5) for table in ("A", "B")
+    ]
+
+
+def sqlite_store(tmp_path):
+    database = tmp_path / "shop.sqlite"
+    sqlite3.connect(database).close()
+    vn = VannaNumpy(config={"client": "in-memory", "schema_sync_path": str(tmp_path / "schema_sync.json")})
+    vn.connect_to_sqlite(str(database))
+    return vn, database
+
+
+def execute(database, sql):
+    conn = sqlite3.connect(database)
+    conn.executescript(sql)
+    conn.commit()
+    conn.close()
+
+
+def stored_ddl(vn):
+    return sorted(vn.get_training_data()["content"])
+
+
+def test_sync_schema_add_change_drop(tmp_path):
+    vn, database = sqlite_store(tmp_path)
+    execute(database, "CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT);"
+                      "CREATE TABLE orders (id INTEGER PRIMARY KEY, total REAL);")
+
+    result = vn.sync_schema(vn.get_training_plan_ddl())
+    assert len(result["added"]) == 2 and result["updated"] == [] and result["removed"] == []
+    assert len(stored_ddl(vn)) == 2
+
+    result = vn.sync_schema(vn.get_training_plan_ddl())
+    assert result == {"added": [], "updated": [], "removed": [], "unchanged": 2}
+
+    execute(database, "ALTER TABLE orders ADD COLUMN status TEXT; DROP TABLE customers;")
+    result = vn.sync_schema(vn.get_training_plan_ddl())
+    assert len(result["updated"]) == 1 and len(result["removed"]) == 1 and result["added"] == []
+    ddl = stored_ddl(vn)
+    assert len(ddl) == 1 and "orders" in ddl[0] and "status" in ddl[0]
+
+
+def test_sync_schema_failure_mid_run_does_not_duplicate(tmp_path, monkeypatch):
+    vn, database = sqlite_store(tmp_path)
+    execute(database, "CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT);"
+                      "CREATE TABLE orders (id INTEGER PRIMARY KEY, total REAL);")
+    vn.sync_schema(vn.get_training_plan_ddl())
+
+    execute(database, "ALTER TABLE customers ADD COLUMN email TEXT; ALTER TABLE orders ADD COLUMN status TEXT;")
+    add_plan_item = vn._add_plan_item
+    calls = []
+
+    def failing_add_plan_item(item, dataset="default"):
+        calls.append(item.item_name)
+        if len(calls) == 2:
+            raise RuntimeError("embedding service unavailable")
+        return add_plan_item(item, dataset=dataset)
+
+    monkeypatch.setattr(vn, "_add_plan_item", failing_add_plan_item)
+    with pytest.raises(RuntimeError):
+        vn.sync_schema(vn.get_training_plan_ddl())
+    monkeypatch.setattr(vn, "_add_plan_item", add_plan_item)
+
+    result = vn.sync_schema(vn.get_training_plan_ddl())
+    assert len(result["updated"]) == 1 and result["unchanged"] == 1
+    ddl = stored_ddl(vn)
+    assert len(ddl) == 2
+    assert any("email" in value for value in ddl) and any("status" in value for value in ddl)
+
+
+def test_train_without_arguments_skips_unsupported_dialects():
+    vn = VannaMock(config={})
+    vn.run_sql = lambda sql: pytest.fail("the catalog should not be queried")
+    vn.run_sql_is_set = True
+    vn.dialect = "Snowflake"
+    assert vn.train() is None
+
+
+def test_train_without_arguments_introspects_sqlite(tmp_path):
+    vn, database = sqlite_store(tmp_path)
+    execute(database, "CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT);")
+    vn.train()
+    assert stored_ddl(vn) == ["CREATE TABLE customers (\n  id INTEGER,\n  name TEXT,\n  PRIMARY KEY (id)\n);"]
+
+
+def test_train_plan_and_sync_schema_store_the_same_ddl(tmp_path):
+    ddl = "CREATE TABLE [dbo].[orders] ([id] INT)"
+    plan = TrainingPlan([TrainingPlanItem(TrainingPlanItem.ITEM_TYPE_DDL, "dbo", "orders", ddl)])
+    trained = VannaNumpy(config={"client": "in-memory"})
+    trained.train(plan=plan)
+    synced = VannaNumpy(config={"client": "in-memory", "schema_sync_path": str(tmp_path / "schema_sync.json")})
+    synced.sync_schema(plan)
+    assert stored_ddl(trained) == stored_ddl(synced) == [ddl]
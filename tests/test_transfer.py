@@ -0,0 +1,94 @@
+import hashlib
+
+import chromadb
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from vanna.chromadb import ChromaDB_VectorStore
+from vanna.mock import MockLLM
+from vanna.numpy_store import NumpyVectorStore
+
+
+def text_seeded(text, dim=16):
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) % 2**32
+    return np.random.default_rng(seed).standard_normal(dim).tolist()
+
+
+class VannaNumpy(NumpyVectorStore, MockLLM):
+    def __init__(self, config=None):
+        NumpyVectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+        self.embedded = 0
+
+    def generate_embedding(self, data, **kwargs):
+        self.embedded += 1
+        return text_seeded(data)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+class HashEmbedding(chromadb.EmbeddingFunction):
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [np.array(text_seeded(text), dtype=np.float32) for text in input]
+
+
+class VannaChroma(ChromaDB_VectorStore, MockLLM):
+    def __init__(self, config=None):
+        ChromaDB_VectorStore.__init__(self, config=config)
+        MockLLM.__init__(self, config=config)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def fill(vn):
+    vn.add_ddl_batch([f"CREATE TABLE t{i} (id INT)" for i in range(5)], dataset="sales")
+    vn.add_question_sql_batch([("How many rows?", "SELECT COUNT(*) FROM t0")])
+    vn.add_documentation("t0 holds the orders")
+
+
+def contents(vn):
+    df = vn.get_training_data()
+    return sorted(zip(df["training_data_type"], df["dataset"], df["question"].fillna(""), df["content"]))
+
+
+@pytest.mark.parametrize("quantization", ["float32", "int8"])
+def test_export_import_reuses_embeddings(tmp_path, quantization):
+    path = str(tmp_path / "export.parquet")
+    source = VannaNumpy(config={"client": "in-memory", "quantization": quantization, "embedding_model": "seeded"})
+    fill(source)
+    assert source.export_training_data(path, batch_size=2) == 7
+
+    target = VannaNumpy(config={"client": "in-memory", "embedding_model": "seeded"})
+    assert target.import_training_data(path, batch_size=3) == 7
+    assert target.embedded == 0
+    assert contents(target) == contents(source)
+    assert target.get_related_ddl("CREATE TABLE t3 (id INT)", dataset="sales")[0] == "CREATE TABLE t3 (id INT)"
+
+    other = VannaNumpy(config={"client": "in-memory", "embedding_model": "other"})
+    other.import_training_data(path)
+    assert other.embedded == 7
+    assert contents(other) == contents(source)
+
+
+def test_export_from_chromadb(tmp_path):
+    path = str(tmp_path / "export.parquet")
+    source = VannaChroma(config={
+        "client": "in-memory", "embedding_function": HashEmbedding(), "embedding_model": "seeded"
+    })
+    fill(source)
+    assert source.export_training_data(path) == 7
+
+    target = VannaNumpy(config={"client": "in-memory", "embedding_model": "seeded"})
+    target.import_training_data(path)
+    assert target.embedded == 0
+    # get_training_data of ChromaDB only lists the default dataset, the export has all of them
+    expected = VannaNumpy(config={"client": "in-memory"})
+    fill(expected)
+    assert contents(target) == contents(expected)
@@ -0,0 +1,113 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vanna.mock import MockLLM
+from vanna.vannadb import VannaDB_VectorStore
+from vanna.vannadb.vannadb_vector import TTLCache
+
+
+class MockRPCHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        request = json.loads(body)
+        self.server.calls.append((request["method"], self.client_address[1]))
+
+        if request["method"] == "get_related_training_data":
+            time.sleep(0.05)
+            question = request["params"][0]["question"]
+            result = {
+                "questions": [{"question": question, "sql": "SELECT 1"}],
+                "ddl": ["CREATE TABLE t (id INT)"],
+                "documentation": [f"docs for {question}"],
+            }
+        else:
+            result = {"success": True, "message": "", "id": "1-ddl"}
+
+        response = json.dumps({"result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def rpc_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockRPCHandler)
+    server.calls = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+class VannaDBLocal(VannaDB_VectorStore, MockLLM):
+    def __init__(self, config=None):
+        VannaDB_VectorStore.__init__(self, vanna_model="test", vanna_api_key="key", config=config)
+        MockLLM.__init__(self, config=config)
+
+    def search_tables_metadata(self, **kwargs):
+        return []
+
+
+def related_calls(server):
+    return [call for call in server.calls if call[0] == "get_related_training_data"]
+
+
+def test_related_training_data_cache(rpc_server):
+    endpoint = f"http://127.0.0.1:{rpc_server.server_port}/rpc"
+    vn = VannaDBLocal(config={"endpoint": endpoint, "compress_requests": True})
+
+    sql, ddl, docs = vn.get_related_training_data("q1")
+    assert sql == [{"question": "q1", "sql": "SELECT 1"}]
+    assert vn.get_related_ddl("q1") == ["CREATE TABLE t (id INT)"]
+    assert vn.get_related_documentation("q1") == ["docs for q1"]
+    assert len(related_calls(rpc_server)) == 1
+
+    vn.add_ddl("CREATE TABLE u (id INT)")
+    vn.get_related_ddl("q1")
+    assert len(related_calls(rpc_server)) == 2
+
+    vn.prefetch_related_training_data(["q2", "q3", "q4", "q2"])
+    assert len(related_calls(rpc_server)) == 5
+    assert vn.get_related_documentation("q3") == ["docs for q3"]
+    assert len(related_calls(rpc_server)) == 5
+
+    # keep-alive: the sequential calls reused one pooled connection
+    ports = {port for method, port in rpc_server.calls[:3]}
+    assert len(ports) == 1
+
+
+def test_concurrent_lookups_share_one_rpc(rpc_server):
+    endpoint = f"http://127.0.0.1:{rpc_server.server_port}/rpc"
+    vn = VannaDBLocal(config={"endpoint": endpoint})
+
+    threads = [threading.Thread(target=vn.get_related_ddl, args=("q",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(related_calls(rpc_server)) == 1
+
+
+def test_ttl_cache():
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1
+    cache["c"] = 3
+    assert "b" not in cache and "a" in cache and "c" in cache
+    time.sleep(0.06)
+    assert "a" not in cache and len(cache) == 1